@@ -1,6 +1,16 @@
+import sys
 import time
+import types
 from topology import Topology, Device
+import simulation
 import add_manipulation as am
+import tracing
+
+TRACE = tracing.PRETTY # Sink receiving the simulation's trace events (None for quiet runs).
+STATS = None # Counters and timings of the simulations (None while instrumentation is off).
+DAD = False # True if addresses added to routers and devices connected for the first time run Duplicate Address Detection.
+MAX_REJECTED = 20 # Rejected rows of an inventory import that are printed.
+FORWARD = False # True if addresses in other subnets are reached across the routers (see simulation.route()).
 
 # Prints out the options.
 def help():
@@ -21,6 +31,22 @@ def help():
 
     print("Enter 'PT' to print topology.")
     print("Enter 'PD' to print all info regarding a device.")
+    print("Enter 'NC' to print the neighbor cache of a device.")
+    print("Enter 'MT' to print the MAC address table of a switch.")
+    print("Enter 'WT' to advance the simulated clock.")
+    print("Enter 'MR' to resolve many sender/target pairs in parallel.")
+    print("Enter 'SV' to save the topology to a file.")
+    print("Enter 'LD' to load a topology from a file.")
+    print("Enter 'IN' to turn the simulation counters and timings on/off, show them or save them.")
+    print("Enter 'PS' to profile one simulation.")
+    print("Enter 'LK' to set the latency and bandwidth of a connection.")
+    print("Enter 'ES' to run many resolutions in the event-driven simulation.")
+    print("Enter 'ST' to simulate a storm of hosts resolving their gateways at the same time.")
+    print("Enter 'DA' to turn Duplicate Address Detection of new IPv6 addresses on/off.")
+    print("Enter 'DC' to find IPv6 and MAC addresses assigned more than once.")
+    print("Enter 'IM' to import devices and connections from CSV inventory files.")
+    print("Enter 'FW' to turn forwarding across routers on/off.")
+    print("Enter 'RT' to print the routing table of a device.")
 
     print("Enter 'H' to repeat options.")
     print("Enter 'E' to end program.")
@@ -52,73 +78,615 @@ def print_dev(dev):
     print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
     print("Name: " + dev.name)
     print("Type: " + dev.dev_type)
-    print("Global IP: [", end="")
-    for x in range(len(dev.extended)-1):
-        print("'" + am.compress_ip(dev.extended[x]) + "', ", end="")
-    print("'" + am.compress_ip(dev.extended[len(dev.extended)-1]) + "']")
+    print("Global IP: ", end="")
+    print([am.format_ip(ip) for ip in dev.extended])
     print("Solicited-Node Multicast Address: ", end="")
-    print(dev.sol_ip)
+    print([am.format_sol_ip(ip) for ip in dev.sol_ip])
     print("MAC addresse: ", end="")
-    print(dev.mac_add)
+    print([am.format_mac(mac) for mac in dev.mac_add])
     print("Ethernet destination MAC address: ", end="")
-    print(dev.sol_mac_add)
+    print([am.format_mac(mac) for mac in dev.sol_mac_add])
     print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
     print("\n")
     return
 
-# Function asks the user to enter device for print_dev() function.
-def print_dev_ask(my_top):
-    dev_name = input("Enter the name of the Device to print: ")
+# Error raised when an option cannot be carried out, the message is reported to the user.
+class SimError(Exception):
+    pass
+
+# Function returns the device with the input name (raises SimError with the input message if it does not exist).
+def get_device(my_top, dev_name, msg):
     dev = my_top.find_device(dev_name)
     if dev is None:
-        print("This device is not in the topology.")
+        raise SimError(msg)
+    return dev
+
+# Function returns the router with the input name (raises SimError if it does not exist or is not a router).
+def get_router(my_top, dev_name):
+    dev = get_device(my_top, dev_name, "Device does not exist in the topology.")
+    if dev.dev_type.lower() != "router": # Make sure the device is a router.
+        raise SimError("Device input is not a router.")
+    return dev
+
+# Function asks the user to enter device for print_dev() function.
+def print_dev_ask(my_top):
+    try:
+        print_dev(get_device(my_top, input("Enter the name of the Device to print: "), "This device is not in the topology."))
+    except SimError as err:
+        print(err)
+    return
+
+# Prints the neighbor cache of a device.
+def print_cache(my_top, dev):
+    now = my_top.clock
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("Neighbor Cache of " + dev.name + " (time " + str(now) + "s)")
+    print("IPv6 Address -> MAC Address (State)")
+    cache = dev.neighbor_cache()
+    for ip in list(cache.entries):
+        state = cache.state(ip, now) # Ages the entry, expired entries are removed.
+        if state is not None:
+            mac = cache.entries[ip].mac
+            print(am.format_ip(ip) + " -> " + (am.format_mac(mac) if mac is not None else "?") + " (" + state + ")")
+    print("Hits: " + str(cache.hits) + ", Misses: " + str(cache.misses) + ", Evictions: " + str(cache.evictions))
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("\n")
+    return
+
+# Function asks the user to enter device for print_cache() function.
+def print_cache_ask(my_top):
+    try:
+        print_cache(my_top, get_device(my_top, input("Enter the name of the Device whose neighbor cache to print: "), "This device is not in the topology."))
+    except SimError as err:
+        print(err)
+    return
+
+# Prints the routing table of a router, or the default router of an end device.
+def print_routes(my_top, dev):
+    if dev.dev_type == "switch":
+        raise SimError("Switches do not route packets.")
+    routes = my_top.routing()
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("Routing Table of " + dev.name)
+    print("Subnet -> Next Hop")
+    if dev.dev_type == "router":
+        for prefix, hop in sorted(routes.table(dev).items(), key=lambda route: route[0]):
+            print(am.format_ip(prefix << 64) + "/64 -> " + ("connected" if hop is None else hop[0].name + " (" + am.format_ip(hop[1]) + ")"))
+    else:
+        for prefix in sorted(dev.prefixes):
+            print(am.format_ip(prefix << 64) + "/64 -> connected")
+        hop = routes.gateway(dev)
+        print("default -> " + ("none" if hop is None else hop[0].name + " (" + am.format_ip(hop[1]) + ")"))
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("\n")
+    return
+
+# Function asks the user to enter device for print_routes() function.
+def print_routes_ask(my_top):
+    try:
+        print_routes(my_top, get_device(my_top, input("Enter the name of the Device whose routing table to print: "), "This device is not in the topology."))
+    except SimError as err:
+        print(err)
+    return
+
+# Prints the MAC address table of a switch.
+def print_cam(my_top, dev):
+    if dev.dev_type != "switch":
+        raise SimError("Device input is not a switch.")
+    now = my_top.clock
+    cam = dev.cam_table()
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("MAC Address Table of " + dev.name + " (time " + str(now) + "s)")
+    print("MAC Address -> Port (Age)")
+    for mac, (port, learned) in cam.entries.items():
+        if now - learned < cam.aging:
+            print(am.format_mac(mac) + " -> " + port.name + " (" + str(now - learned) + "s)")
+    print("Forwarded: " + str(cam.hits) + ", Flooded: " + str(cam.misses) + ", Evictions: " + str(cam.evictions))
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("\n")
+    return
+
+# Function asks the user to enter switch for print_cam() function.
+def print_cam_ask(my_top):
+    try:
+        print_cam(my_top, get_device(my_top, input("Enter the name of the switch whose MAC address table to print: "), "This device is not in the topology."))
+    except SimError as err:
+        print(err)
+    return
+
+# Function advances the simulated clock by the input number of seconds.
+def wait(my_top, seconds):
+    try:
+        seconds = float(seconds)
+    except ValueError:
+        raise SimError("Input is invalid.")
+    if seconds < 0:
+        raise SimError("The clock can not go backwards.")
+    my_top.clock += seconds
+    print("Simulated time is now " + str(my_top.clock) + "s.")
+    return
+
+# Function asks the user how long to advance the simulated clock.
+def wait_ask(my_top):
+    try:
+        wait(my_top, input("Enter the number of seconds to wait: "))
+    except SimError as err:
+        print(err)
+    return
+
+# Function returns the (sender, target IPv6 address) pairs of source.
+# source is a file with one "SENDER IPV6" pair per line, 'gateways' (every end device to its routers) or 'subnets' (every pair of devices sharing a subnet).
+def get_pairs(my_top, source):
+    import runner # The options below import the modules only they use, so that the prompt and short scripts start faster.
+    match source.lower():
+        case "gateways":
+            return list(runner.gateway_pairs(my_top))
+        case "subnets":
+            return list(runner.subnet_pairs(my_top))
+    try:
+        return list(runner.read_pairs(source))
+    except OSError:
+        raise SimError("Could not read the file '" + source + "'.")
+
+# Function resolves many (sender, target IPv6 address) pairs in parallel and prints the aggregate statistics (see get_pairs()).
+def multi_resolve(my_top, source, workers=None):
+    import runner
+    pairs = get_pairs(my_top, source)
+    if workers is not None:
+        try:
+            workers = int(workers)
+        except ValueError:
+            raise SimError("Input is invalid.")
+        if workers < 1:
+            raise SimError("Input is invalid.")
+
+    start = time.perf_counter()
+    stats = runner.resolve_pairs(my_top, pairs, workers)
+    elapsed = time.perf_counter() - start
+    if STATS is not None:
+        STATS.merge(stats)
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("Pairs: " + str(len(pairs)))
+    print("Resolved: " + str(stats.resolved))
+    print("Failed: " + str(stats.failed))
+    print("Average hops: " + format(stats.avg_hops(), ".2f"))
+    print("Frames delivered: " + str(stats.frames))
+    print("Time: " + format(elapsed, ".3f") + "s")
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("\n")
+    return stats
+
+# Function asks the user for the pairs to resolve in parallel.
+def multi_resolve_ask(my_top):
+    source = input("Enter a file of 'SENDER IPV6' pairs, 'gateways' or 'subnets': ")
+    workers = input("Enter the number of worker processes (blank for one per core): ")
+    try:
+        multi_resolve(my_top, source, workers if workers.strip() else None)
+    except SimError as err:
+        print(err)
+    return
+
+# Function sets the latency (microseconds) and bandwidth (Mbit/s) of the connection between two devices.
+def set_link(my_top, dev1, dev2, latency, bandwidth):
+    if not my_top.check_connection(dev1, dev2):
+        raise SimError("Connection does not exist.")
+    try:
+        latency = float(latency)
+        bandwidth = float(bandwidth)
+    except ValueError:
+        raise SimError("Input is invalid.")
+    if (latency < 0) or (bandwidth <= 0):
+        raise SimError("Input is invalid.")
+    my_top.set_link(dev1, dev2, latency / 1e6, bandwidth * 1e6)
+    print("Connection between " + dev1.name + " and " + dev2.name + " now has " + format(latency, "g") + "us latency and " + format(bandwidth, "g") + "Mbit/s bandwidth.")
+    return
+
+# Function asks the user for the connection to change.
+def set_link_ask(my_top):
+    try:
+        dev1 = get_device(my_top, input("Enter the name of the first device: "), "Device is not in the network.")
+        dev2 = get_device(my_top, input("Enter the name of the second device: "), "Device is not in the network.")
+        set_link(my_top, dev1, dev2, input("Enter the latency in microseconds: "), input("Enter the bandwidth in Mbit/s: "))
+    except SimError as err:
+        print(err)
+    return
+
+# Function resolves many pairs (see get_pairs()) in the event-driven simulation, starting one every interval microseconds,
+# and prints the distribution of the resolution latencies.
+def event_sim(my_top, source, interval="0"):
+    import events
+    pairs = get_pairs(my_top, source)
+    try:
+        interval = float(interval) / 1e6
+    except ValueError:
+        raise SimError("Input is invalid.")
+    if interval < 0:
+        raise SimError("Input is invalid.")
+
+    engine = events.Engine(my_top, stats=STATS)
+    start_time = engine.now
+    for ind, (dev_name, ip) in enumerate(pairs):
+        engine.add(dev_name, ip, start_time + ind * interval)
+    start = time.perf_counter()
+    processed = engine.run()
+    elapsed = time.perf_counter() - start
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print_engine(engine, len(pairs), start_time, processed, elapsed)
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("\n")
+    return engine
+
+# Function prints the outcome of an event-driven run of count resolutions.
+def print_engine(engine, count, start_time, processed, elapsed):
+    import events
+    latencies = engine.latencies()
+    print("Pairs: " + str(count))
+    print("Resolved: " + str(len(latencies)))
+    print("Failed: " + str(count - len(latencies)))
+    print("Latency (us): min " + format(events.percentile(latencies, 0) * 1e6, ".2f") + ", median " + format(events.percentile(latencies, 0.5) * 1e6, ".2f")
+          + ", p99 " + format(events.percentile(latencies, 0.99) * 1e6, ".2f") + ", max " + format(events.percentile(latencies, 1) * 1e6, ".2f"))
+    print("Queueing (us): total " + format(engine.queue_time * 1e6, ".2f") + ", longest " + format(engine.max_queue_time * 1e6, ".2f"))
+    print("Simulated time: " + format((engine.now - start_time) * 1e6, ".2f") + "us")
+    print("Events: " + str(processed) + " in " + format(elapsed, ".3f") + "s")
+    return
+
+# Function asks the user for the pairs to resolve in the event-driven simulation.
+def event_sim_ask(my_top):
+    source = input("Enter a file of 'SENDER IPV6' pairs, 'gateways' or 'subnets': ")
+    interval = input("Enter the time between the start of two resolutions in microseconds (blank for all at once): ")
+    try:
+        event_sim(my_top, source, interval if interval.strip() else "0")
+    except SimError as err:
+        print(err)
+    return
+
+# Function starts, at the same time, an NS to each gateway of the senders (comma separated end device names, or 'all'),
+# as after a reboot wave (neighbor caches are not used), and prints the load on the switches and links.
+def storm(my_top, senders, tick="1"):
+    import events, runner
+    try:
+        tick = float(tick) / 1e6
+    except ValueError:
+        raise SimError("Input is invalid.")
+    if tick <= 0:
+        raise SimError("Input is invalid.")
+    pairs = runner.gateway_pairs(my_top)
+    if senders.lower() != "all":
+        names = set(senders.split(","))
+        for name in names:
+            if get_device(my_top, name, "Device '" + name + "' is not in the topology.").dev_type != "end":
+                raise SimError("'" + name + "' is not an end device.")
+        pairs = (pair for pair in pairs if pair[0] in names)
+
+    load = events.Load(tick)
+    engine = events.Engine(my_top, stats=simulation.Stats(), use_cache=False, load=load)
+    start_time = engine.now
+    count = 0
+    for dev_name, ip in pairs:
+        engine.add(dev_name, ip, start_time)
+        count += 1
+    if count == 0:
+        raise SimError("None of the senders have a gateway.")
+    start = time.perf_counter()
+    processed = engine.run()
+    elapsed = time.perf_counter() - start
+    if STATS is not None:
+        STATS.merge(engine.stats)
+
+    stats = engine.stats
+    peak_time, peak_frames = load.peak()
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print_engine(engine, count, start_time, processed, elapsed)
+    print("Frames delivered: " + str(stats.frames))
+    print("NS drops: " + str(stats.drop_nic) + " NIC (Ethernet multicast filter), " + str(stats.drop_ipv6) + " IPv6, " + str(stats.drop_icmpv6) + " ICMPv6")
+    print("Peak: " + str(peak_frames) + " frames in the " + format(tick * 1e6, "g") + "us tick at " + format((peak_time - start_time) * 1e6, ".2f") + "us")
+    print("Busiest switches:")
+    for name, frames in load.busiest_switches(5):
+        print("    " + name + ": " + str(frames) + " frames")
+    print("Busiest connections:")
+    for (name1, name2), frames in load.busiest_links(5):
+        print("    " + name1 + " <-> " + name2 + ": " + str(frames) + " frames")
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("\n")
+    return engine
+
+# Function asks the user for the senders of the storm.
+def storm_ask(my_top):
+    senders = input("Enter the sending end devices separated by commas, or 'all': ")
+    tick = input("Enter the length of a tick in microseconds (blank for 1): ")
+    try:
+        storm(my_top, senders.strip(), tick if tick.strip() else "1")
+    except SimError as err:
+        print(err)
+    return
+
+# Function saves the topology, files ending in '.json' are readable text and other files are binary snapshots.
+def save_topology(my_top, path):
+    import snapshot
+    try:
+        if path.lower().endswith(".json"):
+            snapshot.save_json(my_top, path)
+        else:
+            snapshot.save_binary(my_top, path)
+    except OSError:
+        raise SimError("Could not write the file '" + path + "'.")
+    print("Topology was saved to " + path + ".")
+    return
+
+# Function replaces the topology with the one saved in a file (see save_topology()).
+def load_topology(my_top, path):
+    import conflicts, snapshot
+    try:
+        if path.lower().endswith(".json"):
+            snapshot.load_json(my_top, path)
+        else:
+            snapshot.load_binary(my_top, path)
+    except (OSError, ValueError, KeyError) as err:
+        raise SimError("Could not load the file '" + path + "': " + str(err))
+    print("Topology was loaded from " + path + " (" + str(len(my_top.top)) + " devices).")
+    found, shared = conflicts.scan(my_top.top) # Saved files are not validated when they are loaded.
+    if found:
+        print("Warning: " + str(len(found)) + " addresses are assigned more than once (see 'DC').")
+    return
+
+# Function adds the devices (and connections) of CSV inventory files to the topology (see inventory.py).
+# Rejected rows are skipped, the first MAX_REJECTED of them are printed.
+def import_inventory(my_top, devices_path, links_path=None):
+    import inventory
+    report = inventory.Report()
+    def rejected(path, line_no, reason):
+        if report.rejected <= MAX_REJECTED:
+            print(path + " line " + str(line_no) + ": " + reason)
+    try:
+        inventory.import_devices(my_top, devices_path, report, rejected)
+        if links_path is not None:
+            inventory.import_links(my_top, links_path, report, rejected)
+    except (OSError, ValueError) as err: # The rows read before the error stay in the topology.
+        raise SimError("Could not import the inventory: " + str(err))
+    finally:
+        if report.files: # Nothing was imported if the first file could not be opened.
+            if report.rejected > MAX_REJECTED:
+                print("... " + str(report.rejected - MAX_REJECTED) + " more rows were rejected.")
+            print("Imported " + str(report.devices) + " devices with " + str(report.addresses) + " addresses and " + str(report.connections) +
+                  " connections, " + str(report.rejected) + " rows were rejected.")
+    return report
+
+# Function asks the user for the inventory files to import.
+def import_ask(my_top):
+    devices_path = input("Enter the CSV file of devices (name,type,ipv6,mac): ")
+    links_path = input("Enter the CSV file of connections (device1,device2[,latency_us,bandwidth_mbps]), blank for none: ")
+    try:
+        import_inventory(my_top, devices_path, links_path if links_path.strip() else None)
+    except SimError as err:
+        print(err)
+    return
+
+# Function asks the user for the file to save the topology to.
+def save_ask(my_top):
+    try:
+        save_topology(my_top, input("Enter the file to save the topology to ('.json' for text, otherwise binary): "))
+    except SimError as err:
+        print(err)
+    return
+
+# Function asks the user for the file to load the topology from.
+def load_ask(my_top):
+    try:
+        load_topology(my_top, input("Enter the file to load the topology from: "))
+    except SimError as err:
+        print(err)
+    return
+
+# Function prints the counters and phase timings collected by the instrumentation.
+def print_stats(stats):
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    print("Resolutions: " + str(stats.resolved) + " resolved, " + str(stats.failed) + " failed, " + str(stats.cache_hits) + " from the neighbor cache")
+    print("Devices visited: " + str(stats.visited))
+    print("Frames delivered: " + str(stats.frames))
+    print("Subnet checks: " + str(stats.subnet_checks))
+    print("NS drops: " + str(stats.drop_nic) + " NIC, " + str(stats.drop_ipv6) + " IPv6, " + str(stats.drop_icmpv6) + " ICMPv6")
+    print("Average hops: " + format(stats.avg_hops(), ".2f"))
+    print("NS flood: " + format(stats.flood_time * 1000, ".3f") + "ms")
+    print("NA return: " + format(stats.na_time * 1000, ".3f") + "ms")
+    print("Output: " + format(stats.output_time * 1000, ".3f") + "ms")
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    return
+
+# Function turns the instrumentation on or off, shows or resets its results, or saves them as JSON ('json FILE').
+def instrumentation(action, path=None):
+    global STATS
+    if (action == "json") != (path is not None):
+        raise SimError("Input is invalid.")
+    if (action in ("show", "reset", "json")) and (STATS is None):
+        raise SimError("Instrumentation is off.")
+    match action:
+        case "on":
+            if STATS is None:
+                STATS = simulation.Stats()
+            print("Instrumentation is on.")
+        case "off":
+            STATS = None
+            print("Instrumentation is off.")
+        case "reset":
+            STATS = simulation.Stats()
+            print("Instrumentation was reset.")
+        case "show":
+            print_stats(STATS)
+        case "json":
+            import json
+            try:
+                with open(path, "w") as out:
+                    json.dump(STATS.as_dict(), out, indent=1)
+            except OSError:
+                raise SimError("Could not write the file '" + path + "'.")
+            print("Instrumentation was saved to " + path + ".")
+        case _:
+            raise SimError("Input is invalid.")
+    return
+
+# Function asks the user what to do with the instrumentation.
+def instrumentation_ask():
+    action = input("Enter 'on', 'off', 'show', 'reset' or 'json': ").strip().lower()
+    try:
+        instrumentation(action, input("Enter the file to save the results to: ") if action == "json" else None)
+    except SimError as err:
+        print(err)
+    return
+
+# Function runs one simulation under cProfile and prints the most expensive functions, or saves the profile to path (for pstats).
+def profile_sim(my_top, dev1, dev2_add, path=None):
+    import cProfile, pstats # Only imported when profiling, like the server below: they slow down the start of every run.
+    profiler = cProfile.Profile()
+    profiler.runcall(resolve, my_top, dev1, dev2_add)
+    if path is None:
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats("cumulative").print_stats(15)
         return
-    print_dev(dev)
+    try:
+        profiler.dump_stats(path)
+    except OSError:
+        raise SimError("Could not write the file '" + path + "'.")
+    print("Profile was saved to " + path + ".")
+    return
+
+# Function asks the user for the simulation to profile.
+def profile_ask(my_top):
+    try:
+        dev1 = get_device(my_top, input("Enter the name of the device making the Neighbor Solicitation (NS) request: "), "-> The device is not in the Topology.")
+        dev2_add = input("Enter the IPv6 Global Unicast address of the device reciving the NS request (making the NA): ")
+        path = input("Enter the file to save the profile to (blank to print it): ")
+        profile_sim(my_top, dev1, dev2_add, path if path.strip() else None)
+    except SimError as err:
+        print(err)
+    return
+
+# Function runs Duplicate Address Detection of an IPv6 address about to be assigned to dev, raises SimError if a device defends it.
+def detect_duplicate(my_top, dev, dev_ip):
+    sink = TRACE
+    if (STATS is not None) and (sink is not None):
+        sink = tracing.TimedSink(sink, STATS)
+    defender = simulation.dad(my_top, dev, am.ip_to_int(dev_ip), sink, STATS)
+    if defender is not None:
+        raise SimError("Duplicate address detected: " + dev_ip + " is used by " + defender.name + ".")
+
+# Function turns Duplicate Address Detection of new IPv6 addresses on or off.
+def dad_mode(action):
+    global DAD
+    match action:
+        case "on":
+            DAD = True
+        case "off":
+            DAD = False
+        case _:
+            raise SimError("Input is invalid.")
+    print("Duplicate Address Detection is " + action + ".")
+    return
+
+# Function asks the user whether to turn Duplicate Address Detection on or off.
+def dad_ask():
+    try:
+        dad_mode(input("Enter 'on' or 'off': ").strip().lower())
+    except SimError as err:
+        print(err)
     return
 
+# Function turns forwarding of packets to other subnets across the routers on or off.
+def forwarding(action):
+    global FORWARD
+    match action:
+        case "on":
+            FORWARD = True
+        case "off":
+            FORWARD = False
+        case _:
+            raise SimError("Input is invalid.")
+    print("Forwarding across routers is " + action + ".")
+    return
+
+# Function asks the user whether to turn forwarding across routers on or off.
+def forwarding_ask():
+    try:
+        forwarding(input("Enter 'on' or 'off': ").strip().lower())
+    except SimError as err:
+        print(err)
+    return
+
+# Function prints the IPv6 and MAC addresses assigned to more than one device (or twice to one device).
+# Returns the number of conflicts.
+def scan_conflicts(my_top):
+    import conflicts
+    found, shared = conflicts.scan(my_top.top)
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    for kind, address, names in found:
+        address = am.format_ip(address) if kind == "ipv6" else am.format_mac(address)
+        print(("IPv6 " if kind == "ipv6" else "MAC ") + address + ": " + ", ".join(names))
+    if not found:
+        print("No address is assigned more than once.")
+    print("Solicited-node multicast groups shared by different addresses: " + str(shared))
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    return len(found)
+
+# Function raises SimError if the IPv6 address can not be assigned to a device.
+def check_ip(my_top, dev_ip):
+    if not am.ipv6_val_check(dev_ip): # Makes sure the entered IPv6 address is valid.
+        raise SimError("Invalid IPv6 address.")
+    if my_top.ip_exist(dev_ip): # Make sure that the IP was not already assigned to a different device.
+        raise SimError("IPv6 Global Unicast Address was alreay assigned.")
+    if not am.global_unicast(am.get_prefix(am.ip_to_int(dev_ip))): # Make sure that the IPv6 address is in 2000::/3 (Global Unicast Address).
+        raise SimError("IPv6 Global Unicast Address must start with a 2 or a 3.")
+
+# Function raises SimError if the MAC address can not be assigned to a device.
+def check_mac(my_top, dev_mac):
+    if not am.mac_val_check(dev_mac): # Makes sure that the MAC address is given in the correct format.
+        raise SimError("Input is invalid.")
+    if my_top.mac_exist(dev_mac): # Makes sure that the MAC address has not been assigned.
+        raise SimError("The input MAC address was already assigned.")
+
 # Function returns a valid IPv6 address.
 def ip_validity(my_top):
-    dev_ip = ""
     while True: # Keep asking the user for an IPv6 address until a valid one is entered.
         dev_ip = input("Enter an IPv6 Global Unicast Address: ")
-        if not am.ipv6_val_check(dev_ip): # Makes sure the entered IPv6 address is valid.
-            print("Invalid IPv6 address.\n")
-            continue
-        if my_top.ip_exist(dev_ip): # Make sure that the IP was not already assigned to a different device.
-            print("IPv6 Global Unicast Address was alreay assigned.\n")
-            continue
-        if (dev_ip[0] != '2') and (dev_ip[0] != '3'): # Make sure that the IPv6 address starts with a 2 or a 3 (Global Unicast Address).
-            print("IPv6 Global Unicast Address must start with a 2 or a 3.\n")
-            continue
-        break
-    return dev_ip
+        try:
+            check_ip(my_top, dev_ip)
+            return dev_ip
+        except SimError as err:
+            print(str(err) + "\n")
 
 # Function returns a valid MAC address.
 def mac_validity(my_top):
-    dev_mac = ""
     while True: # Loops until a valid MAC address is input.
         dev_mac = input("Enter the device's MAC address (Hyphen-Hexadecimal notation): ")
-        if not am.mac_val_check(dev_mac): # Makes sure that the MAC address is given in the correct format.
-            print("Input is invalid.")
-            continue
-        if my_top.mac_exist(dev_mac): # Makes sure that the MAC address has not been assigned.
-            print("The input MAC address was already assigned.")
-            continue
-        break
-    return dev_mac
+        try:
+            check_mac(my_top, dev_mac)
+            return dev_mac
+        except SimError as err:
+            print(err)
 
 # Function creates a new device.
 def create_dev(my_top, dev_ip, dev_mac, dev_name, dev_type):
-    e_ip = am.extend_ip(dev_ip) # Get the extended IPv6 address.
-    sol_ip = am.get_sol_ip(e_ip) # Get the solicited node multicast address.
-    sol_mac = am.get_sol_mac(sol_ip) # Get the solicited node ethernet address.
-    dev = Device(dev_name, dev_type, [e_ip], [sol_ip], [dev_mac], [sol_mac]) # Create the device.
+    dev = Device(dev_name, dev_type, [am.ip_to_int(dev_ip)], [am.mac_to_int(dev_mac)]) # Create the device (solicited node addresses are derived from the IPv6 address).
 
     print("-----------------------------------------------------------------------------")
     print(dev_name + ": " + dev_ip + ", " + dev_mac)
     print("IPv6 Mapping: ")
     print("IPv6 Global Unicast Address -> Solicited-Node Multicast Address -> Ethernet Multicast Address")
-    print(dev_ip + " -> " + sol_ip + " -> " + sol_mac)
+    print(dev_ip + " -> " + am.format_sol_ip(dev.sol_ip[0]) + " -> " + am.format_mac(dev.sol_mac_add[0]))
+    return dev
+
+# Function validates the input and adds a new device to the topology (switches do not have addresses).
+def new_device(my_top, dev_type, dev_name, dev_ip=None, dev_mac=None):
+    if not my_top.name_validity(dev_name):
+        raise SimError("This device already exits.")
+
+    if dev_type == "switch":
+        dev = Device(dev_name, dev_type)
+        my_top.add_device(dev)
+        print("Switch was created.")
+        return dev
+
+    check_ip(my_top, dev_ip)
+    check_mac(my_top, dev_mac)
+    dev = create_dev(my_top, dev_ip, dev_mac, dev_name, dev_type) # DAD runs once the device is connected (see connect()).
+    my_top.add_device(dev)
     return dev
 
 # Function requests user info to create a new device.
@@ -129,251 +697,168 @@ def add_device(my_top, dev_type):
         return
     
     if dev_type == "switch":
-        dev = Device(dev_name, dev_type)
-        my_top.add_device(dev)
-        print("Switch was created.")
-        return dev
+        return new_device(my_top, dev_type, dev_name)
 
     dev_ip = ip_validity(my_top)
     dev_mac = mac_validity(my_top)
+    try:
+        return new_device(my_top, dev_type, dev_name, dev_ip, dev_mac)
+    except SimError as err:
+        print(err)
+    return
 
-    dev = create_dev(my_top, dev_ip, dev_mac, dev_name, dev_type)
-    my_top.add_device(dev)
+# Function removes a device and its connections from the topology.
+def delete_device(my_top, dev):
+    my_top.remove_device(dev)
+    print(dev.name + " was removed from the topology.")
     return
 
-# Function removes a device from topology.
+# Function asks the user for the device to remove from the topology.
 def remove_device(my_top):
-    dev_name = input("Enter the name of the device to remove: ")
-    dev = my_top.find_device(dev_name)
-    if dev is None: # Device does not exist.
-        print("Device does not exist in the topology.")
-        return
-    for connection in my_top.top[dev]: # Remove connections to the device.
-        my_top.top[connection].remove(dev)
-    my_top.top.pop(dev) # Remove the device.
-    print(dev.name + " was removed from the topology.")
+    try:
+        delete_device(my_top, get_device(my_top, input("Enter the name of the device to remove: "), "Device does not exist in the topology."))
+    except SimError as err:
+        print(err)
     return
 
 # Function adds an IP address to a device.
-def req_ip(dev, new_ip, new_mac):
-    e_ip = am.extend_ip(new_ip) # Extend the IPv6 address.
-    sol_ip = am.get_sol_ip(e_ip) # Get solicited node multicast address.
-    sol_mac = am.get_sol_mac(sol_ip) # Get the solicited node Etherent address.
-    
-    # Add the addresses to their corresponing list.
-    dev.extended.append(e_ip) 
-    dev.sol_ip.append(sol_ip)
-    dev.mac_add.append(new_mac)
-    dev.sol_mac_add.append(sol_mac)
-    return sol_ip, sol_mac
+def req_ip(my_top, dev, new_ip, new_mac):
+    e_ip = am.ip_to_int(new_ip)
+    my_top.add_ip(dev, e_ip, am.mac_to_int(new_mac)) # Add the addresses to the device and the topology indexes.
+    return am.format_sol_ip(am.sol_ip_int(e_ip)), am.format_mac(am.sol_mac_int(e_ip))
 
-# Funciton gets user input to add an IPv6 address to a router.
-def add_ip(my_top):
-    dev_name = input("Enter the name of the router you want to add an IP address to: ")
-    dev = my_top.find_device(dev_name)
-    if dev is None: # Make sure the device exists in the topology.
-        print("Device does not exist in the topology.")
-        return
-    if dev.dev_type.lower() != "router": # Make sure the device is a router.
-        print("Device input is not a router.")
-        return
-    new_ip = ip_validity(my_top) # Get a valid IPv6 address.
-    new_mac = mac_validity(my_top) # Get a valid MAC address.
+# Function validates the input and adds an IPv6 address to a router.
+def assign_ip(my_top, dev, new_ip, new_mac):
+    if DAD and am.ipv6_val_check(new_ip): # Duplicates on the router's links are found by DAD before the topology-wide check.
+        detect_duplicate(my_top, dev, new_ip)
+    check_ip(my_top, new_ip)
+    check_mac(my_top, new_mac)
 
-    sol_ip, sol_mac = req_ip(dev, new_ip, new_mac)
+    sol_ip, sol_mac = req_ip(my_top, dev, new_ip, new_mac)
     print("IP Mapping:")
     print("IPv6 Global Unicast Address -> Solicited-Node Multicast Address -> Ethernet Multicast Address")
     print(new_ip + " -> " + sol_ip + " -> " + sol_mac)
     print_dev(dev)
     return
 
-# Function removes an exisiting IPv6 address from a router.
-def remove_ip(my_top):
-    # Enter the IP and device from which the IP should be removed.
-    dev_name = input("Enter the name of the router you want to remove an IP address from: ")
-    dev = my_top.find_device(dev_name)
-    if dev is None:
-        print("Device does not exist in the topology.")
-        return
-    if dev.dev_type.lower() != "router":
-        print("Device input is not a router.")
+# Funciton gets user input to add an IPv6 address to a router.
+def add_ip(my_top):
+    try:
+        dev = get_router(my_top, input("Enter the name of the router you want to add an IP address to: "))
+    except SimError as err:
+        print(err)
         return
-    rm_ip = am.extend_ip(input("Enter the IP address you want to remove: "))
+    new_ip = ip_validity(my_top) # Get a valid IPv6 address.
+    new_mac = mac_validity(my_top) # Get a valid MAC address.
+    try:
+        assign_ip(my_top, dev, new_ip, new_mac)
+    except SimError as err:
+        print(err)
+    return
+
+# Function removes an IPv6 address from a router and drops the connections that are no longer in a shared subnet.
+def unassign_ip(my_top, dev, ip):
+    rm_ip = am.ip_to_int(ip)
     if rm_ip not in dev.extended:
-        print("Input IPv6 address does not belong with the input device.")
-        return
+        raise SimError("Input IPv6 address does not belong with the input device.")
     
-    # Remove the addresses from their corresponding list.
-    rm_ind = dev.extended.index(rm_ip)
-    dev.extended.pop(rm_ind)
-    dev.sol_ip.pop(rm_ind)
-    dev.mac_add.pop(rm_ind)
-    dev.sol_mac_add.pop(rm_ind)
-
-    for connection in my_top.top[dev]: # Remove connections to device if it is no longer in the same IP subnet.
-        if not dev.same_sub(connection):
-            my_top.remove_connection(dev, connection)
+    # Remove the addresses from the device and the topology indexes, then the connections to devices no longer in the same IP subnet.
+    for connection in my_top.remove_ip(dev, rm_ip):
+        my_top.remove_connection(dev, connection)
 
     print("IPv6 address was removed.")
     print_dev(dev)
     return
 
+# Function removes an exisiting IPv6 address from a router.
+def remove_ip(my_top):
+    # Enter the IP and device from which the IP should be removed.
+    try:
+        dev = get_router(my_top, input("Enter the name of the router you want to remove an IP address from: "))
+        unassign_ip(my_top, dev, input("Enter the IP address you want to remove: "))
+    except SimError as err:
+        print(err)
+    return
+
 # Function creates a connection between two different devices in the same subnet.
-def add_connection(my_top):
-    # Enter the name of the devices to connect.
-    t_dev1 = input("Enter the name of the first device: ")
-    dev1 = my_top.find_device(t_dev1)
-    if dev1 is None:
-        print("Device is not in the network.")
-        return
-    t_dev2 = input("Enter the name of the second device: ")
-    dev2 = my_top.find_device(t_dev2)
-    if dev2 is None:
-        print("Device is not in the network.")
-        return
+def connect(my_top, dev1, dev2):
     if dev1 == dev2:
-        print("Cannot connect a device to itself.")
-        return
+        raise SimError("Cannot connect a device to itself.")
     if my_top.check_connection(dev1, dev2):
-        print("Connection already exists.")
-        return
-    
-    # Make sure the devices are in the same subnet.
-    if not dev1.same_sub(dev2):
-        print("Devices have no IP addresses in the same subnet.")
-    else:
-        my_top.add_connection(dev1, dev2)
-        print("Connection between " + dev1.name + " and " + dev2.name + " was created.")
+        raise SimError("Connection already exists.")
+    if not dev1.same_sub(dev2): # Make sure the devices are in the same subnet.
+        raise SimError("Devices have no IP addresses in the same subnet.")
+    attached = [dev for dev in (dev1, dev2) if (dev.dev_type != "switch") and not my_top.top[dev]] # Devices connected for the first time.
+    my_top.add_connection(dev1, dev2)
+    if DAD: # Their addresses come up on the link and are checked against the devices they now reach.
+        try:
+            for dev in attached:
+                for ip in dev.extended:
+                    detect_duplicate(my_top, dev, am.format_ip(ip))
+        except SimError as err:
+            my_top.remove_connection(dev1, dev2)
+            raise SimError(str(err) + " The connection was not created.")
+    print("Connection between " + dev1.name + " and " + dev2.name + " was created.")
+    return
+
+# Function asks the user for two devices to connect.
+def add_connection(my_top):
+    # Enter the name of the devices to connect.
+    try:
+        dev1 = get_device(my_top, input("Enter the name of the first device: "), "Device is not in the network.")
+        dev2 = get_device(my_top, input("Enter the name of the second device: "), "Device is not in the network.")
+        connect(my_top, dev1, dev2)
+    except SimError as err:
+        print(err)
     return
 
 # Function removes an existing connection between two devices.
-def remove_connection(my_top):
-    t_dev1 = input("Enter the name of the first device: ")
-    dev1 = my_top.find_device(t_dev1)
-    if dev1 is None:
-        print("Device is not in the network.")
-        return
-    t_dev2 = input("Enter the name of the second device: ")
-    dev2 = my_top.find_device(t_dev2)
-    if dev2 is None:
-        print("Device is not in the network.")
-        return
+def disconnect(my_top, dev1, dev2):
     if not my_top.check_connection(dev1, dev2):
-        print("Connection between the devices does not exist.")
-        return
-    else:
-        my_top.remove_connection(dev1, dev2)
-        print("Connection between " + dev1.name + " and " + dev2.name + " was removed.")
+        raise SimError("Connection between the devices does not exist.")
+    my_top.remove_connection(dev1, dev2)
+    print("Connection between " + dev1.name + " and " + dev2.name + " was removed.")
     return
 
-# Function to get user input (starting device and IPv6 address).
-def start_sim(my_top):
-    # Get user input regarding the device to send the NS request and the IPv6 destination.
-    dev1_n = input("Enter the name of the device making the Neighbor Solicitation (NS) request: ") # Device that will send NS.
-    dev1 = my_top.find_device(dev1_n)
-    if dev1 is None:
-        print("-> The device is not in the Topology.")
-        return
-    dev2_add = input("Enter the IPv6 Global Unicast address of the device reciving the NS request (making the NA): ") # Device that will respond to NS.
-
-    ip_add = am.extend_ip(dev2_add)
-    if ip_add == "":
-        print("-> None of the Devices in the topology have the input IPv6 Global Unicast address.")
-        return
+# Function asks the user for two devices to disconnect.
+def remove_connection(my_top):
+    try:
+        dev1 = get_device(my_top, input("Enter the name of the first device: "), "Device is not in the network.")
+        dev2 = get_device(my_top, input("Enter the name of the second device: "), "Device is not in the network.")
+        disconnect(my_top, dev1, dev2)
+    except SimError as err:
+        print(err)
+    return
 
-    # Make sure the devices are in the same subnet.
-    if not dev1.same_sub_ip(ip_add):
-        print("-> The input address must be in the same subnet as the input device in order for the address to be resolved.")
-        return
+# Function checks the simulation input and resolves the IPv6 address from the sending device.
+def resolve(my_top, dev1, dev2_add):
+    ip_add = am.ip_to_int(dev2_add)
+    if ip_add is None:
+        raise SimError("-> None of the Devices in the topology have the input IPv6 Global Unicast address.")
 
+    # Make sure the devices are in the same subnet, unless the routers forward the packet.
+    on_link = dev1.same_sub_ip(ip_add)
+    if not (on_link or FORWARD):
+        raise SimError("-> The input address must be in the same subnet as the input device in order for the address to be resolved.")
     dev2 = my_top.find_device_ip(ip_add)
-    true_path = []
-    true_path = request(my_top, dev1, dev2, true_path, ip_add) # Start the simulation.
-    return
-
-# Function iterate through the topology.
-def request(my_top, dev1, dev2, true_path, ip_add):
-    visited = []
-    queue = []
-    visited.append(dev1)
-    queue.append([dev1])
-    add_ind = dev2.ip_ind(ip_add)
-
-    print("----------------------------NEIGHBOR SOLICITATION----------------------------")
-    print(dev1.name + " is sending broadcast.")
-    print("#############################################################################")
-    print("Packet for " + dev2.name + ": ")
-    print("[DA: Multicast][DA: Solicited-Node Multicast][ICMPv6 NS - Target IPv6 Address]")
-    print("[" + dev2.sol_mac_add[add_ind] + "] [" + dev2.sol_ip[add_ind] + "] [" + am.compress_ip(dev2.extended[add_ind]) + "]")
-    print("#############################################################################")
-    print("\n")
+    if dev2 is None:
+        raise SimError("-> None of the Devices in the topology have the input IPv6 Global Unicast address.")
 
-    # Iterate through devices using a BFS approach.
-    found = False
-    while queue:
-        path = queue.pop(0)
-        curr_dev = path[-1] # Get the latest device in the path that was pushed.
-
-        if curr_dev != dev1: # Device sending the NS does not process the NS packet.
-            print_req(curr_dev, dev2, add_ind)
-            if ((curr_dev.dev_type == "router") or (curr_dev.dev_type == "end")) and (curr_dev != dev2):
-                continue
-        if curr_dev == dev2: # If the current device matches the device we are looking for then make it send a NA packet following true_path.
-            true_path = path.copy()
-            response(my_top, true_path, add_ind)
-            found = True
-            continue
+    sink = TRACE
+    if (STATS is not None) and (sink is not None): # Time the output separately from the simulation.
+        sink = tracing.TimedSink(sink, STATS)
+    if not on_link:
+        return simulation.route(my_top, dev1, dev2, ip_add, sink, STATS)
+    return simulation.resolve(my_top, dev1, dev2, ip_add, sink, STATS) # Start the simulation.
 
-        for device in my_top.top[curr_dev]:
-            if (device not in visited) and (device.same_sub_ip(ip_add) is True): # Makes sure that the NS is only brodcast to devices in the same subnet.
-                new_path = path.copy()
-                new_path.append(device) # Create a new path with the addition of the newly visited device.
-                queue.append(new_path)
-                visited.append(device) # Mark the current device as visited so we don't visit it again - prevents loops.
-    if found == False:
-        print("Address Resolution failed.")
-        print("The IPv6 address trying to be resolved was in a different subnet than the device sending the NS packet.")
-    print("-----------------------------------------------------------------------------")
-    return true_path
-
-# Function simulates the acceptance of NS packet.
-def print_req(curr_dev, dev2, add_ind):
-    print("*****************************************************************************")
-    print("'" + curr_dev.name + "' recived neighbor solicitation packet.")
-    if curr_dev.dev_type == "switch": # If the device is a switch then flood the packet.
-        print(curr_dev.name + " (BROADCASTING): the switch is broadcasting the packet.")
-    elif dev2.sol_mac_add[add_ind] in curr_dev.sol_mac_add: # If solicited node MAC address matches then pass the NS packet up.
-        print("Passing Packet Up:")
-        print("NIC Card->", end="")
-        if dev2.sol_ip[add_ind] in curr_dev.sol_ip: # If the solicited node IPv6 multicast address matches then pass the NS packet up.
-            print("IPv6 Process->", end="")
-            if dev2.extended[add_ind] in curr_dev.extended: # If the IPv6 address matches the packets destinnation IPv6 address then the packet is accepted.
-                print("ICMPv6 Process")
-                print("\n")
-                print(curr_dev.name + " (ACCEPTED): Ethernet multicast, IPv6 solicited-node multicast/global unicast match.")
-                print("\n")
-            else:
-                print("\n")
-                print(curr_dev.name + " (DROPPED): IPv6 global unicast address did NOT match.") 
-        else:
-            print("\n")
-            print(curr_dev.name + " (DROPPED): IPv6 solicited-node multicast address did NOT match.")
-    else:
-        print(curr_dev.name + " (DROPPED): Ethernet multicast address did NOT match.")
-    print("*****************************************************************************\n")
-    return
-
-# Function simulates NA packet response.
-def response(my_top, true_path, ip_ind):
-    print("!!!!!!!!!!!!!!!!!!!!!!!!!!!-NEIGHBOR ADVERTISMENT-!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-    dev_to = true_path[0]
-    dev_from = true_path[-1]
-    print("Neighbor Advertisment is being sent from '" + dev_from.name + "' to '" + dev_to.name + "'.")
-    for device in reversed(true_path[1:]): # NA packet is sent directly back to the device that sent the NS packet.
-        print(device.name + "->", end='')
-    print(true_path[0].name)
-    print(true_path[0].name + " recived neighbor advertisment " + dev_from.name)
-    print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+# Function to get user input (starting device and IPv6 address).
+def start_sim(my_top):
+    # Get user input regarding the device to send the NS request and the IPv6 destination.
+    try:
+        dev1 = get_device(my_top, input("Enter the name of the device making the Neighbor Solicitation (NS) request: "), "-> The device is not in the Topology.") # Device that will send NS.
+        resolve(my_top, dev1, input("Enter the IPv6 Global Unicast address of the device reciving the NS request (making the NA): ")) # Device that will respond to NS.
+    except SimError as err:
+        print(err)
     return
 
 # Function creates a test simulation topology.
@@ -393,8 +878,8 @@ def test_top(my_top):
     my_top.add_device(dev5)
     my_top.add_device(dev6)
 
-    req_ip(dev4, "2001:3::21", "43-54-65-67-65-12")
-    req_ip(dev1, "2001:3::8", "13-14-61-61-15-12")
+    req_ip(my_top, dev4, "2001:3::21", "43-54-65-67-65-12")
+    req_ip(my_top, dev1, "2001:3::8", "13-14-61-61-15-12")
 
     # Connect R1 to R2 and E1, R2 to S1, and E2/E3 to S1.
     my_top.add_connection(dev1, dev2)
@@ -406,8 +891,199 @@ def test_top(my_top):
     print_topology(my_top)
     return
 
-def main():
+# Arguments expected by each option in a batch script.
+BATCH_USAGE = {
+    "AR": "NAME IPV6 MAC", "AE": "NAME IPV6 MAC", "AS": "NAME", "RD": "NAME",
+    "AC": "NAME NAME", "RC": "NAME NAME", "AI": "ROUTER IPV6 MAC", "RI": "ROUTER IPV6",
+    "TT": "", "SS": "NAME IPV6", "PT": "", "PD": "NAME", "NC": "NAME", "MT": "SWITCH", "WT": "SECONDS", "MR": "PAIRS [WORKERS]", "SV": "FILE", "LD": "FILE",
+    "IN": "on|off|show|reset|json FILE", "PS": "NAME IPV6 [FILE]",
+    "LK": "NAME NAME LATENCY_US BANDWIDTH_MBPS", "ES": "PAIRS [INTERVAL_US]",
+    "ST": "all|NAME,NAME... [TICK_US]", "DA": "on|off", "DC": "", "IM": "DEVICES_CSV [LINKS_CSV]",
+    "FW": "on|off", "RT": "NAME", "H": "", "E": "",
+}
+
+# Function runs one option of a batch script (the option code followed by its arguments).
+def batch_option(my_top, words):
+    match words:
+        case ['AR', dev_name, dev_ip, dev_mac]: # Add a router.
+            new_device(my_top, "router", dev_name, dev_ip, dev_mac)
+        case ['AE', dev_name, dev_ip, dev_mac]: # Add a end device.
+            new_device(my_top, "end", dev_name, dev_ip, dev_mac)
+        case ['AS', dev_name]: # Add a switch.
+            new_device(my_top, "switch", dev_name)
+        case ['RD', dev_name]: # Remove a device.
+            delete_device(my_top, get_device(my_top, dev_name, "Device does not exist in the topology."))
+        case ['AC', dev1_n, dev2_n]: # Add a connection.
+            connect(my_top, get_device(my_top, dev1_n, "Device is not in the network."), get_device(my_top, dev2_n, "Device is not in the network."))
+        case ['RC', dev1_n, dev2_n]: # Remove a connection.
+            disconnect(my_top, get_device(my_top, dev1_n, "Device is not in the network."), get_device(my_top, dev2_n, "Device is not in the network."))
+        case ['AI', dev_name, new_ip, new_mac]: # Add an IPv6 address to an existing router.
+            assign_ip(my_top, get_router(my_top, dev_name), new_ip, new_mac)
+        case ['RI', dev_name, rm_ip]: # Remove an IPv6 address from a router.
+            unassign_ip(my_top, get_router(my_top, dev_name), rm_ip)
+        case ['TT']: # Create a default test topology.
+            test_top(my_top)
+        case ['SS', dev_name, ip]: # Start the simulation.
+            resolve(my_top, get_device(my_top, dev_name, "-> The device is not in the Topology."), ip)
+        case ['PT']: # Print the devices and their connections.
+            print_topology(my_top)
+        case ['PD', dev_name]: # Print information regarding a device.
+            print_dev(get_device(my_top, dev_name, "This device is not in the topology."))
+        case ['NC', dev_name]: # Print the neighbor cache of a device.
+            print_cache(my_top, get_device(my_top, dev_name, "This device is not in the topology."))
+        case ['MT', dev_name]: # Print the MAC address table of a switch.
+            print_cam(my_top, get_device(my_top, dev_name, "This device is not in the topology."))
+        case ['WT', seconds]: # Advance the simulated clock.
+            wait(my_top, seconds)
+        case ['MR', source]: # Resolve many pairs in parallel.
+            multi_resolve(my_top, source)
+        case ['MR', source, workers]:
+            multi_resolve(my_top, source, workers)
+        case ['SV', path]: # Save the topology.
+            save_topology(my_top, path)
+        case ['LD', path]: # Load a topology.
+            load_topology(my_top, path)
+        case ['IN', action]: # Instrumentation of the simulations.
+            instrumentation(action.lower())
+        case ['IN', action, path]:
+            instrumentation(action.lower(), path)
+        case ['PS', dev_name, ip]: # Profile one simulation.
+            profile_sim(my_top, get_device(my_top, dev_name, "-> The device is not in the Topology."), ip)
+        case ['PS', dev_name, ip, path]:
+            profile_sim(my_top, get_device(my_top, dev_name, "-> The device is not in the Topology."), ip, path)
+        case ['LK', dev1_n, dev2_n, latency, bandwidth]: # Set the latency and bandwidth of a connection.
+            set_link(my_top, get_device(my_top, dev1_n, "Device is not in the network."), get_device(my_top, dev2_n, "Device is not in the network."), latency, bandwidth)
+        case ['ES', source]: # Resolve many pairs in the event-driven simulation.
+            event_sim(my_top, source)
+        case ['ES', source, interval]:
+            event_sim(my_top, source, interval)
+        case ['ST', senders]: # Storm of resolutions.
+            storm(my_top, senders)
+        case ['ST', senders, tick]:
+            storm(my_top, senders, tick)
+        case ['DA', action]: # Duplicate Address Detection of new addresses.
+            dad_mode(action.lower())
+        case ['DC']: # Find addresses assigned more than once.
+            scan_conflicts(my_top)
+        case ['IM', devices_path]: # Import an inventory.
+            import_inventory(my_top, devices_path)
+        case ['IM', devices_path, links_path]:
+            import_inventory(my_top, devices_path, links_path)
+        case ['FW', action]: # Forwarding across routers.
+            forwarding(action.lower())
+        case ['RT', dev_name]: # Print the routing table of a device.
+            print_routes(my_top, get_device(my_top, dev_name, "This device is not in the topology."))
+        case ['H']: # Repeat the options.
+            help()
+        case [code, *_] if code in BATCH_USAGE:
+            raise SimError("Usage: " + (code + " " + BATCH_USAGE[code]).strip())
+        case [code, *_]:
+            raise SimError("Unknown option '" + code + "'.")
+    return
+
+# Function runs a batch script without prompting, errors are reported per line on stderr.
+# Returns the number of lines that failed.
+def run_batch(my_top, stream):
+    failed = 0
+    for line_no, line in enumerate(stream, 1):
+        words = line.split()
+        if not words or words[0].startswith("#"): # Skip blank lines and comments.
+            continue
+        words[0] = words[0].upper()
+        if words == ["E"]: # End the script.
+            break
+        try:
+            batch_option(my_top, words)
+        except SimError as err:
+            failed += 1
+            print("line " + str(line_no) + ": " + str(err), file=sys.stderr)
+        except Exception as err: # Not an input error the option checks for, still only this line fails.
+            failed += 1
+            print("line " + str(line_no) + ": " + type(err).__name__ + ": " + str(err), file=sys.stderr)
+    return failed
+
+# Options of the command line -> (argument name, accepted values or None for any).
+CLI_OPTIONS = {
+    "-b": ("batch", None), "--batch": ("batch", None), "-t": ("trace", ("pretty", "jsonl", "quiet")),
+    "--trace": ("trace", ("pretty", "jsonl", "quiet")), "--trace-file": ("trace_file", None), "--serve": ("serve", None),
+}
+
+# Function returns the parsed command line arguments without argparse, which is slow to import (it loads re).
+# Returns None for anything but well-formed options (help, errors, abbreviations, ...), that are left to argparse.
+def quick_args(argv):
+    args = types.SimpleNamespace(batch=None, trace="pretty", trace_file=None, serve=None)
+    words = iter(argv)
+    for word in words:
+        opt, eq, value = word.partition("=") if word.startswith("--") else (word, "", "")
+        if opt not in CLI_OPTIONS:
+            return None
+        if not eq:
+            value = next(words, None)
+            if (value is None) or (value.startswith("-") and value != "-"):
+                return None
+        name, choices = CLI_OPTIONS[opt]
+        if (choices is not None) and (value not in choices):
+            return None
+        setattr(args, name, value)
+    return args
+
+# Function returns the parsed command line arguments.
+def parse_args(argv):
+    args = quick_args(sys.argv[1:] if argv is None else argv)
+    if args is not None:
+        return args
+    import argparse
+    parser = argparse.ArgumentParser(description="IPv6 Address Resolution Simulation")
+    parser.add_argument("-b", "--batch", metavar="FILE", help="run the options in FILE ('-' for stdin) without prompting")
+    parser.add_argument("-t", "--trace", choices=["pretty", "jsonl", "quiet"], default="pretty", help="how simulation events are reported (default: pretty)")
+    parser.add_argument("--trace-file", metavar="FILE", help="write the jsonl trace to FILE instead of stdout")
+    parser.add_argument("--serve", metavar="ADDRESS", help="serve the topology (built by --batch, if given) to JSON lines clients on HOST:PORT or unix:PATH")
+    return parser.parse_args(argv)
+
+# Function returns the trace sink selected on the command line.
+def open_trace(args):
+    match args.trace:
+        case "quiet":
+            return None
+        case "jsonl":
+            return tracing.JsonLinesSink(open(args.trace_file, "w") if args.trace_file else sys.stdout)
+    return tracing.PRETTY
+
+def main(argv=None):
+    global TRACE
+    args = parse_args(argv)
+    TRACE = open_trace(args)
+    try:
+        return run(args)
+    finally:
+        if TRACE is not None:
+            TRACE.flush()
+
+# Function runs the batch script or the interactive prompt.
+def run(args):
     n_top = Topology()
+    if args.batch is not None: # Non-interactive batch mode.
+        if args.batch == "-":
+            failed = run_batch(n_top, sys.stdin)
+        else:
+            try:
+                script = open(args.batch)
+            except OSError as err:
+                print("Could not read the batch script '" + args.batch + "': " + err.strerror, file=sys.stderr)
+                return 1
+            with script:
+                failed = run_batch(n_top, script)
+        if args.serve is None:
+            return 1 if failed else 0
+    if args.serve is not None: # Server mode, after the batch script built the topology.
+        import server
+        try:
+            server.serve(n_top, args.serve, batch_option, SimError)
+        except (OSError, ValueError) as err:
+            print("Could not serve on " + args.serve + ": " + str(err), file=sys.stderr)
+            return 1
+        return 0
+
     res = "S"
     help() # Print out the options.
     while res != "E": # Exit the program with 'E'.
@@ -439,9 +1115,41 @@ def main():
                 print_topology(n_top)
             case 'PD': # Print information regarding a device.
                 print_dev_ask(n_top)
+            case 'NC': # Print the neighbor cache of a device.
+                print_cache_ask(n_top)
+            case 'MT': # Print the MAC address table of a switch.
+                print_cam_ask(n_top)
+            case 'WT': # Advance the simulated clock.
+                wait_ask(n_top)
+            case 'MR': # Resolve many pairs in parallel.
+                multi_resolve_ask(n_top)
+            case 'SV': # Save the topology.
+                save_ask(n_top)
+            case 'LD': # Load a topology.
+                load_ask(n_top)
+            case 'IN': # Instrumentation of the simulations.
+                instrumentation_ask()
+            case 'PS': # Profile one simulation.
+                profile_ask(n_top)
+            case 'LK': # Set the latency and bandwidth of a connection.
+                set_link_ask(n_top)
+            case 'ES': # Resolve many pairs in the event-driven simulation.
+                event_sim_ask(n_top)
+            case 'ST': # Storm of resolutions.
+                storm_ask(n_top)
+            case 'DA': # Duplicate Address Detection of new addresses.
+                dad_ask()
+            case 'DC': # Find addresses assigned more than once.
+                scan_conflicts(n_top)
+            case 'IM': # Import an inventory.
+                import_ask(n_top)
+            case 'FW': # Forwarding across routers.
+                forwarding_ask()
+            case 'RT': # Print the routing table of a device.
+                print_routes_ask(n_top)
             case 'H': # Repeat the options.
                 help()
     return
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,45 +1,238 @@
-import socket
-import ipaddress
-import re
+# ipaddress and NumPy are only imported when they are needed: short batch runs and worker processes start many times and
+# importing them takes longer than the rest of the simulator.
+np = None # NumPy module once load_numpy() imported it (False if it is not installed).
+NUMPY_ROWS = 1000 # Bulk derivations of fewer rows are done in plain Python rather than importing NumPy for them.
+HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+# Addresses are stored as integers: IPv6 addresses as 128-bit ints and MAC addresses as 48-bit ints.
+SOL_IP_BASE = 0xff0200000000000000000001ff000000 # ff02::1:ff00:0 (solicited-node multicast prefix).
+SOL_MAC_BASE = 0x3333ff000000 # 33-33-ff-00-00-00 (solicited-node Ethernet multicast prefix).
+LOW_24 = 0xffffff # Low 24 bits of an IPv6 address are copied into the solicited-node addresses.
+LOW_64 = 0xffffffffffffffff
+
+# Function returns the NumPy module (None if it is not installed), importing it the first time.
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+            np = numpy
+        except ImportError: # NumPy is optional, bulk derivation falls back to plain Python without it.
+            np = False
+    return np or None
 
 # Function returns true if IPv6 address is in the correct format.
 def ipv6_val_check(ip):
-    try:
-        temp = ip
-        socket.inet_pton(socket.AF_INET6, temp)
-        return True
-    except socket.error:
-        return False
+    return ("%" not in ip) and (ip_to_int(ip) is not None) # Zone indexes (fe80::1%eth0) are not accepted.
 
-# Function returns true if MAC address is in the correct format.
+# Function returns true if MAC address is in the correct format (XX-XX-XX-XX-XX-XX).
 def mac_val_check(dev_mac):
-    if re.match("[0-9a-f]{2}([-])[0-9a-f]{2}(\\1[0-9a-f]{2}){4}$", dev_mac.lower()): # If the REGEX expression is matched (XX-XX-XX-XX-XX-XX) then it is valid
-        return True
-    return False
+    groups = dev_mac.split("-")
+    if len(groups) != 6:
+        return False
+    for group in groups:
+        if (len(group) != 2) or not HEX_DIGITS.issuperset(group):
+            return False
+    return True
+
+# Function returns True if the /64 prefix is a Global Unicast one (2000::/3), the addresses devices can be given.
+# Takes the prefix (the high 64 bits) so that it also works on a NumPy array of prefixes.
+def global_unicast(prefix):
+    return (prefix >> 61) == 1
+
+# Function returns the IPv6 address as a 128-bit integer (None if it is not a valid IPv6 address).
+# Hexadecimal groups with an optional '::' are parsed here, the rare forms with an embedded IPv4 address or a zone index
+# are left to ipaddress.
+def ip_to_int(ip):
+    if ("." in ip) or ("%" in ip):
+        return ip_to_int_slow(ip)
+    head, sep, tail = ip.partition("::")
+    head = head.split(":") if head else []
+    tail = tail.split(":") if tail else []
+    missing = 8 - len(head) - len(tail) # Groups of zeros left out by '::'.
+    if (missing < 1) if sep else (missing != 0):
+        return None
+    value = 0
+    for group in head + ["0"] * missing + tail:
+        if (not 0 < len(group) <= 4) or not HEX_DIGITS.issuperset(group): # Also rejects a second '::'.
+            return None
+        value = (value << 16) | int(group, 16)
+    return value
 
-# Function returns the extended IPv6 address.
-def extend_ip(ip):
+# Function returns the IPv6 address as a 128-bit integer using ipaddress (None if it is not a valid IPv6 address).
+def ip_to_int_slow(ip):
+    import ipaddress
     try:
-        addr_str = ipaddress.ip_address(ip)
-        new_add = addr_str.exploded # Extend address.
-        return new_add
-    except:
-        return ""
-
-# Function returns the compressed IPv6 address.
-def compress_ip(ip):
-    addr_str = ipaddress.ip_address(ip)
-    new_add = addr_str.compressed # Compress address.
-    return new_add
-
-# Function returns solicited node multicast IPv6 address.
-def get_sol_ip(ip):
-    ex_ip = extend_ip(ip)
-    sol_multi = "ff02::1:ff" + ex_ip[32:]
-    return sol_multi
-
-# Function returns the solicited node Ethernet address.
-def get_sol_mac(sol_ip):
-    ex_ip = extend_ip(sol_ip)
-    sol_mac = "33-33-ff-" + ex_ip[32:34] + "-" + ex_ip[35:37] + "-" + ex_ip[37:]
-    return sol_mac
+        return int(ipaddress.IPv6Address(ip))
+    except ValueError:
+        return None
+
+# Function returns the MAC address (Hyphen-Hexadecimal notation) as a 48-bit integer.
+def mac_to_int(mac):
+    return int(mac.replace("-", ""), 16)
+
+# Function returns the /64 prefix of an IPv6 address as an integer.
+def get_prefix(ip):
+    return ip >> 64
+
+# Function returns the solicited node multicast IPv6 address of an IPv6 address.
+def sol_ip_int(ip):
+    return SOL_IP_BASE | (ip & LOW_24)
+
+# Function returns the solicited node Ethernet address of an IPv6 (or solicited node multicast) address.
+def sol_mac_int(ip):
+    return SOL_MAC_BASE | (ip & LOW_24)
+
+# Function returns the solicited node multicast IPv6 address that a solicited node Ethernet address maps to (None if it is not one).
+def sol_mac_to_ip(mac):
+    if (mac & ~LOW_24) != SOL_MAC_BASE:
+        return None
+    return SOL_IP_BASE | (mac & LOW_24)
+
+# Function returns the compressed string of an integer IPv6 address (RFC 5952, the same as ipaddress).
+def format_ip(ip):
+    groups = ["%x" % ((ip >> shift) & 0xffff) for shift in range(112, -16, -16)]
+    best, best_len = -1, 1 # The longest run of two or more zero groups (the first of equally long ones) becomes '::'.
+    run = 0
+    for ind, group in enumerate(groups):
+        if group == "0":
+            run += 1
+            if run > best_len:
+                best, best_len = ind - run + 1, run
+        else:
+            run = 0
+    if best < 0:
+        return ":".join(groups)
+    return ":".join(groups[:best]) + "::" + ":".join(groups[best + best_len:])
+
+# Function returns the string of an integer solicited node multicast IPv6 address.
+def format_sol_ip(sol_ip):
+    return "ff02::1:ff%02x:%04x" % ((sol_ip >> 16) & 0xff, sol_ip & 0xffff)
+
+# Function returns the Hyphen-Hexadecimal string of an integer MAC address.
+def format_mac(mac):
+    digits = "%012x" % mac
+    return "-".join((digits[0:2], digits[2:4], digits[4:6], digits[6:8], digits[8:10], digits[10:12]))
+
+# Results of bulk address derivation, one row per input address pair (rows listed in errors are None).
+class BulkAddresses:
+    __slots__ = ("ip", "mac", "sol_ip", "sol_mac", "errors")
+
+    def __init__(self, size):
+        self.ip = [None] * size # IPv6 addresses (128-bit).
+        self.mac = [None] * size # MAC addresses (48-bit).
+        self.sol_ip = [None] * size # Solicited node multicast IPv6 addresses.
+        self.sol_mac = [None] * size # Solicited node Ethernet addresses.
+        self.errors = {} # Row -> reason the row was rejected.
+
+    def __len__(self):
+        return len(self.ip)
+
+    # Method returns the rows that passed validation.
+    def valid_rows(self):
+        return [row for row in range(len(self.ip)) if row not in self.errors]
+
+# Function parses, validates, de-duplicates and derives the solicited node addresses of many IPv6/MAC pairs at once.
+# With dedupe False rows repeating an earlier row's addresses are kept, for callers that reject rows for other reasons too.
+def derive_bulk(ips, macs, dedupe=True):
+    if len(ips) != len(macs):
+        raise ValueError("derive_bulk() needs one MAC address per IPv6 address")
+    res = BulkAddresses(len(ips))
+    ip_vals = [0] * len(ips)
+    mac_vals = [0] * len(ips)
+    for row, (ip, mac) in enumerate(zip(ips, macs)): # Parsing text is the only per-row step.
+        ip_val = ip_to_int(ip)
+        if ip_val is None:
+            res.errors[row] = "Invalid IPv6 address."
+            continue
+        if not mac_val_check(mac):
+            res.errors[row] = "Invalid MAC address."
+            continue
+        ip_vals[row] = ip_val
+        mac_vals[row] = mac_to_int(mac)
+
+    if (len(ips) < NUMPY_ROWS) or (load_numpy() is None):
+        derive_rows(res, ip_vals, mac_vals, dedupe)
+    else:
+        derive_rows_np(res, ip_vals, mac_vals, dedupe)
+    return res
+
+# Function checks and derives the parsed rows one at a time (used when NumPy is not installed).
+def derive_rows(res, ip_vals, mac_vals, dedupe=True):
+    seen_ip = set()
+    seen_mac = set()
+    for row in range(len(ip_vals)):
+        if row in res.errors:
+            continue
+        ip, mac = ip_vals[row], mac_vals[row]
+        if not global_unicast(ip >> 64):
+            res.errors[row] = "IPv6 Global Unicast Address must start with a 2 or a 3."
+        elif dedupe and (ip in seen_ip):
+            res.errors[row] = "IPv6 Global Unicast Address was alreay assigned."
+        elif dedupe and (mac in seen_mac):
+            res.errors[row] = "The input MAC address was already assigned."
+        else:
+            if dedupe:
+                seen_ip.add(ip)
+                seen_mac.add(mac)
+            res.ip[row] = ip
+            res.mac[row] = mac
+            res.sol_ip[row] = SOL_IP_BASE | (ip & LOW_24)
+            res.sol_mac[row] = SOL_MAC_BASE | (ip & LOW_24)
+
+# Function checks and derives the parsed rows in one vectorized pass over uint64 hi/lo halves.
+def derive_rows_np(res, ip_vals, mac_vals, dedupe=True):
+    size = len(ip_vals)
+    hi = np.fromiter((ip >> 64 for ip in ip_vals), dtype=np.uint64, count=size)
+    lo = np.fromiter((ip & LOW_64 for ip in ip_vals), dtype=np.uint64, count=size)
+    mac = np.fromiter(mac_vals, dtype=np.uint64, count=size)
+
+    ok = np.ones(size, dtype=bool)
+    ok[list(res.errors)] = False
+    bad_type = ok & ~global_unicast(hi)
+    ok &= ~bad_type
+    for row in np.flatnonzero(bad_type).tolist():
+        res.errors[row] = "IPv6 Global Unicast Address must start with a 2 or a 3."
+
+    # Rows sharing their IPv6 or MAC address with another row are checked one at a time in row order, like derive_rows(): a row
+    # rejected for its MAC address does not take its IPv6 address from a later row. The other rows are unique in both columns.
+    shared = (repeated_np(ok, hi, lo) | repeated_np(ok, mac)) if dedupe else np.zeros(size, dtype=bool)
+    ok &= ~shared
+    seen_ip = set()
+    seen_mac = set()
+    for row in np.flatnonzero(shared).tolist():
+        if ip_vals[row] in seen_ip:
+            res.errors[row] = "IPv6 Global Unicast Address was alreay assigned."
+        elif mac_vals[row] in seen_mac:
+            res.errors[row] = "The input MAC address was already assigned."
+        else:
+            seen_ip.add(ip_vals[row])
+            seen_mac.add(mac_vals[row])
+            ok[row] = True
+
+    low = lo & np.uint64(LOW_24)
+    sol_ip = (low | np.uint64(SOL_IP_BASE & LOW_64)).tolist()
+    sol_mac = (low | np.uint64(SOL_MAC_BASE)).tolist()
+    mac = mac.tolist()
+    sol_hi = SOL_IP_BASE >> 64 << 64
+    for row in np.flatnonzero(ok).tolist():
+        res.ip[row] = ip_vals[row]
+        res.mac[row] = mac[row]
+        res.sol_ip[row] = sol_hi | sol_ip[row]
+        res.sol_mac[row] = sol_mac[row]
+
+# Function returns a mask of the rows (among the rows in ok) whose key columns are the same as another row's.
+def repeated_np(ok, *cols):
+    rows = np.flatnonzero(ok)
+    repeated = np.zeros(ok.shape, dtype=bool)
+    if len(rows) < 2:
+        return repeated
+    keys = [col[rows] for col in cols]
+    order = np.lexsort(keys[::-1])
+    same = np.ones(len(rows) - 1, dtype=bool)
+    for key in keys:
+        key = key[order]
+        same &= key[1:] == key[:-1]
+    repeated[rows[order[1:][same]]] = True
+    repeated[rows[order[:-1][same]]] = True
+    return repeated
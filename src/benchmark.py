@@ -0,0 +1,252 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import add_manipulation as am
+import generators
+import runner
+import simulation
+import IPv6AddRes as cli
+from topology import Topology, Device
+
+PORTS = 48 # Hosts per access switch in the connection benchmark.
+
+# Function returns count unique (IPv6 address, MAC address) strings in one /64, like the ones typed at the prompt.
+def address_strings(count, rng):
+    iids = rng.sample(range(2, 1 << 48), count)
+    macs = rng.sample(range(1 << 40), count)
+    prefix = (generators.DOC_PREFIX << 32 | 1) << 64
+    return [am.format_ip(prefix | iid) for iid in iids], [am.format_mac(generators.LOCAL_MAC | mac) for mac in macs]
+
+# Function returns a topology with count end devices (and a switch per PORTS of them, unconnected) plus their addresses.
+def host_topology(count, rng):
+    my_top = Topology()
+    ips, macs = address_strings(count, rng)
+    bulk = am.derive_bulk(ips, macs)
+    my_top.add_devices_bulk(["E" + str(ind) for ind in range(count)], "end", bulk)
+    my_top.add_devices([Device("S" + str(ind), "switch") for ind in range(count // PORTS + 1)])
+    return my_top, ips, macs
+
+# Benchmarks: each one prepares its input (not timed) and returns a function that runs the timed part and returns the number of operations.
+
+# Adding devices one at a time the way the prompt does (create_dev() then add_device()).
+def bench_insert(size, rng):
+    my_top = Topology()
+    ips, macs = address_strings(size, rng)
+    def run():
+        for ind in range(size):
+            my_top.add_device(cli.create_dev(my_top, ips[ind], macs[ind], "E" + str(ind), "end"))
+        return size
+    return run
+
+# Adding devices from lists of address strings (derive_bulk() then add_devices_bulk()).
+def bench_insert_bulk(size, rng):
+    my_top = Topology()
+    ips, macs = address_strings(size, rng)
+    names = ["E" + str(ind) for ind in range(size)]
+    def run():
+        my_top.add_devices_bulk(names, "end", am.derive_bulk(ips, macs))
+        return size
+    return run
+
+# Connecting every host to an access switch and the switches in a chain, with the checks done at the prompt.
+def bench_connect(size, rng):
+    my_top, ips, macs = host_topology(size, rng)
+    hosts = [dev for dev in my_top.top if dev.dev_type == "end"]
+    switches = [dev for dev in my_top.top if dev.dev_type == "switch"]
+    def run():
+        for ind, host in enumerate(hosts):
+            cli.connect(my_top, switches[ind // PORTS], host)
+        for ind in range(1, len(switches)):
+            cli.connect(my_top, switches[ind - 1], switches[ind])
+        return len(hosts) + len(switches) - 1
+    return run
+
+# Looking devices up by name, IPv6 address (as an integer and as a string) and MAC address.
+def bench_lookup(size, rng):
+    my_top, ips, macs = host_topology(size, rng)
+    names = ["E" + str(ind) for ind in range(size)]
+    ip_ints = [am.ip_to_int(ip) for ip in ips]
+    def run():
+        for ind in range(size):
+            my_top.find_device(names[ind])
+            my_top.find_device_ip(ip_ints[ind])
+            my_top.ip_exist(ips[ind])
+            my_top.mac_exist(macs[ind])
+        return 4 * size
+    return run
+
+# Function generates routed subnets of 50 hosts with about size devices in all (at least 2 routers, so that some pairs are
+# in the link subnet between them).
+def routed_topology(size, rng):
+    return generators.generate(Topology(), "multi-subnet", max(size // 400, 2), 8, 50, seed=rng.random())
+
+# Comparing the subnets of random pairs of devices.
+def bench_same_sub(size, rng):
+    my_top = routed_topology(size, rng)
+    devices = [dev for dev in my_top.top if dev.dev_type != "switch"]
+    pairs = [(rng.choice(devices), rng.choice(devices)) for ind in range(size)]
+    def run():
+        for dev1, dev2 in pairs:
+            dev1.same_sub(dev2)
+        return size
+    return run
+
+# Checking whether the NSs of random pairs of devices of routed subnets would reach each other, without flooding.
+def bench_reach(size, rng):
+    my_top = routed_topology(size, rng)
+    devices = [dev for dev in my_top.top if dev.dev_type != "switch"]
+    pairs = [(rng.choice(devices), rng.choice(devices)) for ind in range(size)]
+    pairs = [(dev1, dev2, am.get_prefix(rng.choice(dev2.extended))) for dev1, dev2 in pairs]
+    def run():
+        for dev1, dev2, prefix in pairs:
+            my_top.can_reach(dev1, dev2, prefix)
+        return size
+    return run
+
+# Resolving the gateway of a few hosts in one flat layer 2 domain of the given size (every NS reaches every device).
+def bench_resolve(size, rng):
+    my_top = generators.generate(Topology(), "flat", max(size // PORTS, 1), PORTS, seed=rng.random())
+    gateway = next(dev for dev in my_top.top if dev.dev_type == "router")
+    hosts = rng.sample([dev for dev in my_top.top if dev.dev_type == "end"], 10)
+    def run():
+        for host in hosts:
+            simulation.request(my_top, host, gateway, [], gateway.extended[0], None)
+        return len(hosts)
+    return run
+
+# Resolving the gateway of every host of routed subnets of 50 hosts, in this process.
+def bench_resolve_bulk(size, rng):
+    my_top = routed_topology(size, rng)
+    pairs = list(runner.gateway_pairs(my_top))
+    def run():
+        runner.resolve_pairs(my_top, pairs, workers=1)
+        return len(pairs)
+    return run
+
+BENCHMARKS = {
+    "insert": bench_insert,
+    "insert_bulk": bench_insert_bulk,
+    "connect": bench_connect,
+    "lookup": bench_lookup,
+    "same_sub": bench_same_sub,
+    "reach": bench_reach,
+    "resolve": bench_resolve,
+    "resolve_bulk": bench_resolve_bulk,
+}
+
+# Function times one benchmark at one size and returns its result (best of repeat runs, peak memory of a separate traced run).
+def measure(bench, size, repeat, seed):
+    best = None
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): # The prompt functions print as they go.
+        for run_ind in range(repeat):
+            run = bench(size, random.Random(seed))
+            start = time.perf_counter()
+            ops = run()
+            elapsed = time.perf_counter() - start
+            if (best is None) or (elapsed < best):
+                best = elapsed
+        run = bench(size, random.Random(seed))
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"ops": ops, "seconds": best, "ops_per_sec": ops / best if best else float("inf"), "peak_kib": peak // 1024}
+
+# Function starts a fresh interpreter runs times with the command line and returns the best and median wall times in seconds.
+def launch_times(command, runs):
+    times = []
+    for run_ind in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[0], times[len(times) // 2]
+
+# Function measures how long the simulator takes to start and run an empty batch script, next to the bare interpreter.
+def startup(runs):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IPv6AddRes.py")
+    python_best, python_median = launch_times([sys.executable, "-c", "pass"], runs)
+    best, median = launch_times([sys.executable, script, "--batch", os.devnull, "--trace", "quiet"], runs)
+    return {"runs": runs, "python_seconds": python_best, "seconds": best, "median_seconds": median, "overhead_seconds": best - python_best}
+
+# Function returns the (benchmark, size, baseline ops/sec, ops/sec) of the results slower than the baseline by more than threshold.
+def regressions(results, baseline, threshold):
+    slower = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            old = baseline.get(name, {}).get(size)
+            if (old is not None) and (result["ops_per_sec"] < old["ops_per_sec"] * (1 - threshold)):
+                slower.append((name, size, old["ops_per_sec"], result["ops_per_sec"]))
+    return slower
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks of the IPv6 Address Resolution Simulation")
+    parser.add_argument("-s", "--sizes", default="1000,10000,100000", help="comma separated numbers of devices (default: 1000,10000,100000)")
+    parser.add_argument("-o", "--only", help="comma separated benchmarks to run (default: all of " + ", ".join(BENCHMARKS) + ")")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="timed runs per benchmark, the best one is kept (default: 3)")
+    parser.add_argument("--startup", type=int, metavar="RUNS", help="measure the start of the simulator over RUNS launches (only that unless --only is given)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated inputs (default: 0)")
+    parser.add_argument("--save", metavar="FILE", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with a JSON baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown flagged as a regression (default: 0.2, i.e. 20%% fewer ops/sec)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    names = args.only.split(",") if args.only else ([] if args.startup else list(BENCHMARKS))
+    for name in names:
+        if name not in BENCHMARKS:
+            print("Unknown benchmark '" + name + "'.", file=sys.stderr)
+            return 2
+    baseline = old_launch = None
+    if args.compare:
+        with open(args.compare) as src:
+            saved = json.load(src)
+        baseline, old_launch = saved["results"], saved.get("startup")
+
+    launch = None
+    if args.startup:
+        launch = startup(args.startup)
+        print("Startup (best of %d): %.1fms, %.1fms more than the bare interpreter (median %.1fms)" %
+              (launch["runs"], launch["seconds"] * 1000, launch["overhead_seconds"] * 1000, launch["median_seconds"] * 1000), flush=True)
+
+    results = {}
+    if names:
+        print("%-14s %10s %14s %12s %12s" % ("benchmark", "size", "ops/sec", "seconds", "peak KiB"))
+    for name in names:
+        results[name] = {}
+        for size in sizes:
+            try:
+                result = measure(BENCHMARKS[name], size, args.repeat, args.seed)
+            except ValueError as err: # Size the benchmark's topology can not be generated for.
+                print("Benchmark '" + name + "' can not run at size " + str(size) + ": " + str(err) + ".", file=sys.stderr)
+                return 2
+            results[name][str(size)] = result # JSON keys are strings.
+            print("%-14s %10d %14.1f %12.4f %12d" % (name, size, result["ops_per_sec"], result["seconds"], result["peak_kib"]), flush=True)
+
+    if args.save:
+        with open(args.save, "w") as out:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "seed": args.seed, "results": results, "startup": launch}, out, indent=1)
+        print("Results were saved to " + args.save + ".")
+    if baseline is not None:
+        slower = regressions(results, baseline, args.threshold)
+        for name, size, old, new in slower:
+            print("REGRESSION %s (size %s): %.1f -> %.1f ops/sec (%.0f%%)" % (name, size, old, new, 100 * (new / old - 1)))
+        if (launch is not None) and (old_launch is not None) and (launch["overhead_seconds"] > old_launch["overhead_seconds"] * (1 + args.threshold)):
+            print("REGRESSION startup: %.1fms -> %.1fms more than the bare interpreter" % (old_launch["overhead_seconds"] * 1000, launch["overhead_seconds"] * 1000))
+            slower.append(("startup", None, old_launch["overhead_seconds"], launch["overhead_seconds"]))
+        if slower:
+            return 1
+        print("No regressions against " + args.compare + ".")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
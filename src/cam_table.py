@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+AGING_TIME = 300.0 # Seconds a learned MAC address stays in the table (IEEE 802.1D default).
+
+# MAC learning (CAM) table of a switch, maps source MAC addresses to the port (neighboring device) they were seen on.
+class CamTable:
+    def __init__(self, size=8192, aging=AGING_TIME):
+        self.size = size # Maximum number of entries.
+        self.aging = aging # Seconds before an entry that was not refreshed expires.
+        self.entries = OrderedDict() # MAC address -> [port, simulated time learned], oldest first.
+
+        # Counters.
+        self.hits = 0 # Unicast frames forwarded out of a single port.
+        self.misses = 0 # Unicast frames flooded because the destination was unknown.
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Method records that a frame from the MAC address arrived on the port.
+    def learn(self, mac, port, now):
+        entry = self.entries.get(mac)
+        if entry is None:
+            self.entries[mac] = [port, now]
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            entry[0], entry[1] = port, now
+            self.entries.move_to_end(mac)
+
+    # Method returns the port frames for the MAC address are forwarded out of (None if they have to be flooded).
+    def lookup(self, mac, now):
+        entry = self.entries.get(mac)
+        if entry is not None and now - entry[1] >= self.aging: # Aged out.
+            del self.entries[mac]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    # Method removes the entries learned on a port (the link went down).
+    def forget_port(self, port):
+        for mac in [mac for mac, entry in self.entries.items() if entry[0] == port]:
+            del self.entries[mac]
@@ -0,0 +1,40 @@
+from collections import defaultdict
+
+# Function finds the IPv6 and MAC addresses assigned more than once (to different devices, or twice to one device) in one pass
+# over the devices. The IPv6 addresses are grouped by solicited-node multicast group (their low 24 bits) first: nearly every group
+# holds a single address, so only the addresses of the few shared groups are compared with each other.
+# Returns the conflicts as sorted (kind, address, device names) with kind "ipv6" or "mac", and the number of solicited-node
+# groups shared by different addresses (their NSs pass each other's NIC filters and are only dropped by the IPv6 layer).
+def scan(devices):
+    # Solicited-node multicast address -> IPv6 address and device name of its first member (plain dictionaries of ints and strings
+    # are not tracked by the garbage collector, which would otherwise run many times over a large topology).
+    first_ip = {}
+    first_name = {}
+    first_mac = {} # MAC address -> name of the first device using it.
+    groups = defaultdict(list) # Shared solicited-node multicast address -> (IPv6 address, device name) of its other members.
+    macs = defaultdict(list) # Shared MAC address -> names of the other devices using it.
+    for dev in devices: # Lists are only made for shared addresses, most groups have a single member.
+        name = dev.name
+        for e_ip, sol_ip, mac in zip(dev.extended, dev.sol_ip, dev.mac_add):
+            if sol_ip in first_ip:
+                groups[sol_ip].append((e_ip, name))
+            else:
+                first_ip[sol_ip] = e_ip
+                first_name[sol_ip] = name
+            if mac in first_mac:
+                macs[mac].append(name)
+            else:
+                first_mac[mac] = name
+
+    found = []
+    shared = 0
+    for sol_ip, members in groups.items():
+        addresses = defaultdict(list) # IPv6 address -> names of the devices using it.
+        for e_ip, name in [(first_ip[sol_ip], first_name[sol_ip])] + members:
+            addresses[e_ip].append(name)
+        if len(addresses) > 1:
+            shared += 1
+        found.extend(("ipv6", e_ip, names) for e_ip, names in addresses.items() if len(names) > 1)
+    found.extend(("mac", mac, [first_mac[mac]] + names) for mac, names in macs.items())
+    found.sort()
+    return found, shared
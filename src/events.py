@@ -0,0 +1,273 @@
+import heapq
+from collections import defaultdict
+from itertools import count
+import add_manipulation as am
+import simulation
+
+# Defaults of links without their own settings (see Topology.set_link).
+LATENCY = 5e-6 # Seconds for a frame to cross a link and be switched.
+BANDWIDTH = 1e9 # Bits per second.
+FRAME_BYTES = 86 + 20 # NS/NA frame (Ethernet, IPv6 and ICMPv6 headers with the link-layer address option) plus preamble and gap.
+
+# Kinds of events.
+START = 0 # The sender starts a resolution.
+NS = 1 # An NS frame arrives at a device.
+NA = 2 # An NA frame arrives at a device.
+
+# One resolution of the event-driven simulation.
+class Resolution:
+    __slots__ = ("src", "dst", "ip", "listeners", "add_ind", "prefix", "src_mac", "dst_mac", "start", "end", "failed", "ns_seen", "na_seen", "nic_drops")
+
+    def __init__(self, src, dst, ip, listeners, start):
+        self.src = src # Device sending the NS.
+        self.dst = dst # Device with the target address.
+        self.ip = ip
+        self.listeners = listeners # Devices the NS passes the NIC filter and IPv6 layer of (see simulation.Listeners).
+        self.add_ind = dst.ip_ind(ip)
+        self.prefix = am.get_prefix(ip)
+        src_ind = src.prefix_ind(self.prefix)
+        self.src_mac = src.mac_add[src_ind] if src_ind is not None else None # Switches send the NS without a MAC address.
+        self.dst_mac = dst.mac_add[self.add_ind]
+        self.start = start # Simulated times the resolution started and ended (None while it is in progress).
+        self.end = None
+        self.failed = False
+        self.ns_seen = set() # Names of the devices that received the NS (copies arriving over a loop are dropped).
+        self.na_seen = set()
+        self.nic_drops = {} # Name of a device whose NIC filter drops the NS -> (arrival time, sequence number) of its first copy.
+
+    # Method returns how long the resolution took (None if it did not finish).
+    def latency(self):
+        return self.end - self.start if self.end is not None else None
+
+# Frame counts of a run, to see where a burst of resolutions loads the network.
+class Load:
+    __slots__ = ("tick", "links", "switches", "ticks")
+
+    def __init__(self, tick=1e-6):
+        self.tick = tick # Seconds per tick.
+        self.links = defaultdict(int) # (sending device name, receiving device name) -> frames sent over the link in that direction.
+        self.switches = defaultdict(int) # Switch name -> frames that arrived at the switch (including copies dropped over loops).
+        self.ticks = defaultdict(int) # Tick number -> frames that arrived during the tick.
+
+    # Method returns the start time and number of frames of the tick in which the most frames arrived.
+    def peak(self):
+        if not self.ticks:
+            return 0.0, 0
+        tick, frames = max(self.ticks.items(), key=lambda item: (item[1], -item[0]))
+        return tick * self.tick, frames
+
+    # Method returns the n busiest links as ((name, name), frames) with both directions added together.
+    def busiest_links(self, n):
+        both = defaultdict(int)
+        for (name1, name2), frames in self.links.items():
+            both[(name1, name2) if name1 < name2 else (name2, name1)] += frames
+        return sorted(both.items(), key=lambda item: -item[1])[:n]
+
+    # Method returns the n busiest switches as (name, frames).
+    def busiest_switches(self, n):
+        return sorted(self.switches.items(), key=lambda item: -item[1])[:n]
+
+# Event-driven simulation of many resolutions sharing the topology's links.
+# Frames are events in a heap ordered by arrival time, every link direction sends one frame at a time at its bandwidth
+# and the frames waiting for it are queued.
+class Engine:
+    def __init__(self, my_top, latency=LATENCY, bandwidth=BANDWIDTH, stats=None, use_cache=True, load=None):
+        self.top = my_top
+        self.now = my_top.clock # Simulated clock.
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.tx_time = FRAME_BYTES * 8 / bandwidth # Time to send a frame over a link with the default bandwidth.
+        self.stats = stats if stats is not None else simulation.Stats()
+        self.use_cache = use_cache # Resolutions answered by the sender's neighbor cache send no NS (caches are not used or changed if False).
+        self.load = load # Frame counts per link, switch and tick (not counted if None).
+        self.events = [] # Heap of (time, sequence number, kind, device, device the frame came from, resolution, hops).
+        self.seq = count() # Keeps events with the same time in the order they were scheduled.
+        self.now_seq = -1 # Sequence number of the event being processed.
+        self.busy = {} # (sending device name, receiving device name) -> time the link direction finishes its queued frames.
+        self.resolutions = []
+        self.processed = 0 # Number of events processed.
+        self.queue_time = 0.0 # Total and longest time frames waited for a busy link.
+        self.max_queue_time = 0.0
+        self.listeners = {} # Target IPv6 address -> simulation.Listeners, shared by the resolutions of the address.
+
+    # Method schedules the resolution of the IPv6 address from the named device at the simulated time at (now by default).
+    # Returns the resolution, or None if the pair can not be resolved (counted as failed).
+    def add(self, dev_name, ip, at=None):
+        dev1 = self.top.find_device(dev_name)
+        ip_add = am.ip_to_int(ip) if isinstance(ip, str) else ip
+        dev2 = self.top.find_device_ip(ip_add) if ip_add is not None else None
+        if (dev1 is None) or (dev2 is None) or not self.top.can_reach(dev1, dev2, am.get_prefix(ip_add)): # Rejected without a flood.
+            self.stats.failed += 1
+            return None
+        at = self.now if at is None else at
+        listeners = self.listeners.get(ip_add)
+        if listeners is None:
+            listeners = self.listeners[ip_add] = simulation.Listeners(self.top, ip_add)
+        res = Resolution(dev1, dev2, ip_add, listeners, at)
+        self.resolutions.append(res)
+        heapq.heappush(self.events, (at, next(self.seq), START, dev1, None, res, 0))
+        return res
+
+    # Method sends a frame from dev to the neighbor, after the frames already queued on the link.
+    # A frame of kind None loads the link but is not delivered (see flood()). Returns the (arrival time, sequence number) of the frame.
+    def send(self, dev, neighbor, kind, res, hops):
+        links = self.top.links
+        link = links.get((dev, neighbor)) if links else None
+        if link is None:
+            latency = self.latency
+            done = self.tx_time
+        else:
+            latency = link[0]
+            done = FRAME_BYTES * 8 / link[1]
+        key = (dev.name, neighbor.name)
+        now = self.now
+        start = self.busy.get(key, now)
+        if start > now:
+            waited = start - now
+            self.queue_time += waited
+            if waited > self.max_queue_time:
+                self.max_queue_time = waited
+            done += start
+        else:
+            done += now
+        self.busy[key] = done
+        arrival = done + latency
+        seq = next(self.seq)
+        if kind is not None:
+            heapq.heappush(self.events, (arrival, seq, kind, neighbor, dev, res, hops))
+        self.stats.frames += 1
+        load = self.load
+        if load is not None:
+            load.links[key] += 1
+            load.ticks[int(arrival / load.tick)] += 1
+            if neighbor.dev_type == "switch":
+                load.switches[neighbor.name] += 1
+        return arrival, seq
+
+    # Method processes the events in time order until none are left or the next one is after until.
+    # Resolutions still in progress when no events are left failed. Returns the number of events processed.
+    def run(self, until=None):
+        events = self.events
+        pop = heapq.heappop
+        while events and ((until is None) or (events[0][0] <= until)):
+            self.now, self.now_seq, kind, dev, from_dev, res, hops = pop(events)
+            self.processed += 1
+            if kind == NS:
+                self.receive_ns(dev, from_dev, res)
+            elif kind == NA:
+                self.receive_na(dev, from_dev, res, hops)
+            else:
+                self.start(res)
+        if not events:
+            for res in self.resolutions:
+                if (res.end is None) and not res.failed:
+                    res.failed = True
+                    if self.use_cache:
+                        res.src.neighbor_cache().fail(res.ip)
+                    self.stats.failed += 1
+                res.ns_seen = res.na_seen = res.nic_drops = None # No frames are left, free the sets of large runs.
+        if self.now > self.top.clock: # Neighbor cache and MAC table timers use the topology's clock.
+            self.top.clock = self.now
+        return self.processed
+
+    # Method starts a resolution: answers it from the neighbor cache or floods an NS out of every port in the subnet.
+    def start(self, res):
+        if self.use_cache:
+            cache = res.src.neighbor_cache()
+            if cache.lookup(res.ip, self.now) is not None:
+                res.end = self.now
+                self.stats.resolved += 1
+                self.stats.cache_hits += 1
+                return
+            cache.start(res.ip, self.now)
+        res.ns_seen.add(res.src.name)
+        self.flood(res.src, None, res)
+
+    # Method sends the NS out of every port of dev in the subnet except the one it came from.
+    # Devices whose NIC filter drops the NS are counted when the first copy is sent instead of through an event: dropping it has
+    # no other effect, and most of the frames of a storm end this way. Like the other devices they count as having received the NS
+    # once their first copy arrived (before the event being processed), so copies sent over a loop before that still load the links.
+    def flood(self, dev, from_dev, res):
+        ns_seen = res.ns_seen
+        nic_drops = res.nic_drops
+        prefix = res.prefix
+        nic = res.listeners.nic
+        stats = self.stats
+        now = (self.now, self.now_seq)
+        checks = 0
+        for neighbor in self.top.top[dev]:
+            if (neighbor is from_dev) or (neighbor.name in ns_seen):
+                continue
+            first = nic_drops.get(neighbor.name)
+            if (first is not None) and (first < now):
+                continue
+            checks += 1
+            if neighbor.dev_type == "switch": # Inlined Device.in_subnet().
+                self.send(dev, neighbor, NS, res, 1)
+            elif prefix in neighbor.prefixes:
+                if neighbor.name in nic:
+                    self.send(dev, neighbor, NS, res, 1)
+                else:
+                    arrival = self.send(dev, neighbor, None, res, 1)
+                    if first is None:
+                        nic_drops[neighbor.name] = arrival
+                        stats.visited += 1
+                        stats.drop_nic += 1
+                    elif arrival < first: # Sent later over a faster path, this copy arrives first.
+                        nic_drops[neighbor.name] = arrival
+        stats.subnet_checks += checks
+
+    # Method processes an NS arriving at dev: switches flood it, the target answers with an NA out of the port it arrived on.
+    def receive_ns(self, dev, from_dev, res):
+        ns_seen = res.ns_seen
+        if dev.name in ns_seen:
+            return
+        ns_seen.add(dev.name)
+        stats = self.stats
+        stats.visited += 1
+        outcome = simulation.receive_ns(dev, res.listeners, None)
+        if outcome == simulation.FLOODED:
+            if res.src_mac is not None:
+                dev.cam_table().learn(res.src_mac, from_dev, self.now)
+            self.flood(dev, from_dev, res)
+        elif outcome == simulation.ACCEPTED:
+            if self.use_cache and (res.src_mac is not None): # The target learns the sender from the NS source address.
+                dev.neighbor_cache().learn(res.src.extended[res.src.prefix_ind(res.prefix)], res.src_mac, self.now)
+            res.na_seen.add(dev.name)
+            self.send(dev, from_dev, NA, res, 1)
+        elif outcome == simulation.DROP_NIC:
+            stats.drop_nic += 1
+        elif outcome == simulation.DROP_IPV6:
+            stats.drop_ipv6 += 1
+        else:
+            stats.drop_icmpv6 += 1
+
+    # Method processes an NA arriving at dev: switches forward it using their MAC tables, the sender completes the resolution.
+    def receive_na(self, dev, from_dev, res, hops):
+        if dev is res.src:
+            if res.end is None:
+                res.end = self.now
+                if self.use_cache:
+                    res.src.neighbor_cache().confirm(res.ip, res.dst_mac, self.now)
+                self.stats.resolved += 1
+                self.stats.hops += hops
+            return
+        if (dev.name in res.na_seen) or (dev.dev_type != "switch"): # Other devices drop frames that are not for them.
+            return
+        res.na_seen.add(dev.name)
+        cam = dev.cam_table()
+        cam.learn(res.dst_mac, from_dev, self.now)
+        port = cam.lookup(res.src_mac, self.now) if res.src_mac is not None else None
+        for neighbor in ([port] if port is not None else self.top.top[dev]): # Forward out of the learned port or flood.
+            if (neighbor is not from_dev) and (neighbor.name not in res.na_seen):
+                self.send(dev, neighbor, NA, res, hops + 1)
+
+    # Method returns the sorted latencies of the finished resolutions.
+    def latencies(self):
+        return sorted(res.end - res.start for res in self.resolutions if res.end is not None)
+
+# Function returns the value below which the fraction p of the sorted values fall (nearest rank).
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(p * len(values) + 0.5) - 1))]
@@ -0,0 +1,121 @@
+from array import array
+from collections import deque
+from time import perf_counter
+
+TYPES = {"router": 0, "end": 1, "switch": 2} # Device type -> code in the type column.
+SWITCH = 2
+MEMBER_CACHE = 64 # Subnets and solicited-node groups whose member sets are kept between floods.
+
+# Read-only view of a topology with integer device indexes: the connections are a compressed sparse row (CSR) adjacency
+# (the neighbors of device i are neighbors[offsets[i]:offsets[i + 1]]) and the device types and subnets are columns.
+# Built by Topology.frozen() and dropped by any edit, which still goes through the Topology.
+# Only the floods without neighbor caches, MAC learning or trace events run on it ('MR' and the server's resolutions):
+# 'SS', forwarding and the event engine update per-device state and per-link loads as they go, so they flood the Topology itself.
+class FrozenTopology:
+    def __init__(self, my_top):
+        self.devices = list(my_top.top) # Device index -> Device.
+        self.index = {dev.name: ind for ind, dev in enumerate(self.devices)} # Device name -> index.
+        index = self.index
+
+        self.offsets = array("I", [0])
+        self.neighbors = array("I")
+        for connections in my_top.top.values():
+            self.neighbors.extend([index[neighbor.name] for neighbor in connections])
+            self.offsets.append(len(self.neighbors))
+
+        self.types = array("B", [TYPES[dev.dev_type] for dev in self.devices])
+        # Subnet columns: the /64 prefixes of device i are prefixes[prefix_offsets[i]:prefix_offsets[i + 1]] (as prefix ids),
+        # and the members of each subnet are listed by prefix id.
+        self.prefix_ids = {} # /64 prefix -> prefix id.
+        self.prefix_offsets = array("I", [0])
+        self.prefixes = array("I")
+        members = []
+        for ind, dev in enumerate(self.devices):
+            for prefix in dev.prefixes:
+                prefix_id = self.prefix_ids.setdefault(prefix, len(self.prefix_ids))
+                if prefix_id == len(members):
+                    members.append(array("I"))
+                members[prefix_id].append(ind)
+                self.prefixes.append(prefix_id)
+            self.prefix_offsets.append(len(self.prefixes))
+        self.members = members
+        self.member_sets = {} # Prefix id -> set of member indexes, for the subnets flooded last.
+        self.groups = my_top.groups # Solicited-node multicast address -> Devices listening to it (the topology's own index).
+        self.group_sets = {} # Solicited-node multicast address -> set of member indexes, for the groups flooded last.
+
+    # Method returns the set of indexes of the devices with an interface in the subnet.
+    def subnet_members(self, prefix_id):
+        members = self.member_sets.get(prefix_id)
+        if members is None:
+            if len(self.member_sets) >= MEMBER_CACHE:
+                self.member_sets.clear()
+            members = self.member_sets[prefix_id] = set(self.members[prefix_id])
+        return members
+
+    # Method returns the set of indexes of the devices listening to the solicited-node multicast address.
+    # Solicited node Ethernet addresses map one to one to their group, so these are also the devices whose NIC filter passes the NS.
+    def group_members(self, sol_ip):
+        members = self.group_sets.get(sol_ip)
+        if members is None:
+            if len(self.group_sets) >= MEMBER_CACHE:
+                self.group_sets.clear()
+            index = self.index
+            members = self.group_sets[sol_ip] = {index[dev.name] for dev in self.groups.get(sol_ip, ())}
+        return members
+
+    # Method floods an NS from device index src for the IPv6 address of device index dst and returns the path it took
+    # (empty if it never arrived). Same traversal and statistics as simulation.request() without trace events, neighbor caches
+    # or MAC learning: the NA retraces the NS path, which is what the switches' freshly learned MAC tables would do.
+    def request(self, src, dst, ip_add, stats=None):
+        if stats is not None:
+            start = perf_counter()
+        devices, types, offsets, neighbors = self.devices, self.types, self.offsets, self.neighbors
+        dev2 = devices[dst]
+        add_ind = dev2.ip_ind(ip_add)
+        listening = self.group_members(dev2.sol_ip[add_ind])
+        prefix_id = self.prefix_ids.get(ip_add >> 64)
+        members = self.subnet_members(prefix_id) if prefix_id is not None else set()
+
+        parent = {src: -1}
+        queue = deque([src])
+        frames = checks = drop_nic = drop_icmpv6 = 0
+        found = False
+        while queue:
+            curr = queue.popleft()
+            if curr == dst: # Also a device resolving its own address, which answers itself without flooding.
+                found = True
+                continue
+            if (curr != src) and (types[curr] != SWITCH): # Routers and end devices do not forward the NS.
+                if curr not in listening: # Group members pass both the NIC filter and the IPv6 layer.
+                    drop_nic += 1
+                elif ip_add not in devices[curr].extended:
+                    drop_icmpv6 += 1
+                continue
+            for neighbor in neighbors[offsets[curr]:offsets[curr + 1]]:
+                if neighbor not in parent:
+                    checks += 1
+                    if (types[neighbor] == SWITCH) or (neighbor in members): # Only devices in the subnet receive the NS.
+                        parent[neighbor] = curr
+                        queue.append(neighbor)
+                        frames += 1
+
+        path = []
+        if found:
+            curr = dst
+            while curr != -1:
+                path.append(curr)
+                curr = parent[curr]
+            path.reverse()
+        if stats is not None:
+            stats.frames += frames + max(len(path) - 1, 0)
+            stats.visited += len(parent) - 1
+            stats.subnet_checks += checks
+            stats.drop_nic += drop_nic
+            stats.drop_icmpv6 += drop_icmpv6
+            if found:
+                stats.resolved += 1
+                stats.hops += len(path) - 1
+            else:
+                stats.failed += 1
+            stats.flood_time += perf_counter() - start
+        return path
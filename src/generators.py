@@ -0,0 +1,184 @@
+import random
+from topology import Device, PausedGc
+
+DOC_PREFIX = 0x20010db8 # 2001:db8::/32, the documentation prefix. Subnet n is 2001:db8:<n as 32 bits>::/64.
+ROUTER_IID = 1 # Routers use ::1 in each of their subnets.
+LOCAL_MAC = 0x020000000000 # Locally administered bit (keeps generated MACs out of 33-33-xx multicast MACs).
+GROUP_MAC = 0x010000000000 # Multicast bit, cleared in generated MACs.
+
+# Collects generated devices and their connections, then adds them to a topology in one go (see Topology.add_devices).
+class Builder:
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed) # Every random choice goes through this so a seed always gives the same topology.
+        self.devices = []
+        self.links = {} # Device -> connections.
+        self.counts = {"router": 0, "end": 0, "switch": 0} # Used to number the device names.
+        self.ips = set() # Addresses already handed out.
+        self.macs = set()
+        self.subnets = 0 # Number of subnets handed out.
+
+    # Method returns the /64 prefix (as an integer) of a new subnet.
+    def subnet(self):
+        self.subnets += 1
+        return (DOC_PREFIX << 32) | self.subnets
+
+    # Method returns a new random unicast MAC address.
+    def mac(self):
+        mac = (self.rng.getrandbits(48) | LOCAL_MAC) & ~GROUP_MAC
+        while mac in self.macs:
+            mac = (self.rng.getrandbits(48) | LOCAL_MAC) & ~GROUP_MAC
+        self.macs.add(mac)
+        return mac
+
+    # Method returns a new address in the /64 prefix with a random interface identifier (::1 for routers).
+    def ip(self, prefix, router=False):
+        ip = (prefix << 64) | ROUTER_IID
+        while (not router) or (ip in self.ips): # ::0 is the subnet-router anycast address and ::1 is kept for routers.
+            router = True
+            ip = (prefix << 64) | (self.rng.getrandbits(64) | 2)
+        self.ips.add(ip)
+        return ip
+
+    # Method creates a device with one interface in each of the prefixes and returns it.
+    def device(self, dev_type, prefixes=()):
+        self.counts[dev_type] += 1
+        name = dev_type[0].upper() + str(self.counts[dev_type])
+        ips = [self.ip(prefix, dev_type == "router") for prefix in prefixes]
+        dev = Device(name, dev_type, ips, [self.mac() for ip in ips])
+        self.devices.append(dev)
+        self.links[dev] = []
+        return dev
+
+    # Method connects two devices.
+    def connect(self, dev1, dev2):
+        self.links[dev1].append(dev2)
+        self.links[dev2].append(dev1)
+
+    # Method creates count end devices in the prefix and connects them to the switch.
+    def hosts(self, switch, prefix, count):
+        for host in range(count):
+            self.connect(switch, self.device("end", [prefix]))
+
+    # Method replaces the devices of the topology with the generated ones.
+    def build(self, my_top):
+        my_top.clear()
+        my_top.add_devices(self.devices, [self.links[dev] for dev in self.devices])
+        return my_top
+
+# Function builds a leaf-spine fabric: every leaf switch is connected to every spine switch (a loop for every two spines)
+# and holds a gateway router and the hosts of its own subnet.
+def leaf_spine(my_top, spines=2, leaves=4, hosts=8, seed=0):
+    gen = Builder(seed)
+    spine_devs = [gen.device("switch") for spine in range(spines)]
+    for leaf in range(leaves):
+        prefix = gen.subnet()
+        leaf_dev = gen.device("switch")
+        for spine_dev in spine_devs:
+            gen.connect(leaf_dev, spine_dev)
+        gen.connect(leaf_dev, gen.device("router", [prefix]))
+        gen.hosts(leaf_dev, prefix, hosts)
+    return gen.build(my_top)
+
+# Function builds a tree of switches (depth levels below the root, fanout children per switch) in one subnet.
+# The gateway router is connected to the root switch and the hosts to the switches of the last level.
+def switch_tree(my_top, depth=3, fanout=2, hosts=4, seed=0):
+    gen = Builder(seed)
+    prefix = gen.subnet()
+    level = [gen.device("switch")]
+    gen.connect(level[0], gen.device("router", [prefix]))
+    for depth_ind in range(depth):
+        children = []
+        for parent in level:
+            for child in range(fanout):
+                child = gen.device("switch")
+                gen.connect(parent, child)
+                children.append(child)
+        level = children
+    for switch in level:
+        gen.hosts(switch, prefix, hosts)
+    return gen.build(my_top)
+
+# Function builds a flat layer 2 domain: access switches with hosts each, connected to one core switch and the gateway router.
+def flat_l2(my_top, switches=4, hosts=16, seed=0):
+    gen = Builder(seed)
+    prefix = gen.subnet()
+    core = gen.device("switch")
+    gen.connect(core, gen.device("router", [prefix]))
+    for switch in range(switches):
+        access = gen.device("switch")
+        gen.connect(core, access)
+        gen.hosts(access, prefix, hosts)
+    return gen.build(my_top)
+
+# Function builds a chain of routers with an interface in each of their subnets, one switch with hosts per subnet.
+# Each router also has an interface in a link subnet shared with the next router.
+def multi_subnet(my_top, routers=2, interfaces=4, hosts=8, seed=0):
+    gen = Builder(seed)
+    prev = None
+    link_prefix = None # Subnet shared with the previous router.
+    for router_ind in range(routers):
+        prefixes = [gen.subnet() for interface in range(interfaces)]
+        router_prefixes = list(prefixes)
+        if link_prefix is not None:
+            router_prefixes.append(link_prefix)
+        next_prefix = None # The last router has no next router to share a subnet with.
+        if router_ind < routers - 1:
+            next_prefix = gen.subnet()
+            router_prefixes.append(next_prefix)
+        router = gen.device("router", router_prefixes)
+        if prev is not None:
+            gen.connect(prev, router)
+        for prefix in prefixes:
+            switch = gen.device("switch")
+            gen.connect(router, switch)
+            gen.hosts(switch, prefix, hosts)
+        prev, link_prefix = router, next_prefix
+    return gen.build(my_top)
+
+# Function builds a random connected graph of switches in one subnet: a random spanning tree plus extra links (each one adds a loop).
+# The gateway router and the hosts are connected to random switches.
+def random_graph(my_top, switches=16, hosts=64, extra_links=8, seed=0):
+    if switches < 1: # The router and the hosts need a switch to attach to.
+        raise ValueError("random needs switches to be at least 1, not " + str(switches))
+    gen = Builder(seed)
+    prefix = gen.subnet()
+    switch_devs = []
+    neighbors = set() # Connected switch pairs, so that no link is added twice.
+    for switch_ind in range(switches):
+        switch = gen.device("switch")
+        if switch_devs: # Attach to a random earlier switch to keep the graph connected.
+            parent = gen.rng.randrange(switch_ind)
+            gen.connect(switch_devs[parent], switch)
+            neighbors.add((parent, switch_ind))
+        switch_devs.append(switch)
+    max_links = switches * (switches - 1) // 2 - (switches - 1)
+    for link in range(min(extra_links, max_links)):
+        dev1, dev2 = sorted(gen.rng.sample(range(switches), 2))
+        while (dev1, dev2) in neighbors:
+            dev1, dev2 = sorted(gen.rng.sample(range(switches), 2))
+        gen.connect(switch_devs[dev1], switch_devs[dev2])
+        neighbors.add((dev1, dev2))
+    gen.connect(gen.rng.choice(switch_devs), gen.device("router", [prefix]))
+    for host in range(hosts):
+        gen.connect(gen.rng.choice(switch_devs), gen.device("end", [prefix]))
+    return gen.build(my_top)
+
+# Generators by name, with the order of their size arguments and the smallest value of each.
+GENERATORS = {
+    "leaf-spine": (leaf_spine, (("spines", 1), ("leaves", 1), ("hosts", 0))),
+    "tree": (switch_tree, (("depth", 0), ("fanout", 1), ("hosts", 0))),
+    "flat": (flat_l2, (("switches", 0), ("hosts", 0))),
+    "multi-subnet": (multi_subnet, (("routers", 1), ("interfaces", 1), ("hosts", 0))),
+    "random": (random_graph, (("switches", 1), ("hosts", 0), ("extra_links", 0))),
+}
+
+# Function builds the named topology (sizes in the order listed in GENERATORS) and returns it.
+def generate(my_top, kind, *sizes, seed=0):
+    build, params = GENERATORS[kind]
+    if len(sizes) > len(params):
+        raise ValueError(kind + " takes at most " + str(len(params)) + " sizes (" + ", ".join(param for param, minimum in params) + ")")
+    for size, (param, minimum) in zip(sizes, params):
+        if size < minimum:
+            raise ValueError(kind + " needs " + param + " to be at least " + str(minimum) + ", not " + str(size))
+    with PausedGc():
+        return build(my_top, *sizes, seed=seed)
@@ -0,0 +1,174 @@
+import csv
+from itertools import islice
+import add_manipulation as am
+from topology import Device, PausedGc
+
+# Inventory files are CSV exports, read one row at a time (a header row, blank lines and lines starting with '#' are skipped):
+#   devices   name,type,ipv6,mac                          one row per address: more rows for a router add addresses to it,
+#                                                         switches leave ipv6 and mac empty
+#   links     device1,device2[,latency_us,bandwidth_mbps] the devices must already be in the topology
+# Only one chunk of device rows is held at a time, so files much larger than memory can be imported into a topology that fits.
+CHUNK = 10000 # Device rows validated and added to the topology at a time.
+TYPES = ("router", "end", "switch")
+
+# Counts of what an import added and rejected.
+class Report:
+    __slots__ = ("files", "devices", "addresses", "connections", "rejected")
+
+    def __init__(self):
+        self.files = 0 # Files opened.
+        self.devices = 0
+        self.addresses = 0
+        self.connections = 0
+        self.rejected = 0 # Rows that were reported and skipped.
+
+# Function opens a CSV file and returns an iterator of (line number, fields) over its rows, without the header row (first field
+# is header), blank lines and comments. The file is opened here so that a missing file is reported before anything is imported.
+def read_rows(path, header):
+    return csv_rows(open(path, newline=""), header)
+
+# Function yields the rows of an open CSV file for read_rows() and closes it. Raises ValueError if the file is not valid CSV.
+def csv_rows(src, header):
+    with src:
+        reader = csv.reader(src)
+        first = True
+        try:
+            for fields in reader:
+                fields = [field.strip() for field in fields]
+                if not any(fields) or fields[0].startswith("#"):
+                    continue
+                if first and (fields[0].lower() == header):
+                    first = False
+                    continue
+                first = False
+                yield reader.line_num, fields
+        except csv.Error as err:
+            raise ValueError("line " + str(reader.line_num) + ": " + str(err))
+
+# Function imports the device rows of a CSV file in chunks of chunk_size rows. Rejected rows are passed to
+# on_error(path, line number, reason) and counted in report.
+def import_devices(my_top, path, report, on_error, chunk_size=CHUNK):
+    rows = read_rows(path, "name")
+    report.files += 1
+    with PausedGc():
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            add_chunk(my_top, path, chunk, report, on_error)
+    return report
+
+# Function validates one chunk of device rows and adds the new devices to the topology at once.
+# The rows are checked in order like the prompt checks them, against the topology and the rows of the chunk accepted before them.
+def add_chunk(my_top, path, chunk, report, on_error):
+    errors = [] # (line number, reason) of the rejected rows, reported in line order once the chunk is done.
+    rows = [] # (line number, name, type, row in the derived addresses or None for a switch)
+    ips = []
+    macs = []
+    for line_no, fields in chunk:
+        name, dev_type, ip, mac = (fields + ["", "", ""])[:4]
+        dev_type = dev_type.lower()
+        if len(fields) > 4:
+            reason = "Expected name,type,ipv6,mac."
+        elif not name:
+            reason = "Missing device name."
+        elif dev_type not in TYPES:
+            reason = "Unknown device type '" + dev_type + "'."
+        elif dev_type == "switch":
+            reason = "Switches do not have addresses." if (ip or mac) else None
+        else:
+            reason = "Missing IPv6 or MAC address." if not (ip and mac) else None
+        if reason is not None:
+            errors.append((line_no, reason))
+        elif dev_type == "switch":
+            rows.append((line_no, name, dev_type, None))
+        else:
+            rows.append((line_no, name, dev_type, len(ips)))
+            ips.append(ip)
+            macs.append(mac)
+
+    bulk = am.derive_bulk(ips, macs, dedupe=False) # Parses the addresses, duplicates are checked below with the rest.
+    new = {} # Name -> device created by this chunk.
+    new_ips = set() # Addresses of the rows accepted so far, not indexed by the topology until the end of the chunk.
+    new_macs = set()
+    new_groups = set() # Solicited-node multicast addresses of the rows accepted so far.
+    for line_no, name, dev_type, row in rows:
+        dev = new.get(name)
+        if dev is None:
+            dev = my_top.find_device(name)
+        if (row is not None) and (row in bulk.errors):
+            reason = bulk.errors[row]
+        elif (dev is not None) and ((row is None) or (dev_type != "router") or (dev.dev_type != "router")): # Only routers have several addresses.
+            reason = "This device already exits."
+        elif (row is not None) and ((bulk.ip[row] in my_top.ips) or (bulk.ip[row] in new_ips)):
+            reason = "IPv6 Global Unicast Address was alreay assigned."
+        elif (row is not None) and (my_top.mac_taken(bulk.mac[row]) or (bulk.mac[row] in new_macs) or (am.sol_mac_to_ip(bulk.mac[row]) in new_groups)):
+            reason = "The input MAC address was already assigned."
+        else:
+            reason = None
+        if reason is not None:
+            errors.append((line_no, reason))
+            continue
+
+        if dev is None:
+            if row is None:
+                dev = Device(name, dev_type)
+            else:
+                dev = Device(name, dev_type, [bulk.ip[row]], [bulk.mac[row]], [bulk.sol_ip[row]], [bulk.sol_mac[row]])
+            new[name] = dev
+            report.devices += 1
+        elif name in new: # Indexed with the rest of the chunk.
+            dev.add_address(bulk.ip[row], bulk.mac[row])
+        else:
+            my_top.add_ip(dev, bulk.ip[row], bulk.mac[row])
+        if row is not None:
+            new_ips.add(bulk.ip[row])
+            new_macs.add(bulk.mac[row])
+            new_groups.add(bulk.sol_ip[row])
+            report.addresses += 1
+    my_top.add_devices(list(new.values()))
+
+    errors.sort()
+    for line_no, reason in errors:
+        report.rejected += 1
+        on_error(path, line_no, reason)
+
+# Function imports the link rows of a CSV file one at a time. Rejected rows are passed to on_error(path, line number, reason)
+# and counted in report.
+def import_links(my_top, path, report, on_error):
+    rows = read_rows(path, "device1")
+    report.files += 1
+    for line_no, fields in rows:
+        reason = add_link(my_top, fields)
+        if reason is None:
+            report.connections += 1
+        else:
+            report.rejected += 1
+            on_error(path, line_no, reason)
+    return report
+
+# Function connects the devices of a link row, with its latency and bandwidth if given.
+# Returns the reason the row was rejected (None if it was added).
+def add_link(my_top, fields):
+    if len(fields) not in (2, 4):
+        return "Expected device1,device2[,latency_us,bandwidth_mbps]."
+    dev1, dev2 = my_top.find_device(fields[0]), my_top.find_device(fields[1])
+    if (dev1 is None) or (dev2 is None):
+        return "Device is not in the network."
+    if dev1 == dev2:
+        return "Cannot connect a device to itself."
+    if my_top.check_connection(dev1, dev2):
+        return "Connection already exists."
+    if not dev1.same_sub(dev2):
+        return "Devices have no IP addresses in the same subnet."
+    if len(fields) == 4:
+        try:
+            latency, bandwidth = float(fields[2]), float(fields[3])
+        except ValueError:
+            return "Latency and bandwidth must be numbers."
+        if (latency < 0) or (bandwidth <= 0):
+            return "Latency must not be negative and bandwidth must be positive."
+    my_top.add_connection(dev1, dev2)
+    if len(fields) == 4:
+        my_top.set_link(dev1, dev2, latency / 1e6, bandwidth * 1e6)
+    return None
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+
+# Neighbor cache entry states (RFC 4861, section 7.3.2).
+INCOMPLETE = "INCOMPLETE" # Address resolution is in progress, the link-layer address is not known yet.
+REACHABLE = "REACHABLE" # The neighbor was recently confirmed reachable.
+STALE = "STALE" # The neighbor is no longer known to be reachable, traffic still uses the cached address.
+DELAY = "DELAY" # Traffic was sent to a STALE neighbor, waiting before probing.
+PROBE = "PROBE" # Reachability is being confirmed with unicast NS probes.
+
+# Protocol constants in simulated seconds (RFC 4861, section 10).
+REACHABLE_TIME = 30.0
+DELAY_FIRST_PROBE_TIME = 5.0
+RETRANS_TIMER = 1.0
+MAX_UNICAST_SOLICIT = 3
+
+# Neighbor cache entry.
+class CacheEntry:
+    __slots__ = ("mac", "state", "updated")
+
+    def __init__(self, mac, state, now):
+        self.mac = mac # Link-layer (MAC) address of the neighbor, None while INCOMPLETE.
+        self.state = state # Reachability state.
+        self.updated = now # Simulated time of the last state change.
+
+# Per-device cache of resolved IPv6 -> MAC addresses with bounded size and LRU eviction.
+class NeighborCache:
+    def __init__(self, size=256):
+        self.size = size # Maximum number of entries.
+        self.entries = OrderedDict() # IPv6 address -> CacheEntry, least recently used first.
+
+        # Counters.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Method moves the entry to the state its timers lead to at the simulated time now.
+    # Returns False if the entry timed out and was removed.
+    def age(self, ip, entry, now):
+        if entry.state == REACHABLE and now - entry.updated >= REACHABLE_TIME:
+            entry.state, entry.updated = STALE, entry.updated + REACHABLE_TIME
+        if entry.state == DELAY and now - entry.updated >= DELAY_FIRST_PROBE_TIME:
+            entry.state, entry.updated = PROBE, entry.updated + DELAY_FIRST_PROBE_TIME
+        if entry.state == PROBE and now - entry.updated >= MAX_UNICAST_SOLICIT * RETRANS_TIMER: # Probes went unanswered.
+            del self.entries[ip]
+            return False
+        return True
+
+    # Method returns the cached MAC address to send traffic for the IPv6 address to (None on a miss).
+    def lookup(self, ip, now):
+        entry = self.entries.get(ip)
+        if entry is None or entry.mac is None or not self.age(ip, entry, now):
+            self.misses += 1
+            return None
+        if entry.state == STALE: # Sending to a STALE neighbor starts the DELAY timer.
+            entry.state, entry.updated = DELAY, now
+        self.entries.move_to_end(ip)
+        self.hits += 1
+        return entry.mac
+
+    # Method returns the state of the entry for the IPv6 address at the simulated time now (None if there is no entry).
+    def state(self, ip, now):
+        entry = self.entries.get(ip)
+        if entry is None or not self.age(ip, entry, now):
+            return None
+        return entry.state
+
+    # Method stores an entry, evicting the least recently used entries when the cache is full.
+    def store(self, ip, mac, state, now):
+        entry = self.entries.get(ip)
+        if entry is None:
+            self.entries[ip] = CacheEntry(mac, state, now)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            entry.mac, entry.state, entry.updated = mac, state, now
+            self.entries.move_to_end(ip)
+
+    # Method records that address resolution for the IPv6 address started.
+    def start(self, ip, now):
+        entry = self.entries.get(ip)
+        if entry is None or entry.mac is None:
+            self.store(ip, None, INCOMPLETE, now)
+
+    # Method records that address resolution for the IPv6 address failed.
+    def fail(self, ip):
+        entry = self.entries.get(ip)
+        if entry is not None and entry.state == INCOMPLETE:
+            del self.entries[ip]
+
+    # Method records a solicited NA from the neighbor, confirming it is reachable.
+    def confirm(self, ip, mac, now):
+        self.store(ip, mac, REACHABLE, now)
+
+    # Method records the neighbor's address learned from an unsolicited packet (the source of an NS).
+    def learn(self, ip, mac, now):
+        entry = self.entries.get(ip)
+        if entry is None or entry.mac != mac: # A new or changed link-layer address is not confirmed yet.
+            self.store(ip, mac, STALE, now)
@@ -0,0 +1,48 @@
+# Switches flood NSs of every subnet, so the devices an NS can reach are the ones attached to the same segment (group of
+# connected switches) as the sender, plus the sender's direct neighbors. Routers and end devices never forward an NS.
+# The segments are kept in a union-find of switch names: connecting two switches merges their segments right away,
+# disconnecting or removing switches only marks the segments stale and they are rebuilt on the next query.
+class Segments:
+    def __init__(self):
+        self.parent = {} # Switch name -> name of its parent in the union-find (roots are their own parent).
+        self.size = {} # Root switch name -> number of switches in its segment.
+        self.stale = False # True when the segments must be rebuilt from the topology.
+
+    # Method returns the name of the root switch of the switch's segment.
+    def find(self, name):
+        parent = self.parent
+        root = parent.setdefault(name, name)
+        while parent[root] != root:
+            root = parent[root]
+        while parent[name] != root: # Path compression.
+            parent[name], name = root, parent[name]
+        return root
+
+    # Method merges the segments of two switches.
+    def union(self, name1, name2):
+        root1, root2 = self.find(name1), self.find(name2)
+        if root1 == root2:
+            return
+        size1, size2 = self.size.get(root1, 1), self.size.get(root2, 1)
+        if size1 < size2: # Union by size.
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] = size1 + size2
+        self.size.pop(root2, None)
+
+    # Method rebuilds the segments from the switch to switch connections of the topology.
+    def rebuild(self, top):
+        self.parent = {}
+        self.size = {}
+        self.stale = False
+        for dev, connections in top.items():
+            if dev.dev_type == "switch":
+                for neighbor in connections:
+                    if neighbor.dev_type == "switch":
+                        self.union(dev.name, neighbor.name)
+
+    # Method returns the roots of the segments a device is attached to (a switch is in its own segment).
+    def attached(self, top, dev):
+        if dev.dev_type == "switch":
+            return {self.find(dev.name)}
+        return {self.find(neighbor.name) for neighbor in top[dev] if neighbor.dev_type == "switch"}
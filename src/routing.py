@@ -0,0 +1,62 @@
+from collections import deque
+
+# Routing tables of the routers, built from the /64 prefixes of their interfaces. Two routers with an interface in the same
+# subnet are neighbors if an NS from one reaches the other there, and each router routes every subnet of the other routers
+# through its neighbor on a shortest path (fewest routers) to one of them, like a link-state protocol would. Hosts send
+# everything outside their own subnets to a default router on their links.
+# Built by Topology.routing() on the first lookup after an edit, tables are only built for the devices that forward a packet.
+class RoutingTables:
+    def __init__(self, my_top):
+        self.top = my_top
+        self.adjacent = {} # Router -> [(neighbor router, its IPv6 address in the shared subnet)].
+        self.tables = {} # Router -> {prefix: (next hop router, its IPv6 address), None for the router's own subnets}.
+        self.gateways = {} # Host -> (default router, its IPv6 address), None if no router is on the host's links.
+
+    # Method returns the routers reached by an NS from a device in its subnets, with their IPv6 address in the shared subnet.
+    # Sorted by subnet and name so that ties between equally short routes are broken the same way in every run.
+    def on_link_routers(self, dev):
+        found = []
+        for prefix in sorted(dev.prefixes):
+            for router in sorted(self.top.subnet_devices(prefix), key=lambda other: other.name):
+                if (router.dev_type == "router") and self.top.can_reach(dev, router, prefix):
+                    found.append((router, router.extended[router.prefix_ind(prefix)]))
+        return found
+
+    # Method returns the neighbor routers of a router.
+    def neighbors(self, router):
+        found = self.adjacent.get(router)
+        if found is None:
+            found = self.adjacent[router] = self.on_link_routers(router)
+        return found
+
+    # Method returns the routing table of a router (breadth-first over the routers, so the first route found is a shortest one).
+    def table(self, router):
+        table = self.tables.get(router)
+        if table is not None:
+            return table
+        table = self.tables[router] = dict.fromkeys(router.prefixes)
+        first_hop = {router: None} # Router reached -> neighbor of router the route to it starts with.
+        queue = deque([router])
+        while queue:
+            curr = queue.popleft()
+            for neighbor, neighbor_ip in self.neighbors(curr):
+                if neighbor not in first_hop:
+                    hop = first_hop[neighbor] = (neighbor, neighbor_ip) if curr == router else first_hop[curr]
+                    for prefix in neighbor.prefixes:
+                        table.setdefault(prefix, hop)
+                    queue.append(neighbor)
+        return table
+
+    # Method returns the default router of a host.
+    def gateway(self, dev):
+        if dev not in self.gateways:
+            routers = self.on_link_routers(dev)
+            self.gateways[dev] = routers[0] if routers else None
+        return self.gateways[dev]
+
+    # Method returns the (device, IPv6 address) a device sends a packet for the /64 prefix to, None if it has no route.
+    # Only called for prefixes outside the device's own subnets.
+    def next_hop(self, dev, prefix):
+        if dev.dev_type == "router":
+            return self.table(dev).get(prefix)
+        return self.gateway(dev)
@@ -0,0 +1,76 @@
+import simulation
+import add_manipulation as am
+
+# Topology of the worker process, set once per worker by init_worker() instead of being sent with every task.
+worker_top = None
+
+# Function stores the topology in a worker process.
+def init_worker(my_top):
+    global worker_top
+    worker_top = my_top
+
+# Function resolves one (sender name, target IPv6 address) pair with a fresh NS flood on the frozen view of the topology,
+# counting it in stats. Pairs the NS can not reach fail without a flood.
+# Returns the devices on the path from the sender to the target (empty if the resolution failed).
+def resolve_pair(my_top, dev_name, ip, stats):
+    dev1 = my_top.find_device(dev_name)
+    ip_add = am.ip_to_int(ip) if isinstance(ip, str) else ip
+    dev2 = my_top.find_device_ip(ip_add) if ip_add is not None else None
+    if (dev1 is None) or (dev2 is None) or not my_top.can_reach(dev1, dev2, am.get_prefix(ip_add)): # The NS would never reach the target.
+        stats.failed += 1
+        return []
+    view = my_top.frozen()
+    return [view.devices[ind] for ind in view.request(view.index[dev1.name], view.index[dev2.name], ip_add, stats)]
+
+# Function resolves a chunk of pairs against the worker's topology and returns their statistics.
+def resolve_chunk(pairs):
+    stats = simulation.Stats()
+    for dev_name, ip in pairs:
+        resolve_pair(worker_top, dev_name, ip, stats)
+    return stats
+
+# Function resolves every (sender name, target IPv6 address) pair and returns the aggregate statistics.
+# The pairs are split in chunks and resolved by a pool of worker processes (workers=1 resolves them in this process).
+# Neighbor caches are not used, every pair floods its own NS.
+def resolve_pairs(my_top, pairs, workers=None, chunk_size=512):
+    pairs = list(pairs)
+    if workers == 1 or len(pairs) <= chunk_size:
+        init_worker(my_top)
+        return resolve_chunk(pairs)
+
+    import concurrent.futures # Imported here, runs resolving in this process do not pay for it.
+    chunks = [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+    stats = simulation.Stats()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(my_top,)) as pool:
+        for part in pool.map(resolve_chunk, chunks):
+            stats.merge(part)
+    return stats
+
+# Function returns a (host name, router address) pair for every end device and every router address in its subnets.
+def gateway_pairs(my_top):
+    for dev in my_top.top:
+        if dev.dev_type != "end":
+            continue
+        for prefix in dev.prefixes:
+            for gateway in my_top.subnet_devices(prefix):
+                if gateway.dev_type == "router":
+                    for ip in gateway.extended:
+                        if am.get_prefix(ip) == prefix:
+                            yield dev.name, ip
+
+# Function returns a (sender name, target address) pair for every two different devices sharing a subnet.
+def subnet_pairs(my_top):
+    for prefix, members in my_top.subnets.items():
+        targets = [ip for dev in members for ip in dev.extended if am.get_prefix(ip) == prefix]
+        for dev in members:
+            for ip in targets:
+                if ip not in dev.extended:
+                    yield dev.name, ip
+
+# Function returns the (sender name, target IPv6 address) pairs listed one per line in a file.
+def read_pairs(path):
+    with open(path) as pairs:
+        for line in pairs:
+            words = line.split()
+            if len(words) == 2 and not words[0].startswith("#"):
+                yield words[0], words[1]
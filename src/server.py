@@ -0,0 +1,274 @@
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import add_manipulation as am
+import runner
+import simulation
+
+# Line-delimited JSON protocol: every request is one JSON object on its own line, answered by one JSON object on its own line
+# (in order, per connection):
+#   {"id": 1, "op": "resolve", "src": "E2", "ip": "2001:2::21"}
+#   {"id": 1, "ok": true, "result": {"resolved": true, "path": ["E2", "S1", "R2"], "mac": "43-43-53-45-34-43", ...}}
+# Failed requests are answered with {"id": ..., "ok": false, "error": message}. The id is optional and copied as is.
+#
+# Operations and their fields:
+#   resolve            src, ip                  NS flood on the frozen view (no neighbor caches or MAC learning, like 'MR')
+#   device             name                     addresses and connections of a device
+#   add_device         type, name, ip, mac      type is "router", "end" or "switch" (switches have no ip or mac)
+#   remove_device      name
+#   add_connection     devices                  list of two device names
+#   remove_connection  devices
+#   add_ip             name, ip, mac            routers only
+#   remove_ip          name, ip
+# Edits run the same options as a batch script and answer with what the option printed as "output".
+
+DEVICE_OPTIONS = {"router": "AR", "end": "AE", "switch": "AS"} # Device type -> batch option adding it.
+WORKERS = 4 # Threads running read-only requests.
+
+# Output buffer of each thread, None unless the thread is running an edit.
+class ThreadOutput(threading.local):
+    def __init__(self):
+        self.buffer = None
+
+# Stream standing in for sys.stdout while serving: what a thread prints goes to its buffer, or to the replaced stream
+# if it has none. Edits capture what their option prints without taking the output of the other threads with it.
+class ThreadStdout:
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = ThreadOutput()
+
+    def write(self, text):
+        return (self.local.buffer or self.stream).write(text)
+
+    def flush(self):
+        (self.local.buffer or self.stream).flush()
+
+    def __getattr__(self, name): # Everything else (encoding, isatty, ...) is the replaced stream's.
+        return getattr(self.stream, name)
+
+    # Method runs the function with what this thread prints going to a new buffer and returns the buffer's text.
+    def capture(self, function, *args):
+        self.local.buffer = io.StringIO()
+        try:
+            function(*args)
+            return self.local.buffer.getvalue()
+        finally:
+            self.local.buffer = None
+
+# Request that can not be run (missing or invalid fields, unknown operation).
+class RequestError(Exception):
+    pass
+
+# Lock letting any number of readers or a single writer in at a time. Waiting writers go before new readers,
+# so a steady stream of resolutions can not hold edits back forever.
+class RWLock:
+    def __init__(self):
+        self.cond = asyncio.Condition()
+        self.readers = 0 # Readers holding the lock.
+        self.writing = False # True while a writer holds the lock.
+        self.waiting = 0 # Writers waiting for the lock.
+
+    @contextlib.asynccontextmanager
+    async def read(self):
+        async with self.cond:
+            await self.cond.wait_for(lambda: not self.writing and not self.waiting)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            async with self.cond:
+                self.readers -= 1
+                self.cond.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def write(self):
+        async with self.cond:
+            self.waiting += 1
+            await self.cond.wait_for(lambda: not self.writing and not self.readers)
+            self.waiting -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            async with self.cond:
+                self.writing = False
+                self.cond.notify_all()
+
+# Function returns a field of a request that must be a string.
+def field(request, name):
+    value = request.get(name)
+    if not isinstance(value, str):
+        raise RequestError("Field '" + name + "' must be a string.")
+    return value
+
+# Function returns the two device names of a connection request.
+def pair(request):
+    names = request.get("devices")
+    if not (isinstance(names, list) and len(names) == 2 and all(isinstance(name, str) for name in names)):
+        raise RequestError("Field 'devices' must be a list of two device names.")
+    return names
+
+# Function returns the words of the batch option that runs an edit request.
+def option_words(request):
+    match request.get("op"):
+        case "add_device":
+            dev_type = field(request, "type")
+            if dev_type not in DEVICE_OPTIONS:
+                raise RequestError("Field 'type' must be 'router', 'end' or 'switch'.")
+            if dev_type == "switch":
+                return [DEVICE_OPTIONS[dev_type], field(request, "name")]
+            return [DEVICE_OPTIONS[dev_type], field(request, "name"), field(request, "ip"), field(request, "mac")]
+        case "remove_device":
+            return ["RD", field(request, "name")]
+        case "add_connection":
+            return ["AC"] + pair(request)
+        case "remove_connection":
+            return ["RC"] + pair(request)
+        case "add_ip":
+            return ["AI", field(request, "name"), field(request, "ip"), field(request, "mac")]
+        case "remove_ip":
+            return ["RI", field(request, "name"), field(request, "ip")]
+    return None
+
+# Function resolves the address of a request from the sender on the frozen view of the topology (see runner.resolve_pair).
+def resolve(my_top, request):
+    src, ip = field(request, "src"), field(request, "ip")
+    if my_top.find_device(src) is None:
+        raise RequestError("Device '" + src + "' is not in the topology.")
+    ip_add = am.ip_to_int(ip)
+    target = my_top.find_device_ip(ip_add) if ip_add is not None else None
+    if target is None:
+        raise RequestError("None of the devices in the topology have the IPv6 address '" + ip + "'.")
+    stats = simulation.Stats()
+    path = runner.resolve_pair(my_top, src, ip_add, stats)
+    return {
+        "resolved": bool(path),
+        "path": [dev.name for dev in path],
+        "mac": am.format_mac(target.mac_add[target.ip_ind(ip_add)]) if path else None,
+        "frames": stats.frames,
+        "visited": stats.visited,
+    }
+
+# Function returns the addresses and connections of the device named in a request.
+def device(my_top, request):
+    dev = my_top.find_device(field(request, "name"))
+    if dev is None:
+        raise RequestError("Device '" + request["name"] + "' is not in the topology.")
+    return {
+        "name": dev.name,
+        "type": dev.dev_type,
+        "ips": [am.format_ip(ip) for ip in dev.extended],
+        "sol_ips": [am.format_sol_ip(ip) for ip in dev.sol_ip],
+        "macs": [am.format_mac(mac) for mac in dev.mac_add],
+        "sol_macs": [am.format_mac(mac) for mac in dev.sol_mac_add],
+        "connections": [connection.name for connection in my_top.top[dev]],
+    }
+
+READS = {"resolve": resolve, "device": device} # Read-only operations, run concurrently in worker threads.
+
+# Server answering the requests of many clients against one shared topology.
+# Read-only requests run concurrently in a thread pool, edits run in the same pool one at a time once no read is in progress.
+# sys.stdout is replaced by a ThreadStdout until the server is closed.
+class Server:
+    def __init__(self, my_top, option, error, workers=WORKERS):
+        self.top = my_top
+        self.option = option # Function running one option of a batch script (IPv6AddRes.batch_option).
+        self.error = error # Exception the options raise for invalid input (IPv6AddRes.SimError).
+        self.lock = RWLock()
+        self.pool = ThreadPoolExecutor(workers)
+        self.stdout = ThreadStdout(sys.stdout)
+        sys.stdout = self.stdout
+        my_top.refresh()
+
+    # Method stops the worker threads and puts back the replaced sys.stdout.
+    def close(self):
+        self.pool.shutdown()
+        if sys.stdout is self.stdout:
+            sys.stdout = self.stdout.stream
+
+    # Method answers the requests of one client until it disconnects.
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError: # Line longer than the stream's limit, the rest of the connection can not be framed.
+                    writer.write(json.dumps({"id": None, "ok": False, "error": "Request is too long."}).encode() + b"\n")
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(json.dumps(await self.answer(line)).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # Method runs one request and returns its response.
+    async def answer(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"id": None, "ok": False, "error": "Request is not valid JSON."}
+        if not isinstance(request, dict):
+            return {"id": None, "ok": False, "error": "Request must be a JSON object."}
+        response = {"id": request.get("id")}
+        try:
+            op = request.get("op")
+            if op in READS:
+                async with self.lock.read():
+                    result = await asyncio.get_running_loop().run_in_executor(self.pool, READS[op], self.top, request)
+                response.update(ok=True, result=result)
+            else:
+                words = option_words(request)
+                if words is None:
+                    raise RequestError("Unknown operation '" + str(op) + "'.")
+                async with self.lock.write():
+                    output = await asyncio.get_running_loop().run_in_executor(self.pool, self.edit, words)
+                response.update(ok=True, output=output)
+        except (RequestError, self.error) as err:
+            response.update(ok=False, error=str(err))
+        except Exception: # A bug must not take the other clients down with it.
+            traceback.print_exc()
+            response.update(ok=False, error="Internal error.")
+        return response
+
+    # Method runs the batch option of an edit and returns what it printed. Called in a worker thread with the write lock held.
+    def edit(self, words):
+        try:
+            return self.stdout.capture(self.option, self.top, words)
+        finally:
+            self.top.refresh() # Rebuilt here rather than by the first concurrent reads.
+
+    # Method listens on a TCP ('HOST:PORT') or Unix ('unix:PATH') socket address until the task is cancelled.
+    # started is called with the listening server once it accepts connections.
+    async def serve(self, address, started=None):
+        if address.startswith("unix:"):
+            listener = await asyncio.start_unix_server(self.handle, address[5:])
+        else:
+            host, sep, port = address.rpartition(":")
+            if not (sep and port.isdigit()):
+                raise ValueError("the address must be HOST:PORT or unix:PATH")
+            listener = await asyncio.start_server(self.handle, host or "127.0.0.1", int(port))
+        if started is not None:
+            started(listener)
+        async with listener:
+            await listener.serve_forever()
+
+# Function serves the topology on the address until the process is interrupted.
+# Prints when it starts listening and when it stops, for the user running it from the prompt or a batch script.
+def serve(my_top, address, option, error, workers=WORKERS):
+    server = Server(my_top, option, error, workers)
+    try:
+        asyncio.run(server.serve(address, lambda listener: print("Serving on " + address + ".", flush=True)))
+    except KeyboardInterrupt:
+        print("Server stopped.")
+    finally:
+        server.close()
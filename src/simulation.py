@@ -0,0 +1,342 @@
+from collections import deque
+from time import perf_counter
+import add_manipulation as am
+import tracing
+
+# Outcomes of a device receiving a neighbor solicitation.
+FLOODED = "flooded" # A switch floods the NS out of its other ports.
+ACCEPTED = "accepted" # The target accepts the NS.
+DROP_NIC = "nic" # Ethernet multicast address did not match.
+DROP_IPV6 = "ipv6" # Solicited-node multicast address did not match.
+DROP_ICMPV6 = "icmpv6" # Global unicast address did not match.
+HOP_LIMIT = 64 # Routers a packet may go through before it is dropped (the default IPv6 Hop Limit).
+
+# Aggregate statistics of resolutions, collected when passed to request() or resolve().
+# Nothing is counted or timed when no Stats object is passed.
+class Stats:
+    __slots__ = ("resolved", "failed", "cache_hits", "hops", "frames", "visited", "subnet_checks", "drop_nic", "drop_ipv6", "drop_icmpv6",
+                 "flood_time", "na_time", "output_time")
+
+    def __init__(self):
+        self.resolved = 0 # Resolutions that succeeded (including cache hits).
+        self.failed = 0 # Resolutions that failed.
+        self.cache_hits = 0 # Resolutions answered by the sender's neighbor cache.
+        self.hops = 0 # Total number of hops travelled by the NAs.
+        self.frames = 0 # Total number of NS and NA frame deliveries.
+        self.visited = 0 # Devices that received an NS.
+        self.subnet_checks = 0 # Neighbors checked for being in the NS's subnet.
+        self.drop_nic = 0 # NS dropped by each layer of the receiving devices.
+        self.drop_ipv6 = 0
+        self.drop_icmpv6 = 0
+        # Time in seconds spent flooding NSs, returning NAs and reporting trace events (see tracing.TimedSink).
+        # The flood and NA times do not include the time spent reporting.
+        self.flood_time = 0.0
+        self.na_time = 0.0
+        self.output_time = 0.0
+
+    # Method adds the statistics of other to these statistics.
+    def merge(self, other):
+        for name in Stats.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    # Method returns the average number of hops of the resolutions that sent an NS.
+    def avg_hops(self):
+        flooded = self.resolved - self.cache_hits
+        return self.hops / flooded if flooded else 0.0
+
+    # Method returns the statistics as a dictionary.
+    def as_dict(self):
+        stats = {name: getattr(self, name) for name in Stats.__slots__}
+        stats["avg_hops"] = self.avg_hops()
+        return stats
+
+# Function rebuilds the path from the sending device to dev by following the parent pointers.
+def build_path(parent, dev):
+    path = []
+    while dev is not None:
+        path.append(dev)
+        dev = parent[dev]
+    path.reverse()
+    return path
+
+# Function iterate through the topology.
+# Trace events are sent to sink (None skips building them) and statistics are added to stats (if given).
+def request(my_top, dev1, dev2, true_path, ip_add, sink=tracing.PRETTY, stats=None):
+    parent = {dev1: None} # Visited devices mapped to the device they were reached from.
+    queue = deque([dev1])
+    add_ind = dev2.ip_ind(ip_add)
+    listeners = Listeners(my_top, ip_add)
+    prefix = am.get_prefix(ip_add) # The NS only travels within the target's /64.
+    now = my_top.clock
+    src_ind = dev1.prefix_ind(prefix)
+    src_mac = dev1.mac_add[src_ind] if src_ind is not None else None # Source MAC of the NS frame (switches have none).
+    frames = 0 # Number of frame deliveries.
+    checks = 0 # Number of subnet checks.
+    drops = {DROP_NIC: 0, DROP_IPV6: 0, DROP_ICMPV6: 0}
+    if stats is not None:
+        start = perf_counter()
+        output_start = stats.output_time
+        na_time = 0.0
+
+    if sink is not None:
+        sink.emit({"event": "ns_sent", "src": dev1.name, "target": dev2.name, "sol_mac": am.format_mac(dev2.sol_mac_add[add_ind]),
+                   "sol_ip": am.format_sol_ip(dev2.sol_ip[add_ind]), "ip": am.format_ip(dev2.extended[add_ind]), "listeners": sorted(listeners.nic)})
+
+    # Iterate through devices using a BFS approach.
+    found = False
+    while queue:
+        curr_dev = queue.popleft()
+
+        if curr_dev != dev1: # Device sending the NS does not process the NS packet.
+            outcome = receive_ns(curr_dev, listeners, sink)
+            if outcome == FLOODED:
+                if src_mac is not None:
+                    curr_dev.cam_table().learn(src_mac, parent[curr_dev], now) # The switch learns the sender's port from the NS.
+            elif outcome != ACCEPTED:
+                drops[outcome] += 1
+            if ((curr_dev.dev_type == "router") or (curr_dev.dev_type == "end")) and (curr_dev != dev2):
+                continue
+        if curr_dev == dev2: # If the current device matches the device we are looking for then make it send a NA packet following true_path.
+            true_path = build_path(parent, curr_dev) # The path is only rebuilt once the target is found.
+            if stats is not None:
+                na_start = perf_counter()
+                na_output = stats.output_time
+            na_path = response(my_top, true_path, add_ind, sink, stats)
+            if stats is not None:
+                na_time += perf_counter() - na_start - (stats.output_time - na_output)
+            if na_path is None: # The NA never made it back.
+                true_path = []
+                continue
+            found = True
+            continue
+
+        for device in my_top.top[curr_dev]:
+            if device not in parent:
+                checks += 1
+                if device.in_subnet(prefix): # Makes sure that the NS is only brodcast to devices in the same subnet.
+                    parent[device] = curr_dev # Mark the device as visited so we don't visit it again - prevents loops.
+                    queue.append(device)
+                    frames += 1
+    if stats is not None:
+        stats.frames += frames
+        stats.visited += len(parent) - 1 # Every device reached is visited, except the sender.
+        stats.subnet_checks += checks
+        stats.drop_nic += drops[DROP_NIC]
+        stats.drop_ipv6 += drops[DROP_IPV6]
+        stats.drop_icmpv6 += drops[DROP_ICMPV6]
+        if found:
+            stats.resolved += 1
+        else:
+            stats.failed += 1
+    if sink is not None:
+        if not found:
+            sink.emit({"event": "resolution_failed", "src": dev1.name, "target": dev2.name})
+        sink.emit({"event": "flood_done", "src": dev1.name, "target": dev2.name, "resolved": found, "frames": frames})
+    if stats is not None:
+        stats.na_time += na_time
+        stats.flood_time += perf_counter() - start - na_time - (stats.output_time - output_start)
+    return true_path
+
+# Function resolves the IPv6 address of dev2 from dev1, using dev1's neighbor cache before flooding an NS.
+# Returns the resolved MAC address (None if resolution failed).
+def resolve(my_top, dev1, dev2, ip_add, sink=tracing.PRETTY, stats=None):
+    now = my_top.clock
+    add_ind = dev2.ip_ind(ip_add)
+    cache = dev1.neighbor_cache()
+    mac = cache.lookup(ip_add, now)
+    if mac is not None: # Cache hit, no NS is sent.
+        if stats is not None:
+            stats.resolved += 1
+            stats.cache_hits += 1
+        if sink is not None:
+            sink.emit({"event": "cache_hit", "src": dev1.name, "ip": am.format_ip(ip_add), "mac": am.format_mac(mac), "state": cache.state(ip_add, now)})
+        return mac
+
+    cache.start(ip_add, now)
+    true_path = request(my_top, dev1, dev2, [], ip_add, sink, stats)
+    if not true_path:
+        cache.fail(ip_add)
+        return None
+    # The target learns the sender from the NS source address, the sender learns the target from the solicited NA.
+    src_ind = dev1.prefix_ind(am.get_prefix(ip_add))
+    if src_ind is not None:
+        dev2.neighbor_cache().learn(dev1.extended[src_ind], dev1.mac_add[src_ind], now)
+    cache.confirm(ip_add, dev2.mac_add[add_ind], now)
+    return dev2.mac_add[add_ind]
+
+# Function sends a packet from dev1 to the IPv6 address ip_add of dev2, across the routers when dev2 is in another subnet: every
+# device on the way resolves its next hop (the host's default router, the next router from the routing tables, then the target
+# on its subnet) with resolve(), so the segments already in the neighbor caches are not flooded again.
+# Returns the devices the packet went through at the IP layer (sender, routers, target), empty if it was dropped.
+def route(my_top, dev1, dev2, ip_add, sink=tracing.PRETTY, stats=None):
+    routes = my_top.routing()
+    prefix = am.get_prefix(ip_add)
+    path = [dev1]
+    curr_dev = dev1
+    while not curr_dev.in_subnet(prefix): # Routers with an interface in the target's subnet deliver the packet themselves.
+        hop = routes.next_hop(curr_dev, prefix)
+        if (hop is None) or (len(path) > HOP_LIMIT):
+            if sink is not None:
+                sink.emit({"event": "packet_dropped", "dev": curr_dev.name, "ip": am.format_ip(ip_add), "reason": "no_route" if hop is None else "hop_limit"})
+            return []
+        next_dev, next_ip = hop
+        mac = resolve(my_top, curr_dev, next_dev, next_ip, sink, stats)
+        if mac is None:
+            if sink is not None:
+                sink.emit({"event": "packet_dropped", "dev": curr_dev.name, "ip": am.format_ip(ip_add), "reason": "unresolved"})
+            return []
+        if sink is not None:
+            sink.emit({"event": "packet_forwarded", "dev": curr_dev.name, "next_hop": next_dev.name, "ip": am.format_ip(ip_add),
+                       "via": am.format_ip(next_ip), "mac": am.format_mac(mac)})
+        path.append(next_dev)
+        curr_dev = next_dev
+
+    if resolve(my_top, curr_dev, dev2, ip_add, sink, stats) is None:
+        if sink is not None:
+            sink.emit({"event": "packet_dropped", "dev": curr_dev.name, "ip": am.format_ip(ip_add), "reason": "unresolved"})
+        return []
+    path.append(dev2)
+    if sink is not None:
+        sink.emit({"event": "packet_delivered", "src": dev1.name, "target": dev2.name, "ip": am.format_ip(ip_add), "path": [device.name for device in path]})
+    return path
+
+# Devices that pass an NS for an IPv6 address up each layer, looked up once per flood in the topology's group index rather than
+# in the address lists of every device the flood reaches.
+class Listeners:
+    __slots__ = ("ip", "sol_ip", "sol_mac", "nic", "ipv6")
+
+    def __init__(self, my_top, ip_add):
+        self.ip = ip_add
+        self.sol_ip = am.sol_ip_int(ip_add)
+        self.sol_mac = am.sol_mac_int(ip_add)
+        self.nic = {dev.name for dev in my_top.nic_devices(self.sol_mac)} # Names of the devices whose NIC filter passes the NS.
+        self.ipv6 = {dev.name for dev in my_top.group_devices(self.sol_ip)} # Names of the devices in the solicited-node group.
+
+    # Method returns what a device receiving the NS does with it.
+    def outcome(self, dev):
+        if dev.dev_type == "switch": # If the device is a switch then flood the packet.
+            return FLOODED
+        if dev.name not in self.nic: # If solicited node MAC address matches then pass the NS packet up.
+            return DROP_NIC
+        if dev.name not in self.ipv6: # If the solicited node IPv6 multicast address matches then pass the NS packet up.
+            return DROP_IPV6
+        if self.ip not in dev.extended: # If the IPv6 address matches the packets destinnation IPv6 address then the packet is accepted.
+            return DROP_ICMPV6
+        return ACCEPTED
+
+# Function simulates the acceptance of NS packet and returns the outcome.
+def receive_ns(curr_dev, listeners, sink=tracing.PRETTY):
+    outcome = listeners.outcome(curr_dev)
+    if sink is not None:
+        sink.emit({"event": "ns_received", "dev": curr_dev.name})
+        if outcome == FLOODED:
+            sink.emit({"event": "ns_flooded", "dev": curr_dev.name})
+        elif outcome == ACCEPTED:
+            sink.emit({"event": "ns_accepted", "dev": curr_dev.name})
+        else:
+            sink.emit({"event": "ns_dropped", "dev": curr_dev.name, "layer": outcome})
+    return outcome
+
+# Function simulates Duplicate Address Detection (RFC 4862) of the tentative IPv6 address ip_add of dev1 (which does not have to be
+# in the topology yet): an NS from the unspecified address (::) to the address's solicited-node group, which a device already using
+# the address answers with an NA to all nodes (ff02::1). Nobody learns anything from the NS since it has no source address.
+# Returns the device defending the address (None if no device in reach uses it).
+def dad(my_top, dev1, ip_add, sink=tracing.PRETTY, stats=None):
+    listeners = Listeners(my_top, ip_add)
+    prefix = am.get_prefix(ip_add)
+    parent = {dev1: None}
+    queue = deque([dev1])
+    frames = checks = 0
+    drops = {DROP_NIC: 0, DROP_IPV6: 0, DROP_ICMPV6: 0}
+    defender = None
+    if stats is not None:
+        start = perf_counter()
+        output_start = stats.output_time
+    if sink is not None:
+        sink.emit({"event": "dad_sent", "src": dev1.name, "sol_mac": am.format_mac(listeners.sol_mac), "sol_ip": am.format_sol_ip(listeners.sol_ip),
+                   "ip": am.format_ip(ip_add), "listeners": sorted(listeners.nic)})
+
+    while queue:
+        curr_dev = queue.popleft()
+        if curr_dev != dev1:
+            outcome = receive_ns(curr_dev, listeners, sink)
+            if outcome == ACCEPTED:
+                if defender is None: # The first device to answer is enough for the address to be given up.
+                    defender = curr_dev
+                    na_path = build_path(parent, curr_dev)[::-1] # The NA to all nodes comes back the way the NS came.
+                    frames += len(na_path) - 1
+                    if sink is not None:
+                        sink.emit({"event": "dad_defended", "src": curr_dev.name, "dst": dev1.name, "ip": am.format_ip(ip_add),
+                                   "path": [device.name for device in na_path]})
+                continue
+            if outcome != FLOODED:
+                drops[outcome] += 1
+                continue
+        for device in my_top.top.get(curr_dev, ()): # A device not in the topology yet has no connections.
+            if device not in parent:
+                checks += 1
+                if device.in_subnet(prefix):
+                    parent[device] = curr_dev
+                    queue.append(device)
+                    frames += 1
+
+    if stats is not None:
+        stats.frames += frames
+        stats.visited += len(parent) - 1
+        stats.subnet_checks += checks
+        stats.drop_nic += drops[DROP_NIC]
+        stats.drop_ipv6 += drops[DROP_IPV6]
+        stats.drop_icmpv6 += drops[DROP_ICMPV6]
+        stats.flood_time += perf_counter() - start - (stats.output_time - output_start)
+    if sink is not None:
+        sink.emit({"event": "dad_done", "src": dev1.name, "ip": am.format_ip(ip_add), "duplicate": defender is not None, "frames": frames})
+    return defender
+
+# Function simulates NA packet response.
+# The NA is a unicast frame sent back out of the port the NS arrived on, switches forward it using their MAC tables.
+# Returns the path the NA took (None if it was lost).
+def response(my_top, true_path, ip_ind, sink=tracing.PRETTY, stats=None):
+    dev_to = true_path[0]
+    dev_from = true_path[-1]
+    na_path = true_path[::-1]
+    frames = len(true_path) - 1
+    to_ind = dev_to.prefix_ind(am.get_prefix(dev_from.extended[ip_ind]))
+    if to_ind is not None and len(true_path) > 1: # A switch sending the NS has no MAC address to learn, the NA retraces the NS path.
+        na_path, frames = forward_unicast(my_top, dev_from, true_path[-2], dev_from.mac_add[ip_ind], dev_to, dev_to.mac_add[to_ind])
+    if stats is not None:
+        stats.frames += frames
+        if na_path is not None:
+            stats.hops += len(na_path) - 1
+    if sink is not None:
+        if na_path is None:
+            sink.emit({"event": "na_lost", "src": dev_from.name, "dst": dev_to.name, "frames": frames})
+        else:
+            sink.emit({"event": "na_path", "src": dev_from.name, "dst": dev_to.name, "path": [device.name for device in na_path], "frames": frames})
+    return na_path
+
+# Function simulates a unicast frame sent from src to first_hop and forwarded by the switches' MAC tables until it reaches dst.
+# Switches flood frames to unknown destinations out of every other port. Returns the path from src to dst and the number of frame deliveries.
+def forward_unicast(my_top, src, first_hop, src_mac, dst, dst_mac):
+    now = my_top.clock
+    parent = {src: None, first_hop: src}
+    queue = deque([first_hop])
+    frames = 1
+    path = None
+    while queue:
+        curr_dev = queue.popleft()
+        if curr_dev == dst:
+            path = build_path(parent, curr_dev)
+            continue
+        if curr_dev.dev_type != "switch": # Other devices drop frames that are not for them.
+            continue
+        cam = curr_dev.cam_table()
+        cam.learn(src_mac, parent[curr_dev], now)
+        port = cam.lookup(dst_mac, now)
+        out = [port] if port is not None else my_top.top[curr_dev] # Forward out of the learned port or flood.
+        for device in out:
+            if device not in parent:
+                parent[device] = curr_dev
+                queue.append(device)
+                frames += 1
+    return path, frames
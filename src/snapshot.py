@@ -0,0 +1,193 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from topology import Device, PausedGc, devices_from_columns
+import add_manipulation as am
+
+# Binary snapshot layout (little endian):
+#   header        MAGIC, version, device/address/neighbor counts, size of the name table, simulated clock
+#   devices       one DEVICE record per device: name offset, first address, address count, device type
+#   addresses     one ADDRESS record per address: IPv6 high/low 64 bits, MAC
+#   adjacency     (devices + 1) uint32 offsets followed by uint32 neighbor indexes (CSR, keeps each device's connection order)
+#   names         UTF-8 device names
+MAGIC = b"IP6SNAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIId")
+DEVICE = struct.Struct("<IIHBx")
+ADDRESS = struct.Struct("<QQQ")
+DEV_TYPES = ["router", "end", "switch"] # Same codes as the frozen view's type column.
+
+# Function saves the topology to a readable JSON file.
+def save_json(my_top, path):
+    devices = []
+    for dev, connections in my_top.top.items():
+        devices.append({
+            "name": dev.name,
+            "type": dev.dev_type,
+            "ips": [am.format_ip(ip) for ip in dev.extended],
+            "macs": [am.format_mac(mac) for mac in dev.mac_add],
+            "connections": [connection.name for connection in connections],
+        })
+    with open(path, "w") as out:
+        json.dump({"version": VERSION, "clock": my_top.clock, "devices": devices}, out, indent=1)
+
+# Function replaces the contents of the topology with the topology saved in a JSON file.
+# The devices are checked like the prompt checks them (addresses assigned more than once are only reported, see conflicts.scan()),
+# an invalid file raises ValueError and leaves the topology as it was.
+def load_json(my_top, path):
+    with open(path) as src:
+        data = json.load(src)
+    try:
+        devices = [json_device(entry) for entry in data["devices"]]
+        by_name = {dev.name: dev for dev in devices}
+        if len(by_name) != len(devices):
+            raise ValueError("a device name is used more than once")
+        connections = [json_connections(dev, entry["connections"], by_name) for dev, entry in zip(devices, data["devices"])]
+        edges = {(dev.name, neighbor.name) for dev, dev_connections in zip(devices, connections) for neighbor in dev_connections}
+        for name1, name2 in edges:
+            if (name2, name1) not in edges:
+                raise ValueError("connection between '" + name1 + "' and '" + name2 + "' is only listed by '" + name1 + "'")
+        clock = float(data.get("clock", 0.0))
+    except (KeyError, TypeError, AttributeError) as err:
+        raise ValueError("malformed topology file (" + type(err).__name__ + ": " + str(err) + ")")
+    my_top.clear()
+    my_top.clock = clock
+    my_top.add_devices(devices, connections) # Connections are restored in their saved order.
+    return my_top
+
+# Function returns the device of a JSON snapshot entry, raises ValueError if it could not be added at the prompt.
+def json_device(entry):
+    name, dev_type, ips, macs = entry["name"], entry["type"], entry["ips"], entry["macs"]
+    if not isinstance(name, str) or not name:
+        raise ValueError("invalid device name " + json.dumps(name))
+    if dev_type not in DEV_TYPES:
+        raise ValueError("unknown type " + json.dumps(dev_type) + " of device '" + name + "'")
+    if (len(ips) != len(macs)) or ((dev_type == "switch") and ips):
+        raise ValueError("device '" + name + "' must have one MAC address per IPv6 address (none for a switch)")
+    for ip, mac in zip(ips, macs):
+        if not am.ipv6_val_check(ip) or not am.global_unicast(am.get_prefix(am.ip_to_int(ip))):
+            raise ValueError("invalid IPv6 Global Unicast address '" + ip + "' of device '" + name + "'")
+        if not am.mac_val_check(mac):
+            raise ValueError("invalid MAC address '" + mac + "' of device '" + name + "'")
+    return Device(name, dev_type, [am.ip_to_int(ip) for ip in ips], [am.mac_to_int(mac) for mac in macs])
+
+# Function returns the connections of a device of a JSON snapshot, raises ValueError unless each one is listed by both devices
+# and could be made at the prompt.
+def json_connections(dev, names, by_name):
+    connections = []
+    for name in names:
+        neighbor = by_name.get(name)
+        if neighbor is None:
+            raise ValueError("device '" + dev.name + "' is connected to unknown device " + json.dumps(name))
+        if (neighbor == dev) or (neighbor in connections) or not dev.same_sub(neighbor):
+            raise ValueError("invalid connection between '" + dev.name + "' and '" + neighbor.name + "'")
+        connections.append(neighbor)
+    return connections
+
+# Function saves the topology to a binary snapshot file.
+def save_binary(my_top, path):
+    view = my_top.frozen() # The connections are written as the view's CSR adjacency and the types as its type column.
+    names = bytearray()
+    dev_records = bytearray()
+    addr_records = bytearray()
+    n_addrs = 0
+    for dev, dev_type in zip(view.devices, view.types):
+        name = dev.name.encode()
+        dev_records += DEVICE.pack(len(names), n_addrs, len(dev.extended), dev_type)
+        names += name
+        for ip, mac in zip(dev.extended, dev.mac_add):
+            addr_records += ADDRESS.pack(ip >> 64, ip & am.LOW_64, mac)
+        n_addrs += len(dev.extended)
+    devices, offsets, neighbors = view.devices, view.offsets, view.neighbors
+    with open(path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, len(devices), n_addrs, len(neighbors), len(names), my_top.clock))
+        out.write(dev_records)
+        out.write(addr_records)
+        out.write(offsets.tobytes())
+        out.write(neighbors.tobytes())
+        out.write(names)
+
+# Function replaces the contents of the topology with a binary snapshot, addresses are not validated or re-parsed.
+# The sections are read as columns straight from the mapped file, without a tuple per record. The section sizes, indexes,
+# device types and the symmetry of the connections are checked first: a truncated or corrupt file raises ValueError and
+# leaves the topology as it was.
+def load_binary(my_top, path):
+    with open(path, "rb") as src:
+        if os.fstat(src.fileno()).st_size < HEADER.size: # mmap can not map an empty file.
+            raise ValueError("file is too short to be a topology snapshot")
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            magic, version, n_devs, n_addrs, n_neighbors, names_size, clock = HEADER.unpack_from(buf, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("not a topology snapshot (version " + str(VERSION) + ")")
+            size = HEADER.size + n_devs * DEVICE.size + n_addrs * ADDRESS.size + (n_devs + 1) * 4 + n_neighbors * 4 + names_size
+            if len(buf) != size:
+                raise ValueError("snapshot is truncated or corrupt (" + str(len(buf)) + " bytes, its header describes " + str(size) + ")")
+            pos = HEADER.size
+            records = column(buf, pos, "I", n_devs * DEVICE.size)
+            pos += n_devs * DEVICE.size
+            addrs = column(buf, pos, "Q", n_addrs * ADDRESS.size)
+            pos += n_addrs * ADDRESS.size
+            offsets = column(buf, pos, "I", (n_devs + 1) * 4)
+            pos += (n_devs + 1) * 4
+            neighbors = column(buf, pos, "I", n_neighbors * 4)
+            pos += n_neighbors * 4
+            names = buf[pos:pos + names_size].decode()
+            if len(names) != names_size: # Offsets are byte offsets, decode each name separately when names are not ASCII.
+                names = buf[pos:pos + names_size]
+    # A DEVICE record is three 32-bit words: name offset, first address, and the address count in the low 16 bits of the third
+    # with the device type above it (the padding byte is zero, a non-zero one reads as an invalid type).
+    name_offs, addr_starts = records[0::3], records[1::3]
+    counts = [word & 0xffff for word in records[2::3]]
+    types = [word >> 16 for word in records[2::3]]
+    check_records(name_offs, addr_starts, counts, types, n_addrs, offsets, neighbors, names_size)
+
+    with PausedGc():
+        build_devices(my_top, clock, names, names_size, name_offs, addr_starts, counts, types, addrs, offsets, neighbors)
+    return my_top
+
+# Function returns a section of a binary snapshot as an array of little endian numbers.
+def column(buf, pos, typecode, size):
+    values = array(typecode, buf[pos:pos + size])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+# Function raises ValueError if the records of a binary snapshot point outside of their sections or are out of order, or if a
+# connection is not listed by both of its devices (or is listed twice, or connects a device to itself) as load_json() does.
+def check_records(name_offs, addr_starts, counts, types, n_addrs, offsets, neighbors, names_size):
+    n_devs = len(name_offs)
+    ends = list(accumulate(counts, initial=0)) # Each device's addresses follow the previous one's.
+    if (addr_starts != array("I", ends[:-1])) or (ends[-1] != n_addrs) or (types and (max(types) >= len(DEV_TYPES))):
+        raise ValueError("snapshot is corrupt (invalid device record)")
+    if any(start > end for start, end in zip(name_offs, name_offs[1:])) or (name_offs and (name_offs[-1] > names_size)):
+        raise ValueError("snapshot is corrupt (invalid device record)")
+    if (offsets[0] != 0) or (offsets[-1] != len(neighbors)) or any(start > end for start, end in zip(offsets, offsets[1:])):
+        raise ValueError("snapshot is corrupt (invalid adjacency offsets)")
+    if neighbors and (max(neighbors) >= n_devs):
+        raise ValueError("snapshot is corrupt (invalid neighbor index)")
+    # Connection i -> j as the number i * n_devs + j, or j * n_devs + i when j < i: each one must be listed once in each direction.
+    forward = [ind * n_devs + nbr for ind in range(n_devs) for nbr in neighbors[offsets[ind]:offsets[ind + 1]] if ind < nbr]
+    backward = [nbr * n_devs + ind for ind in range(n_devs) for nbr in neighbors[offsets[ind]:offsets[ind + 1]] if nbr < ind]
+    if len(forward) + len(backward) != len(neighbors):
+        raise ValueError("snapshot is corrupt (a connection connects a device to itself)")
+    unique = set(forward)
+    if (len(unique) != len(forward)) or (len(backward) != len(forward)) or (unique != set(backward)):
+        raise ValueError("snapshot is corrupt (a connection is listed twice or only by one of its devices)")
+
+# Function creates the devices of a binary snapshot and replaces the devices of the topology with them and their connections.
+def build_devices(my_top, clock, names, names_size, name_offs, addr_starts, counts, types, addrs, offsets, neighbors):
+    ends = name_offs[1:].tolist() + [names_size] # A name ends where the next one starts.
+    if isinstance(names, str):
+        dev_names = [names[start:end] for start, end in zip(name_offs, ends)]
+    else:
+        dev_names = [names[start:end].decode() for start, end in zip(name_offs, ends)]
+    ips = [hi << 64 | lo for hi, lo in zip(addrs[0::3], addrs[1::3])]
+    devices = devices_from_columns(dev_names, map(DEV_TYPES.__getitem__, types), addr_starts, counts, ips, addrs[2::3].tolist())
+    listed = list(map(devices.__getitem__, neighbors)) # Connections of device i are listed[offsets[i]:offsets[i + 1]].
+    my_top.clear() # Names that are not valid UTF-8 were rejected above.
+    my_top.clock = clock
+    my_top.add_devices(devices, [listed[start:end] for start, end in zip(offsets, offsets[1:])])
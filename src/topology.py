@@ -1,23 +1,48 @@
+import gc
 from collections import defaultdict
-from add_manipulation import extend_ip
+from itertools import chain
+from neighbor_cache import NeighborCache
+from cam_table import CamTable
+from reachability import Segments
+from frozen import FrozenTopology
+from routing import RoutingTables
+from add_manipulation import ip_to_int, mac_to_int, mac_val_check, get_prefix, sol_ip_int, sol_mac_int, sol_mac_to_ip, SOL_IP_BASE, SOL_MAC_BASE, LOW_24
 
 # Device class.
 class Device:
-    def __init__(self, name="", d_type="", e_ip=[], s_ip=[], mac=[], sol_mac=[]):
+    __slots__ = ("name", "dev_type", "extended", "sol_ip", "mac_add", "sol_mac_add", "prefixes", "cache", "cam")
+
+    def __init__(self, name="", d_type="", e_ip=(), mac=(), s_ip=None, sol_mac=None):
         self.name = name # Name of the device.
         self.dev_type = d_type # Device type.
 
-        self.extended = e_ip # List of extended IPv6 addesses belonging to the Device.
-        self.sol_ip = s_ip # List of extended Solicited Node Multicast IPv6 addresses belonging to the Device.
+        # Addresses are stored as integers and only formatted as strings when printed.
+        # The solicited node addresses are derived from the IPv6 addresses unless they were already derived (bulk provisioning).
+        # sol_ip_int(), sol_mac_int() and get_prefix() are inlined since snapshots create devices by the hundred thousand.
+        self.extended = list(e_ip) # List of IPv6 addesses (128-bit) belonging to the Device.
+        self.sol_ip = list(s_ip) if s_ip is not None else [SOL_IP_BASE | (ip & LOW_24) for ip in self.extended] # List of Solicited Node Multicast IPv6 addresses belonging to the Device.
+
+        self.mac_add = list(mac) # List of MAC addresses (48-bit) belonging to the device.
+        self.sol_mac_add = list(sol_mac) if sol_mac is not None else [SOL_MAC_BASE | (ip & LOW_24) for ip in self.extended] # List of Ethernet Multicast Addresses belonging to the device.
 
-        self.mac_add = mac # List of MAC addresses belonging to the device.
-        self.sol_mac_add = sol_mac # List of Ethernet Multicast Addresses belonging to the device.
+        self.prefixes = {ip >> 64 for ip in self.extended} # Set of /64 prefixes (as integers) the device has an interface in.
+        self.cache = None # Neighbor cache, created the first time the device resolves or learns an address.
+        self.cam = None # MAC learning table (switches only), created the first time the switch forwards a frame.
 
     def __str__(self):
         return self.name
 
+    # Neighbor caches and MAC tables are runtime state and are not pickled (e.g. when a topology is sent to worker processes).
+    def __getstate__(self):
+        return (self.name, self.dev_type, self.extended, self.sol_ip, self.mac_add, self.sol_mac_add, self.prefixes)
+
+    def __setstate__(self, state):
+        self.name, self.dev_type, self.extended, self.sol_ip, self.mac_add, self.sol_mac_add, self.prefixes = state
+        self.cache = None
+        self.cam = None
+
     def __eq__(self, other): # Used to define what it means for devices to be equal.
-        return hasattr(other, "name") and self.name == other.name
+        return isinstance(other, Device) and self.name == other.name
 
     def __hash__(self): # Makes it so that a device can be used as a key in a dictionary.
         return hash(self.name)
@@ -26,87 +51,352 @@ class Device:
     def same_sub(self, other):
         if(self.dev_type.lower() == "switch") or (other.dev_type.lower() == "switch"):
             return True
-        for ip in self.extended:
-            net = ip[:20]
-            for sec_ip in other.extended: # Compare net to the IPv6 addresses of the input device.
-                if net in sec_ip:
-                    return True
-        return False
+        return not self.prefixes.isdisjoint(other.prefixes)
     
     # Method returns True if the device has an interface in the same subnet as the entered IPv6 address.
     def same_sub_ip(self, ip):
-        if self.dev_type.lower() == "switch": # Switch does not have IP address in this program so return True.
-            return True
-        net = ip[:20] 
-        for sec_ip in self.extended: # Compare net to the IPv6 addresses of the input device.
-            if net in sec_ip:
-                return True
-        return False
+        return self.in_subnet(get_prefix(ip))
 
-    # Method returns the index of the IPv6 address in its list of IPv6 addresses.
-    def ip_ind(self, ip_add):
+    # Method returns True if the device has an interface in the /64 prefix (switches are in every subnet).
+    def in_subnet(self, prefix):
+        return (prefix in self.prefixes) or (self.dev_type == "switch")
+
+    # Method adds an IPv6 address (and its derived addresses) to the device.
+    def add_address(self, e_ip, mac):
+        self.extended.append(e_ip)
+        self.sol_ip.append(sol_ip_int(e_ip))
+        self.mac_add.append(mac)
+        self.sol_mac_add.append(sol_mac_int(e_ip))
+        self.prefixes.add(get_prefix(e_ip))
+
+    # Method removes an IPv6 address (and its derived addresses) from the device and returns them.
+    def remove_address(self, e_ip):
+        rm_ind = self.extended.index(e_ip)
+        removed = self.extended.pop(rm_ind), self.sol_ip.pop(rm_ind), self.mac_add.pop(rm_ind), self.sol_mac_add.pop(rm_ind)
+        self.prefixes = {get_prefix(ip) for ip in self.extended} # Another interface may still be in the removed subnet.
+        return removed
+
+    # Method returns the device's neighbor cache.
+    def neighbor_cache(self):
+        if self.cache is None:
+            self.cache = NeighborCache()
+        return self.cache
+
+    # Method returns the switch's MAC learning table.
+    def cam_table(self):
+        if self.cam is None:
+            self.cam = CamTable()
+        return self.cam
+
+    # Method returns the index of the device's first IPv6 address in the /64 prefix (None if it has none).
+    def prefix_ind(self, prefix):
         for index, ip in enumerate(self.extended):
-            if ip == ip_add:
-                return index            
+            if get_prefix(ip) == prefix:
+                return index
         return None
 
+    # Method returns the index of the IPv6 address in its list of IPv6 addresses.
+    def ip_ind(self, ip_add):
+        try:
+            return self.extended.index(ip_add)
+        except ValueError:
+            return None
+
+# Function creates devices from address columns: device i is named names[i], has the type types[i] and the addresses
+# ips[starts[i]:starts[i] + counts[i]] with the MAC addresses at the same positions of macs. Same as calling Device() for each
+# one without the call and the comprehensions, for the hundreds of thousands of devices of a snapshot.
+def devices_from_columns(names, types, starts, counts, ips, macs):
+    sol_ips = [SOL_IP_BASE | (ip & LOW_24) for ip in ips]
+    sol_macs = [SOL_MAC_BASE | (ip & LOW_24) for ip in ips]
+    new = Device.__new__
+    devices = []
+    for name, dev_type, start, count in zip(names, types, starts, counts):
+        end = start + count
+        dev = new(Device)
+        dev.name = name
+        dev.dev_type = dev_type
+        dev.extended = e_ip = ips[start:end]
+        dev.sol_ip = sol_ips[start:end]
+        dev.mac_add = macs[start:end]
+        dev.sol_mac_add = sol_macs[start:end]
+        dev.prefixes = {e_ip[0] >> 64} if count == 1 else {ip >> 64 for ip in e_ip}
+        dev.cache = None
+        dev.cam = None
+        devices.append(dev)
+    return devices
+
+# Function returns the key of the connection between two devices in Topology.edges.
+def edge_key(dev1, dev2):
+    return (dev1.name, dev2.name) if dev1.name < dev2.name else (dev2.name, dev1.name)
+
+# Context manager pausing the garbage collector while a topology is built in bulk (generated, imported or loaded).
+# Only new objects without reference cycles are created, so the collections their allocation would trigger find nothing.
+class PausedGc:
+    def __enter__(self):
+        self.enabled = gc.isenabled()
+        gc.disable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.enabled:
+            gc.enable()
+        return False
+
 class Topology:
     def __init__(self):
         self.top = defaultdict(list)
+        self.clock = 0.0 # Simulated time in seconds (drives the neighbor cache timers).
+
+        # Lookup indexes kept in sync with the devices in the topology.
+        self.names = {} # Device name -> Device.
+        self.ips = {} # IPv6 address -> Device.
+        self.macs = {} # MAC address -> Device.
+        self.groups = defaultdict(set) # Solicited-node multicast address -> Devices listening to it.
+        self.subnets = defaultdict(set) # /64 prefix (as an integer) -> Devices with an interface in it.
+        self.links = {} # (Device, Device) -> (latency in seconds, bandwidth in bits/s) of links that do not use the defaults (both directions).
+        self.segments = Segments() # Groups of connected switches, answers which devices an NS can reach (see can_reach()).
+        self.edges = set() # (name, name) of every connection, smaller name first.
+        self.view = None # Frozen view of the topology (see frozen()), dropped by every edit.
+        self.routes = None # Routing tables of the routers (see routing()), dropped by every edit.
+
+    # Method removes every device and connection from the topology.
+    def clear(self):
+        self.__init__()
+
+    # Method returns a read-only, integer indexed view of the topology for floods and bulk resolutions.
+    # The view is built on the first call after an edit.
+    def frozen(self):
+        if self.view is None:
+            self.view = FrozenTopology(self)
+        return self.view
+
+    # Method returns the routing tables of the routers, built on the first call after an edit.
+    def routing(self):
+        if self.routes is None:
+            self.routes = RoutingTables(self)
+        return self.routes
+
+    # Method rebuilds the structures that are otherwise rebuilt on the first query after an edit (reachability segments and
+    # frozen view), so that queries running in other threads only read them. Returns the frozen view.
+    def refresh(self):
+        if self.segments.stale:
+            self.segments.rebuild(self.top)
+        return self.frozen()
+
+    # Method adds the addresses of a device to the lookup indexes.
+    def index_address(self, dev, e_ip, sol_ip, mac):
+        self.ips[e_ip] = dev
+        self.macs[mac] = dev
+        self.groups[sol_ip].add(dev)
+        self.subnets[get_prefix(e_ip)].add(dev)
+
+    # Method removes the addresses of a device from the lookup indexes.
+    def unindex_address(self, dev, e_ip, sol_ip, mac):
+        self.ips.pop(e_ip, None)
+        self.macs.pop(mac, None)
+        if sol_ip not in dev.sol_ip: # The device may still be in the group through another address.
+            self.discard_member(self.groups, sol_ip, dev)
+        prefix = get_prefix(e_ip)
+        if prefix not in dev.prefixes: # The device may still be in the subnet through another address.
+            self.discard_member(self.subnets, prefix, dev)
+
+    # Method removes a device from a set in one of the membership indexes.
+    def discard_member(self, index, key, dev):
+        members = index.get(key)
+        if members is not None:
+            members.discard(dev)
+            if not members:
+                del index[key]
 
     # Method adds a device to the topology.
     def add_device(self, dev1):
+        self.view = self.routes = None
         self.top[dev1] = []
+        self.names[dev1.name] = dev1
+        for e_ip, sol_ip, mac in zip(dev1.extended, dev1.sol_ip, dev1.mac_add):
+            self.index_address(dev1, e_ip, sol_ip, mac)
+
+    # Method adds many devices to the topology at once, with their connections if given (a list per device).
+    def add_devices(self, devices, connections=None):
+        top, names, ips, macs, groups, subnets, edges = self.top, self.names, self.ips, self.macs, self.groups, self.subnets, self.edges
+        self.view = self.routes = None
+        if connections is None:
+            connections = [[] for dev in devices]
+        else:
+            connections = list(connections)
+            self.segments.stale = True # Rebuilt once on the next query rather than per connection.
+        # Same as add_device() for each device, with the address indexes filled from flattened columns instead of per address.
+        top.update(zip(devices, connections))
+        names.update({dev.name: dev for dev in devices})
+        for dev, dev_connections in zip(devices, connections): # Each connection is listed by both devices.
+            name = dev.name
+            for neighbor in dev_connections:
+                if name < neighbor.name:
+                    edges.add((name, neighbor.name))
+        owners = list(chain.from_iterable([dev] * len(dev.extended) for dev in devices)) # Device of each address.
+        dev_ips = list(chain.from_iterable(dev.extended for dev in devices))
+        ips.update(zip(dev_ips, owners))
+        macs.update(zip(chain.from_iterable(dev.mac_add for dev in devices), owners))
+        for sol_ip, dev in zip(chain.from_iterable(dev.sol_ip for dev in devices), owners):
+            groups[sol_ip].add(dev)
+        for e_ip, dev in zip(dev_ips, owners):
+            subnets[e_ip >> 64].add(dev)
+
+    # Method removes a device and all of its connections from the topology.
+    def remove_device(self, dev1):
+        self.view = self.routes = None
+        if dev1.dev_type == "switch": # The switch may have joined other switches.
+            self.segments.stale = True
+        for connection in self.top[dev1]: # Remove connections to the device.
+            self.top[connection].remove(dev1)
+            if connection.cam is not None: # The switch port to the device went down.
+                connection.cam.forget_port(dev1)
+            self.links.pop((dev1, connection), None)
+            self.links.pop((connection, dev1), None)
+            self.edges.discard(edge_key(dev1, connection))
+        self.top.pop(dev1)
+        self.names.pop(dev1.name, None)
+        for e_ip, mac in zip(dev1.extended, dev1.mac_add):
+            self.ips.pop(e_ip, None)
+            self.macs.pop(mac, None)
+        for sol_ip in dev1.sol_ip:
+            self.discard_member(self.groups, sol_ip, dev1)
+        for prefix in dev1.prefixes:
+            self.discard_member(self.subnets, prefix, dev1)
+
+    # Method creates and adds one device per valid row of derived bulk addresses (see add_manipulation.derive_bulk).
+    # Returns the new devices and a dictionary of rejected rows -> reason.
+    def add_devices_bulk(self, names, dev_type, bulk):
+        errors = dict(bulk.errors)
+        devices = []
+        new_names = set() # Names and addresses of the rows accepted so far, not indexed until all the devices are added.
+        new_ips = set()
+        new_macs = set()
+        groups = set() # Solicited-node multicast addresses of the rows accepted so far.
+        for row in bulk.valid_rows():
+            name = names[row]
+            if (name in self.names) or (name in new_names):
+                errors[row] = "This device already exits."
+            elif (bulk.ip[row] in self.ips) or (bulk.ip[row] in new_ips):
+                errors[row] = "IPv6 Global Unicast Address was alreay assigned."
+            elif self.mac_taken(bulk.mac[row]) or (bulk.mac[row] in new_macs) or (sol_mac_to_ip(bulk.mac[row]) in groups):
+                errors[row] = "The input MAC address was already assigned."
+            else:
+                devices.append(Device(name, dev_type, [bulk.ip[row]], [bulk.mac[row]], [bulk.sol_ip[row]], [bulk.sol_mac[row]]))
+                new_names.add(name)
+                new_ips.add(bulk.ip[row])
+                new_macs.add(bulk.mac[row])
+                groups.add(bulk.sol_ip[row])
+        self.add_devices(devices)
+        return devices, errors
+
+    # Method adds an IPv6 address to a device in the topology.
+    def add_ip(self, dev1, e_ip, mac):
+        self.view = self.routes = None
+        dev1.add_address(e_ip, mac)
+        self.index_address(dev1, e_ip, sol_ip_int(e_ip), mac)
+
+    # Method removes an IPv6 address from a device in the topology.
+    # Returns the connections of the device that no longer share a subnet with it.
+    def remove_ip(self, dev1, e_ip):
+        self.view = self.routes = None
+        e_ip, sol_ip, mac, sol_mac = dev1.remove_address(e_ip)
+        self.unindex_address(dev1, e_ip, sol_ip, mac)
+        prefix = get_prefix(e_ip)
+        if prefix in dev1.prefixes: # Another address is still in the subnet.
+            return []
+        # The segments only hold switches, which are in every subnet, so removing an address leaves them as they are: only the
+        # direct links to the routers and end devices in the removed subnet can be left without a shared subnet.
+        prefixes = dev1.prefixes
+        return [connection for connection in self.top[dev1] if (prefix in connection.prefixes) and prefixes.isdisjoint(connection.prefixes)]
 
     # Method creates a connection between two devices.
     def add_connection(self, dev1, dev2):
+        self.view = self.routes = None
         self.top[dev1].append(dev2)
         self.top[dev2].append(dev1)
+        self.edges.add(edge_key(dev1, dev2))
+        if (dev1.dev_type == "switch") and (dev2.dev_type == "switch") and not self.segments.stale:
+            self.segments.union(dev1.name, dev2.name)
 
     # Method removes a connection between two devices.
     def remove_connection(self, dev1, dev2):
+        self.view = self.routes = None
         self.top[dev1].remove(dev2)
         self.top[dev2].remove(dev1)
+        self.edges.discard(edge_key(dev1, dev2))
+        self.links.pop((dev1, dev2), None)
+        self.links.pop((dev2, dev1), None)
+        if (dev1.dev_type == "switch") and (dev2.dev_type == "switch"): # The segment may have been split.
+            self.segments.stale = True
+        if dev1.cam is not None: # Switches forget the addresses learned on the removed link.
+            dev1.cam.forget_port(dev2)
+        if dev2.cam is not None:
+            dev2.cam.forget_port(dev1)
     
+    # Method sets the latency (seconds) and bandwidth (bits/s) of the link between two connected devices.
+    def set_link(self, dev1, dev2, latency, bandwidth):
+        self.links[(dev1, dev2)] = self.links[(dev2, dev1)] = (latency, bandwidth)
+
+    # Method returns the (latency, bandwidth) of the link between two devices (None if it uses the defaults).
+    def link(self, dev1, dev2):
+        return self.links.get((dev1, dev2))
+
+    # Method returns True if an NS for an address in the /64 prefix sent by dev1 reaches dev2, without flooding it.
+    def can_reach(self, dev1, dev2, prefix):
+        if (dev1 == dev2) or not (dev1.in_subnet(prefix) and dev2.in_subnet(prefix)):
+            return False
+        segments = self.segments
+        if segments.stale:
+            segments.rebuild(self.top)
+        if not segments.attached(self.top, dev1).isdisjoint(segments.attached(self.top, dev2)):
+            return True
+        if (dev1.dev_type == "switch") or (dev2.dev_type == "switch"): # Direct connections to a switch are in its segment.
+            return False
+        dev1_connections, dev2_connections = self.top[dev1], self.top[dev2]
+        if len(dev1_connections) <= len(dev2_connections):
+            return dev2 in dev1_connections
+        return dev1 in dev2_connections
+
     # Method returns a device in the topology corresponding to the given name of the device.
     def find_device(self, dev_name):
-        for dev in self.top:
-            if dev_name == dev.name:
-                return dev
-        return None
+        return self.names.get(dev_name)
 
     # Method returns a device in the topology corresponding to a given the IPv6 address of the device.
     def find_device_ip(self, ip):
-        for dev in self.top:
-            if ip in dev.extended:
-                return dev
-        return None
+        return self.ips.get(ip)
     
     # Method returns True if a device has the input IPv6 address.
     def ip_exist(self, dev_ip):
-        ext_ip = extend_ip(dev_ip)
-        for key in self.top:
-            if ext_ip in key.extended:
-                return True
-        return False
+        return ip_to_int(dev_ip) in self.ips
     
     # Method returns True if a device has the input MAC address.
     def mac_exist(self, dev_mac):
-        for key in self.top:
-            if (dev_mac in key.mac_add) or (dev_mac in key.sol_mac_add):
-                return True
-        return False
+        if not mac_val_check(dev_mac):
+            return False
+        return self.mac_taken(mac_to_int(dev_mac))
+
+    # Method returns True if the integer MAC address is assigned or is the Ethernet address of a solicited node group in use.
+    def mac_taken(self, mac):
+        return (mac in self.macs) or (sol_mac_to_ip(mac) in self.groups) # Solicited node Ethernet addresses map one to one to their group.
+
+    # Method returns the devices with an interface in the /64 prefix.
+    def subnet_devices(self, prefix):
+        return self.subnets.get(prefix, set())
+
+    # Method returns the devices listening to the solicited-node multicast address.
+    def group_devices(self, sol_ip):
+        return self.groups.get(sol_ip, set())
+
+    # Method returns the devices whose NIC filter passes frames sent to the Ethernet multicast address.
+    # Solicited node Ethernet addresses map one to one to their group, so no separate index is kept for them.
+    def nic_devices(self, sol_mac):
+        return self.groups.get(sol_mac_to_ip(sol_mac), set())
 
     # Method returns True if a conenction between the two devices exists.
     def check_connection(self, dev1, dev2):
-        if (dev1 in self.top[dev2]) or (dev2 in self.top[dev1]):
-            return True
-        return False
+        return edge_key(dev1, dev2) in self.edges
     
     # Method returns True if the name entered belongs to a device in the Topology.
     def name_validity(self, dev_name):
-        dev = self.find_device(dev_name)
-        if dev is None:
-            return True
-        return False
-        
\ No newline at end of file
+        return dev_name not in self.names
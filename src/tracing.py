@@ -0,0 +1,169 @@
+from time import perf_counter
+
+# Trace events are dictionaries with an "event" key naming the kind of event:
+#   ns_sent           src, target, sol_mac, sol_ip, ip, listeners
+#                                                       (NS leaves the sending device, listeners are the devices its NIC filter passes)
+#   ns_received       dev                               (a device receives the NS)
+#   ns_flooded        dev                               (a switch floods the NS)
+#   ns_dropped        dev, layer                        (layer is "nic", "ipv6" or "icmpv6")
+#   ns_accepted       dev                               (the target accepts the NS)
+#   na_path           src, dst, path, frames            (NA sent back along path, from src to dst)
+#   na_lost           src, dst, frames                  (NA forwarded by stale MAC tables never reached dst)
+#   resolution_failed src, target
+#   flood_done        src, target, resolved, frames     (frames counts the NS frame deliveries)
+#   cache_hit         src, ip, mac, state               (resolved from the sender's neighbor cache, no NS is sent)
+#   dad_sent          src, sol_mac, sol_ip, ip, listeners
+#                                                       (Duplicate Address Detection NS from :: for the tentative address ip)
+#   dad_defended      src, dst, ip, path                (src already uses ip and answers with an NA to all nodes along path)
+#   dad_done          src, ip, duplicate, frames
+#   packet_forwarded  dev, next_hop, ip, via, mac       (dev resolved its next hop toward ip, the router at address via, and sends the packet on)
+#   packet_dropped    dev, ip, reason                   (reason is "no_route", "hop_limit" or "unresolved")
+#   packet_delivered  src, target, ip, path             (path lists the sender, the routers and the target)
+
+# Sink that keeps the trace events in memory.
+class ListSink:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def flush(self):
+        return
+
+# Sink that writes the trace events as JSON Lines, only writing to the file every buffer_size events.
+class JsonLinesSink:
+    def __init__(self, out, buffer_size=4096):
+        import json # Only the jsonl trace needs it, and it is slow to import (it loads re).
+        self.out = out
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.dumps = json.dumps
+
+    def emit(self, event):
+        self.buffer.append(self.dumps(event))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.out.write("\n".join(self.buffer) + "\n")
+            self.buffer.clear()
+        self.out.flush()
+
+# Sink that passes the trace events on to another sink and adds the time spent doing so to stats.output_time.
+class TimedSink:
+    def __init__(self, sink, stats):
+        self.sink = sink
+        self.stats = stats
+
+    def emit(self, event):
+        start = perf_counter()
+        self.sink.emit(event)
+        self.stats.output_time += perf_counter() - start
+
+    def flush(self):
+        start = perf_counter()
+        self.sink.flush()
+        self.stats.output_time += perf_counter() - start
+
+# Sink that prints the trace events in the simulator's readable format.
+class PrettySink:
+    def emit(self, event):
+        match event["event"]:
+            case "ns_sent":
+                print("----------------------------NEIGHBOR SOLICITATION----------------------------")
+                print(event["src"] + " is sending broadcast.")
+                print("#############################################################################")
+                print("Packet for " + event["target"] + ": ")
+                print("[DA: Multicast][DA: Solicited-Node Multicast][ICMPv6 NS - Target IPv6 Address]")
+                print("[" + event["sol_mac"] + "] [" + event["sol_ip"] + "] [" + event["ip"] + "]")
+                print("#############################################################################")
+                print("\n")
+            case "ns_received":
+                print("*****************************************************************************")
+                print("'" + event["dev"] + "' recived neighbor solicitation packet.")
+            case "ns_flooded":
+                print(event["dev"] + " (BROADCASTING): the switch is broadcasting the packet.")
+                print("*****************************************************************************\n")
+            case "ns_accepted":
+                print("Passing Packet Up:")
+                print("NIC Card->IPv6 Process->ICMPv6 Process")
+                print("\n")
+                print(event["dev"] + " (ACCEPTED): Ethernet multicast, IPv6 solicited-node multicast/global unicast match.")
+                print("\n")
+                print("*****************************************************************************\n")
+            case "ns_dropped":
+                match event["layer"]:
+                    case "nic":
+                        print(event["dev"] + " (DROPPED): Ethernet multicast address did NOT match.")
+                    case "ipv6":
+                        print("Passing Packet Up:")
+                        print("NIC Card->")
+                        print()
+                        print(event["dev"] + " (DROPPED): IPv6 solicited-node multicast address did NOT match.")
+                    case "icmpv6":
+                        print("Passing Packet Up:")
+                        print("NIC Card->IPv6 Process->")
+                        print()
+                        print(event["dev"] + " (DROPPED): IPv6 global unicast address did NOT match.")
+                print("*****************************************************************************\n")
+            case "na_path":
+                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!-NEIGHBOR ADVERTISMENT-!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+                print("Neighbor Advertisment is being sent from '" + event["src"] + "' to '" + event["dst"] + "'.")
+                print("->".join(event["path"])) # NA packet is sent directly back to the device that sent the NS packet.
+                print(event["dst"] + " recived neighbor advertisment " + event["src"])
+                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            case "na_lost":
+                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!-NEIGHBOR ADVERTISMENT-!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+                print("Neighbor Advertisment sent from '" + event["src"] + "' to '" + event["dst"] + "' was lost.")
+                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            case "resolution_failed":
+                print("Address Resolution failed.")
+                print("The IPv6 address trying to be resolved was in a different subnet than the device sending the NS packet.")
+            case "flood_done":
+                print("-----------------------------------------------------------------------------")
+            case "cache_hit":
+                print("----------------------------NEIGHBOR CACHE HIT-------------------------------")
+                print(event["src"] + " found " + event["ip"] + " in its neighbor cache (" + event["state"] + "): " + event["mac"])
+                print("No Neighbor Solicitation was sent.")
+                print("-----------------------------------------------------------------------------")
+            case "dad_sent":
+                print("------------------------DUPLICATE ADDRESS DETECTION--------------------------")
+                print(event["src"] + " is checking that " + event["ip"] + " is not used by another device.")
+                print("#############################################################################")
+                print("[DA: Multicast][DA: Solicited-Node Multicast][SA: Unspecified][ICMPv6 NS - Target IPv6 Address]")
+                print("[" + event["sol_mac"] + "] [" + event["sol_ip"] + "] [::] [" + event["ip"] + "]")
+                print("#############################################################################")
+                print("\n")
+            case "dad_defended":
+                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!-NEIGHBOR ADVERTISMENT-!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+                print("'" + event["src"] + "' already uses " + event["ip"] + " and defends it with a Neighbor Advertisment to all nodes (ff02::1).")
+                print("->".join(event["path"]))
+                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            case "dad_done":
+                if event["duplicate"]:
+                    print("Duplicate address detected, " + event["src"] + " can not use " + event["ip"] + ".")
+                else:
+                    print("No device answered, " + event["ip"] + " is unique on " + event["src"] + "'s links.")
+                print("-----------------------------------------------------------------------------")
+            case "packet_forwarded":
+                print("++++++++++++++++++++++++++++++++++FORWARDING+++++++++++++++++++++++++++++++++++")
+                print(event["dev"] + " sends the packet for " + event["ip"] + " to its next hop " + event["next_hop"] + " (" + event["via"] + ", " + event["mac"] + ").")
+                print("+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++\n")
+            case "packet_dropped":
+                match event["reason"]:
+                    case "no_route":
+                        print(event["dev"] + " (DROPPED): no route to the subnet of " + event["ip"] + ".")
+                    case "hop_limit":
+                        print(event["dev"] + " (DROPPED): the packet for " + event["ip"] + " exceeded the hop limit.")
+                    case "unresolved":
+                        print(event["dev"] + " (DROPPED): the next hop toward " + event["ip"] + " could not be resolved.")
+            case "packet_delivered":
+                print("Packet for " + event["ip"] + " delivered to " + event["target"] + ": " + "->".join(event["path"]))
+        return
+
+    def flush(self):
+        return
+
+PRETTY = PrettySink() # Default sink, quiet runs pass None as the sink instead.
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The simulator's modules import each other by name from src/, the way IPv6AddRes.py is run.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,96 @@
+import ipaddress
+import random
+import pytest
+import add_manipulation as am
+
+np = am.load_numpy()
+
+@pytest.mark.parametrize("text", ["::", "::1", "2001:db8::", "2001:db8::1", "2001:0:0:1::1", "2001:db8:0:0:1:0:0:1", "1:0:0:0:0:0:0:0",
+                                  "2001:db8:1:2:3:4:5:6", "ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff", "2001:DB8::A", "::ffff:1.2.3.4"])
+def test_ip_to_int_matches_ipaddress(text):
+    assert am.ip_to_int(text) == int(ipaddress.IPv6Address(text))
+
+@pytest.mark.parametrize("text", ["", ":", ":::", "1::2::3", "2001:db8", "1:2:3:4:5:6:7:8:9", "1:2:3:4:5:6:7::8", "12345::", "2001:db8::g",
+                                  "fe80::1%eth0", "1.2.3.4"])
+def test_ip_to_int_rejects_invalid(text):
+    assert am.ipv6_val_check(text) is False
+
+def test_format_ip_round_trip():
+    rng = random.Random(0)
+    for _ in range(2000):
+        groups = [rng.choice([0, 0, 1, rng.randrange(1 << 16)]) for _ in range(8)] # Runs of zeros exercise the '::' rules.
+        value = 0
+        for group in groups:
+            value = (value << 16) | group
+        text = am.format_ip(value)
+        assert text == ipaddress.IPv6Address(value).compressed # RFC 5952, like ipaddress.
+        assert am.ip_to_int(text) == value
+
+@pytest.mark.parametrize("text", ["2001:db8::1", "2001:db8:1:2:3:4:5:6", "fe80::abcd:ef12", "2001:db8::ff00:1", "::"])
+def test_solicited_node_addresses_match_ipaddress(text):
+    ip = am.ip_to_int(text)
+    expected = ipaddress.IPv6Address(int(ipaddress.IPv6Address("ff02::1:ff00:0")) | (ip & 0xffffff)) # RFC 4291, section 2.7.1.
+    assert am.sol_ip_int(ip) == int(expected)
+    assert ipaddress.IPv6Address(am.format_sol_ip(am.sol_ip_int(ip))) == expected
+    sol_mac = am.sol_mac_int(ip) # 33-33 followed by the low 32 bits of the multicast address (RFC 2464, section 7).
+    assert am.format_mac(sol_mac) == "33-33-" + "-".join("%02x" % byte for byte in expected.packed[12:])
+    assert am.sol_mac_to_ip(sol_mac) == am.sol_ip_int(ip)
+    assert am.sol_mac_to_ip(am.mac_to_int("33-33-00-00-00-01")) is None
+
+def test_mac_round_trip_and_prefix():
+    rng = random.Random(1)
+    for _ in range(200):
+        mac = rng.getrandbits(48)
+        assert am.mac_to_int(am.format_mac(mac)) == mac
+    assert am.format_mac(am.mac_to_int("0A-1b-2C-3d-4E-5f")) == "0a-1b-2c-3d-4e-5f"
+    assert am.get_prefix(am.ip_to_int("2001:db8:1:2:3:4:5:6")) == int(ipaddress.IPv6Address("2001:db8:1:2::")) >> 64
+
+# Rows with IPv6 and MAC addresses repeated in every combination (and some invalid ones).
+def mixed_rows(count, seed):
+    rng = random.Random(seed)
+    ips = ["2001:db8::%x" % rng.randrange(count // 3) for _ in range(count)]
+    macs = ["02-00-00-00-%02x-%02x" % divmod(rng.randrange(count // 3), 256) for _ in range(count)]
+    for row in rng.sample(range(count), count // 20):
+        ips[row] = rng.choice(["fe80::1", "2001:db8::zz", "::"])
+    for row in rng.sample(range(count), count // 20):
+        macs[row] = "02-00-00"
+    return ips, macs
+
+# Function derives the rows with derive_rows() or derive_rows_np() after the shared parsing step of derive_bulk().
+def derive_with(derive, ips, macs):
+    res = am.BulkAddresses(len(ips))
+    ip_vals, mac_vals = [0] * len(ips), [0] * len(ips)
+    for row, (ip, mac) in enumerate(zip(ips, macs)):
+        ip_val = am.ip_to_int(ip)
+        if ip_val is None:
+            res.errors[row] = "Invalid IPv6 address."
+        elif not am.mac_val_check(mac):
+            res.errors[row] = "Invalid MAC address."
+        else:
+            ip_vals[row], mac_vals[row] = ip_val, am.mac_to_int(mac)
+    derive(res, ip_vals, mac_vals)
+    return res
+
+@pytest.mark.skipif(np is None, reason="NumPy is not installed")
+def test_derive_rows_np_first_wins():
+    ips = ["2001::a", "2001::b", "2001::b"]
+    macs = ["00-00-00-00-00-01", "00-00-00-00-00-01", "00-00-00-00-00-02"]
+    res = derive_with(am.derive_rows_np, ips, macs)
+    assert res.errors == {1: "The input MAC address was already assigned."}
+    assert res.ip[2] == am.ip_to_int("2001::b")
+
+@pytest.mark.skipif(np is None, reason="NumPy is not installed")
+@pytest.mark.parametrize("seed", range(5))
+def test_derive_rows_np_matches_derive_rows(seed):
+    ips, macs = mixed_rows(3000, seed)
+    expected = derive_with(am.derive_rows, ips, macs)
+    found = derive_with(am.derive_rows_np, ips, macs)
+    assert found.errors == expected.errors
+    for col in am.BulkAddresses.__slots__[:-1]:
+        assert getattr(found, col) == getattr(expected, col)
+
+def test_derive_bulk_same_rows_below_and_above_numpy_rows():
+    ips, macs = mixed_rows(am.NUMPY_ROWS * 2, 7)
+    whole = am.derive_bulk(ips, macs)
+    small = am.derive_bulk(ips[:am.NUMPY_ROWS - 1], macs[:am.NUMPY_ROWS - 1])
+    assert {row: reason for row, reason in whole.errors.items() if row < am.NUMPY_ROWS - 1} == small.errors
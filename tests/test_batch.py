@@ -0,0 +1,29 @@
+import io
+import IPv6AddRes
+from topology import Topology
+
+def test_batch_reports_every_failed_line(capsys):
+    script = io.StringIO("AS s1\n\n# comment\nxx\nAS s1\nAR r1 2001:db8::1\nAS s2\nE\nAS s3\n")
+    my_top = Topology()
+    assert IPv6AddRes.run_batch(my_top, script) == 3
+    assert sorted(my_top.names) == ["s1", "s2"]
+    assert capsys.readouterr().err.splitlines() == [
+        "line 4: Unknown option 'XX'.",
+        "line 5: This device already exits.",
+        "line 6: Usage: AR NAME IPV6 MAC",
+    ]
+
+def test_batch_continues_after_unexpected_errors(capsys, monkeypatch):
+    run_option = IPv6AddRes.batch_option
+
+    # Function stands in for an option failing with an error it does not convert to a SimError.
+    def broken_option(my_top, words):
+        if words[0] == "LD":
+            raise KeyError("devices")
+        run_option(my_top, words)
+
+    monkeypatch.setattr(IPv6AddRes, "batch_option", broken_option)
+    my_top = Topology()
+    assert IPv6AddRes.run_batch(my_top, io.StringIO("LD snapshot.bin\nAS s1\n")) == 1
+    assert "s1" in my_top.names
+    assert capsys.readouterr().err.splitlines() == ["line 1: KeyError: 'devices'"]
@@ -0,0 +1,43 @@
+import json
+import pytest
+import benchmark
+
+def test_default_arguments():
+    args = benchmark.parse_args([])
+    assert (args.sizes, args.only, args.repeat, args.startup, args.seed, args.save, args.compare, args.threshold) == \
+           ("1000,10000,100000", None, 3, None, 0, None, None, 0.2)
+
+@pytest.mark.parametrize("name", list(benchmark.BENCHMARKS))
+def test_every_benchmark_runs_at_a_small_size(name):
+    result = benchmark.measure(benchmark.BENCHMARKS[name], 200, 1, 0)
+    assert result["ops"] > 0 and result["seconds"] > 0 and result["peak_kib"] >= 0
+
+def test_unknown_benchmark_is_rejected(capsys):
+    assert benchmark.main(["--only", "lookup,bogus", "--sizes", "100"]) == 2
+    assert capsys.readouterr().err == "Unknown benchmark 'bogus'.\n"
+
+def test_size_the_topology_can_not_be_generated_for_is_rejected(capsys, monkeypatch):
+    # Function stands in for a benchmark whose generator rejects the size.
+    def too_small(size, rng):
+        raise ValueError("a tree needs at least 2 levels")
+
+    monkeypatch.setitem(benchmark.BENCHMARKS, "lookup", too_small)
+    assert benchmark.main(["--only", "lookup", "--sizes", "1", "--repeat", "1"]) == 2
+    assert capsys.readouterr().err == "Benchmark 'lookup' can not run at size 1: a tree needs at least 2 levels.\n"
+
+def test_saved_baseline_is_compared(tmp_path, capsys):
+    path = tmp_path / "baseline.json"
+    assert benchmark.main(["--only", "lookup", "--sizes", "100,200", "--repeat", "1", "--seed", "4", "--save", str(path)]) == 0
+    saved = json.loads(path.read_text())
+    assert (saved["seed"], sorted(saved["results"]["lookup"]), saved["startup"]) == (4, ["100", "200"], None)
+    saved["results"]["lookup"]["200"]["ops_per_sec"] *= 1000 # A baseline far faster than any run.
+    path.write_text(json.dumps(saved))
+    capsys.readouterr()
+    assert benchmark.main(["--only", "lookup", "--sizes", "100,200", "--repeat", "1", "--compare", str(path), "--threshold", "0.9"]) == 1
+    regressions = [line for line in capsys.readouterr().out.splitlines() if line.startswith("REGRESSION")]
+    assert len(regressions) == 1 and regressions[0].startswith("REGRESSION lookup (size 200): ")
+
+def test_regressions_beyond_the_threshold():
+    baseline = {"lookup": {"100": {"ops_per_sec": 1000.0}, "200": {"ops_per_sec": 1000.0}}}
+    results = {"lookup": {"100": {"ops_per_sec": 850.0}, "200": {"ops_per_sec": 750.0}, "400": {"ops_per_sec": 1.0}}, "connect": {"100": {"ops_per_sec": 1.0}}}
+    assert benchmark.regressions(results, baseline, 0.2) == [("lookup", "200", 1000.0, 750.0)]
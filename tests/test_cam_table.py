@@ -0,0 +1,25 @@
+from cam_table import CamTable
+
+MAC = 0x020000000001
+
+def test_learned_ports_move_and_age_out():
+    cam = CamTable(aging=10.0)
+    assert cam.lookup(MAC, 0.0) is None # Unknown addresses are flooded.
+    cam.learn(MAC, "P1", 0.0)
+    assert cam.lookup(MAC, 9.9) == "P1"
+    cam.learn(MAC, "P2", 5.0) # The station moved, refreshing the entry.
+    assert cam.lookup(MAC, 14.9) == "P2"
+    assert cam.lookup(MAC, 15.0) is None
+    assert len(cam) == 0
+    assert (cam.hits, cam.misses) == (2, 2)
+
+def test_forget_port_and_eviction():
+    cam = CamTable(size=2)
+    cam.learn(MAC, "P1", 0.0)
+    cam.learn(MAC + 1, "P2", 0.0)
+    cam.learn(MAC, "P1", 1.0) # Refreshed, so MAC + 1 is the oldest.
+    cam.learn(MAC + 2, "P1", 1.0)
+    assert cam.evictions == 1
+    assert cam.lookup(MAC + 1, 1.0) is None
+    cam.forget_port("P1")
+    assert len(cam) == 0
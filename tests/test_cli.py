@@ -0,0 +1,36 @@
+import io
+import pytest
+import IPv6AddRes
+from topology import Topology
+
+COMMAND_LINES = [
+    [], ["-b", "script.txt"], ["--batch", "-"], ["--batch=script.txt", "-t", "quiet"], ["-t", "jsonl", "--trace-file", "trace.jsonl"],
+    ["--trace=pretty", "--serve", "127.0.0.1:0"], ["-b", "a.txt", "-b", "b.txt"], ["--serve=unix:/tmp/sim.sock", "--batch", "-"],
+]
+
+@pytest.mark.parametrize("argv", COMMAND_LINES)
+def test_quick_args_match_argparse(argv, monkeypatch):
+    quick = vars(IPv6AddRes.parse_args(argv))
+    monkeypatch.setattr(IPv6AddRes, "quick_args", lambda argv: None)
+    assert quick == vars(IPv6AddRes.parse_args(argv))
+
+@pytest.mark.parametrize("argv", [["-h"], ["-t", "bogus"], ["--bat", "x"], ["-b"], ["-b", "-t", "quiet"], ["-bscript.txt"], ["extra"]])
+def test_quick_args_leave_the_rest_to_argparse(argv):
+    assert IPv6AddRes.quick_args(argv) is None
+
+# Every option that imports its modules when it runs, on the default test topology.
+def test_lazily_imported_options(tmp_path, capsys):
+    script = ["TT", "MR gateways", "ES gateways", "ST all", "DC", "SV " + str(tmp_path / "top.bin"), "LD " + str(tmp_path / "top.bin"),
+              "SV " + str(tmp_path / "top.json"), "LD " + str(tmp_path / "top.json"), "IN on", "SS E1 2001:1::1",
+              "IN json " + str(tmp_path / "stats.json"), "IM " + str(tmp_path / "missing.csv")]
+    assert IPv6AddRes.run_batch(Topology(), io.StringIO("\n".join(script))) == 1
+    assert capsys.readouterr().err.startswith("line 13: Could not import the inventory")
+
+def test_missing_batch_script_is_reported(tmp_path, capsys):
+    path = str(tmp_path / "missing.txt")
+    assert IPv6AddRes.main(["--batch", path, "-t", "quiet"]) == 1
+    assert capsys.readouterr().err == "Could not read the batch script '" + path + "': No such file or directory\n"
+
+def test_batch_script_that_is_a_directory_is_reported(tmp_path, capsys):
+    assert IPv6AddRes.main(["--batch", str(tmp_path), "-t", "quiet"]) == 1
+    assert capsys.readouterr().err.startswith("Could not read the batch script '" + str(tmp_path) + "': ")
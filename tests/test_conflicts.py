@@ -0,0 +1,82 @@
+import contextlib
+import io
+import pytest
+import conflicts
+import IPv6AddRes
+import simulation
+import tracing
+import add_manipulation as am
+from topology import Topology, Device
+
+# Function returns a device with the IPv6 and MAC addresses given as strings.
+def device(name, dev_type, ips, macs):
+    return Device(name, dev_type, [am.ip_to_int(ip) for ip in ips], [am.mac_to_int(mac) for mac in macs])
+
+def test_scan_reports_every_repeated_address():
+    devices = [
+        device("E1", "end", ["2001:db8::1"], ["02-00-00-00-00-01"]),
+        device("E2", "end", ["2001:db8::1"], ["02-00-00-00-00-02"]), # Same IPv6 address as E1.
+        device("R1", "router", ["2001:db8:1::5", "2001:db8:2::5"], ["02-00-00-00-00-02", "02-00-00-00-00-03"]), # Same MAC as E2.
+        device("R2", "router", ["2001:db8:3::7", "2001:db8:3::7"], ["02-00-00-00-00-07", "02-00-00-00-00-08"]), # One address twice.
+        device("E3", "end", ["2001:db8:9::1"], ["02-00-00-00-00-09"]), # Same group as E1 and E2, with another address.
+    ]
+    found, shared = conflicts.scan(devices)
+    assert found == [("ipv6", am.ip_to_int("2001:db8::1"), ["E1", "E2"]), ("ipv6", am.ip_to_int("2001:db8:3::7"), ["R2", "R2"]),
+                     ("mac", am.mac_to_int("02-00-00-00-00-02"), ["E2", "R1"])]
+    assert shared == 2 # ...::1 (E1, E2 and E3) and ...::5 (both of R1's addresses).
+    assert conflicts.scan(devices[2:3] + devices[4:]) == ([], 1)
+
+def test_dc_prints_the_conflicts(capsys):
+    my_top = Topology()
+    for dev in (device("E1", "end", ["2001:db8::1"], ["02-00-00-00-00-01"]), device("E2", "end", ["2001:db8::1"], ["02-00-00-00-00-01"])):
+        my_top.add_device(dev) # Added without the prompt's checks, like a snapshot or an inventory could.
+    assert IPv6AddRes.scan_conflicts(my_top) == 2
+    assert capsys.readouterr().out.splitlines()[1:-1] == [
+        "IPv6 2001:db8::1: E1, E2", "MAC 02-00-00-00-00-01: E1, E2", "Solicited-node multicast groups shared by different addresses: 0"]
+
+# Function returns a switch with two end devices and a router, and a second switch with an end device, not connected to the first.
+def segments():
+    my_top = Topology()
+    devices = [Device("S1", "switch"), Device("S2", "switch"), device("E1", "end", ["2001:db8::10"], ["02-00-00-00-00-10"]),
+               device("E2", "end", ["2001:db8:0:0:1::10"], ["02-00-00-00-00-11"]), # Same group as E1's address.
+               device("R1", "router", ["2001:db8::1"], ["02-00-00-00-00-01"]), device("E3", "end", ["2001:db8::30"], ["02-00-00-00-00-30"])]
+    for dev in devices:
+        my_top.add_device(dev)
+    for name1, name2 in [("S1", "E1"), ("S1", "E2"), ("S1", "R1"), ("S2", "E3")]:
+        my_top.add_connection(my_top.find_device(name1), my_top.find_device(name2))
+    return my_top
+
+@pytest.mark.parametrize("sender, ip, defender", [("R1", "2001:db8::10", "E1"), ("R1", "2001:db8::30", None), ("E3", "2001:db8::10", None),
+                                                  ("R1", "2001:db8::99", None)])
+def test_dad_is_answered_by_a_device_in_reach(sender, ip, defender):
+    my_top = segments()
+    stats = simulation.Stats()
+    found = simulation.dad(my_top, my_top.find_device(sender), am.ip_to_int(ip), None, stats)
+    assert (found.name if found is not None else None) == defender
+    if sender == "R1":
+        assert stats.visited == 3 # S1, E1 and E2 (the NS is sent before R1 has the address).
+
+def test_dad_of_a_device_not_in_the_topology():
+    sink = tracing.ListSink()
+    assert simulation.dad(segments(), device("E9", "end", [], []), am.ip_to_int("2001:db8::10"), sink) is None
+    assert sink.events[-1] == {"event": "dad_done", "src": "E9", "ip": "2001:db8::10", "duplicate": False, "frames": 0}
+
+def test_connection_bringing_a_duplicate_into_reach_is_undone(monkeypatch):
+    monkeypatch.setattr(IPv6AddRes, "DAD", True)
+    monkeypatch.setattr(IPv6AddRes, "TRACE", None)
+    my_top = segments()
+    twin = device("E4", "end", ["2001:db8::10"], ["02-00-00-00-00-40"]) # Same address as E1, on no link yet.
+    my_top.add_device(twin)
+    with pytest.raises(IPv6AddRes.SimError, match="is used by E1. The connection was not created."):
+        IPv6AddRes.connect(my_top, my_top.find_device("S1"), twin)
+    assert not my_top.check_connection(my_top.find_device("S1"), twin)
+    with contextlib.redirect_stdout(io.StringIO()):
+        IPv6AddRes.connect(my_top, my_top.find_device("S2"), twin) # E1 is not on this link.
+    assert my_top.check_connection(my_top.find_device("S2"), twin)
+
+def test_dad_rejects_an_address_used_on_the_link(capsys, monkeypatch):
+    monkeypatch.setattr(IPv6AddRes, "DAD", False)
+    monkeypatch.setattr(IPv6AddRes, "TRACE", None)
+    script = ["TT", "DA on", "AI R2 2001:2::6 aa-bb-cc-dd-ee-01", "AI R2 2001:2::77 aa-bb-cc-dd-ee-01", "DA maybe"]
+    assert IPv6AddRes.run_batch(Topology(), io.StringIO("\n".join(script))) == 2
+    assert capsys.readouterr().err.splitlines() == ["line 3: Duplicate address detected: 2001:2::6 is used by E3.", "line 5: Input is invalid."]
@@ -0,0 +1,123 @@
+import contextlib
+import io
+import pytest
+import events
+import IPv6AddRes
+import generators
+import runner
+import simulation
+import add_manipulation as am
+from topology import Topology, Device
+
+COUNTS = ("frames", "visited", "drop_nic", "drop_ipv6", "drop_icmpv6", "subnet_checks", "resolved", "failed", "hops")
+
+# Engine delivering every NS through an event, like before devices dropped by their NIC filter were counted when the NS is sent.
+class EventEngine(events.Engine):
+    def flood(self, dev, from_dev, res):
+        for neighbor in self.top.top[dev]:
+            if (neighbor is not from_dev) and (neighbor.name not in res.ns_seen):
+                self.stats.subnet_checks += 1
+                if neighbor.in_subnet(res.prefix):
+                    self.send(dev, neighbor, events.NS, res, 1)
+
+# Function runs a storm of every end device resolving its routers and returns the engine.
+def storm(engine_type, my_top, **options):
+    engine = engine_type(my_top, stats=simulation.Stats(), use_cache=False, load=events.Load(), **options)
+    for dev_name, ip in runner.gateway_pairs(my_top):
+        engine.add(dev_name, ip, 0.0)
+    engine.run()
+    return engine
+
+# Function returns switches in a ring with every end device attached to two of them, so NSs reach them over loops.
+def dual_homed(switches=4, hosts=6):
+    my_top = Topology()
+    ring = [Device("S%d" % ind, "switch") for ind in range(switches)]
+    router = Device("R1", "router", [am.ip_to_int("2001:db8::1")], [am.mac_to_int("02-00-00-00-01-00")])
+    for dev in ring + [router]:
+        my_top.add_device(dev)
+    for ind, switch in enumerate(ring):
+        my_top.add_connection(switch, ring[ind - 1])
+    my_top.add_connection(router, ring[0])
+    for ind in range(hosts):
+        host = Device("E%d" % ind, "end", [am.ip_to_int("2001:db8::%x" % (ind + 16))], [am.mac_to_int("02-00-00-00-00-%02x" % ind)])
+        my_top.add_device(host)
+        my_top.add_connection(host, ring[ind % switches])
+        my_top.add_connection(host, ring[(ind + 1) % switches])
+    return my_top
+
+@pytest.mark.parametrize("build", [dual_homed] + [lambda kind=kind, sizes=sizes: generators.generate(Topology(), kind, *sizes, seed=3)
+                                   for kind, sizes in [("random", (6, 30, 6)), ("leaf-spine", (3, 4, 5)), ("tree", (2, 2, 3)), ("flat", (4, 12))]])
+def test_nic_drops_match_delivered_frames(build):
+    engine = storm(events.Engine, build())
+    reference = storm(EventEngine, build())
+    assert {name: getattr(engine.stats, name) for name in COUNTS} == {name: getattr(reference.stats, name) for name in COUNTS}
+    assert engine.load.links == reference.load.links
+    assert engine.latencies() == reference.latencies()
+
+def test_storm_leaves_neighbor_caches_alone():
+    my_top = generators.generate(Topology(), "leaf-spine", 2, 2, 4)
+    engine = storm(events.Engine, my_top)
+    assert engine.stats.resolved > 0
+    assert all((dev.cache is None) or (len(dev.cache) == 0) for dev in my_top.top)
+
+# Function returns the default test topology ('TT').
+def default_top():
+    my_top = Topology()
+    with contextlib.redirect_stdout(io.StringIO()):
+        IPv6AddRes.test_top(my_top)
+    return my_top
+
+def test_latency_adds_up_the_links_of_the_ns_and_na():
+    engine = events.Engine(default_top())
+    res = engine.add("E2", "2001:2::21")
+    engine.run()
+    hop = events.FRAME_BYTES * 8 / events.BANDWIDTH + events.LATENCY
+    assert res.latency() == pytest.approx(4 * hop) # E2 -> S1 -> R2 and back.
+    assert (engine.stats.resolved, engine.stats.hops) == (1, 2)
+
+def test_slow_link_delays_both_directions():
+    my_top = default_top()
+    my_top.set_link(my_top.find_device("S1"), my_top.find_device("R2"), 1e-3, 1e6)
+    engine = events.Engine(my_top)
+    res = engine.add("E2", "2001:2::21")
+    engine.run()
+    hop = events.FRAME_BYTES * 8 / events.BANDWIDTH + events.LATENCY
+    slow = events.FRAME_BYTES * 8 / 1e6 + 1e-3
+    assert res.latency() == pytest.approx(2 * hop + 2 * slow)
+
+def test_frames_sharing_a_link_wait_for_it():
+    engine = events.Engine(default_top())
+    first, second = engine.add("E2", "2001:2::21"), engine.add("E3", "2001:2::21")
+    engine.run()
+    tx_time = events.FRAME_BYTES * 8 / events.BANDWIDTH
+    assert second.latency() - first.latency() == pytest.approx(tx_time) # Both NSs arrive at S1 together and share S1 -> R2.
+    assert engine.queue_time == pytest.approx(tx_time)
+    assert engine.latencies() == [first.latency(), second.latency()]
+
+def test_run_stops_at_the_given_time():
+    engine = events.Engine(default_top())
+    res = engine.add("E2", "2001:2::21", at=1e-3)
+    engine.run(until=1e-3 + 1e-5)
+    assert res.end is None
+    engine.run()
+    assert res.end == pytest.approx(1e-3 + res.latency())
+    assert engine.top.clock == res.end
+
+@pytest.mark.parametrize("slow, path", [(False, ["E1", "S1", "R1"]), (True, ["E1", "S2", "S3", "R1"])])
+def test_first_ns_to_arrive_sets_the_na_path(slow, path):
+    my_top = Topology()
+    router = Device("R1", "router", [am.ip_to_int("2001:db8::1")], [am.mac_to_int("02-00-00-00-00-01")])
+    host = Device("E1", "end", [am.ip_to_int("2001:db8::10")], [am.mac_to_int("02-00-00-00-00-10")])
+    switches = [Device("S%d" % ind, "switch") for ind in range(1, 4)]
+    for dev in [router, host] + switches:
+        my_top.add_device(dev)
+    for dev1, dev2 in [(host, switches[0]), (switches[0], router), (host, switches[1]), (switches[1], switches[2]), (switches[2], router)]:
+        my_top.add_connection(dev1, dev2)
+    if slow:
+        my_top.set_link(switches[0], router, 1e-3, events.BANDWIDTH)
+    engine = events.Engine(my_top)
+    res = engine.add("E1", "2001:db8::1")
+    engine.run()
+    assert engine.stats.hops == len(path) - 1
+    hop = events.FRAME_BYTES * 8 / events.BANDWIDTH + events.LATENCY
+    assert res.latency() == pytest.approx(2 * (len(path) - 1) * hop)
@@ -0,0 +1,36 @@
+import pytest
+import generators
+import simulation
+from topology import Topology
+
+TIMES = ("flood_time", "na_time", "output_time")
+
+# Function returns the statistics without the timings.
+def counts(stats):
+    return {name: value for name, value in stats.as_dict().items() if name not in TIMES}
+
+@pytest.mark.parametrize("kind, sizes", [("random", (4, 20, 5)), ("leaf-spine", (2, 3, 3)), ("tree", (2, 2, 3)), ("multi-subnet", (2, 2, 3))])
+def test_frozen_flood_matches_request(kind, sizes):
+    my_top = generators.generate(Topology(), kind, *sizes, seed=5)
+    devices = list(my_top.top)
+    for dev1 in devices:
+        for dev2 in devices:
+            for ip in dev2.extended:
+                if not dev1.same_sub_ip(ip):
+                    continue
+                stats, frozen_stats = simulation.Stats(), simulation.Stats()
+                path = simulation.request(my_top, dev1, dev2, [], ip, None, stats)
+                view = my_top.frozen()
+                frozen_path = view.request(view.index[dev1.name], view.index[dev2.name], ip, frozen_stats)
+                assert [view.devices[ind] for ind in frozen_path] == path
+                assert counts(frozen_stats) == counts(stats)
+
+def test_device_resolving_its_own_address():
+    my_top = generators.generate(Topology(), "flat", 1, 3)
+    dev = next(dev for dev in my_top.top if dev.dev_type == "end")
+    stats, frozen_stats = simulation.Stats(), simulation.Stats()
+    assert simulation.request(my_top, dev, dev, [], dev.extended[0], None, stats) == [dev]
+    view = my_top.frozen()
+    assert view.request(view.index[dev.name], view.index[dev.name], dev.extended[0], frozen_stats) == [view.index[dev.name]]
+    assert counts(frozen_stats) == counts(stats)
+    assert (stats.resolved, stats.frames, stats.visited) == (1, 0, 0)
@@ -0,0 +1,20 @@
+import pytest
+import generators
+from topology import Topology
+
+def test_multi_subnet_single_router():
+    my_top = generators.generate(Topology(), "multi-subnet", 1, 2, 3)
+    routers = [dev for dev in my_top.top if dev.dev_type == "router"]
+    assert len(routers) == 1
+    assert len(routers[0].extended) == 2 # No link subnet without a next router.
+    assert len(my_top.top) == 1 + 2 + 2 * 3
+
+@pytest.mark.parametrize("kind, sizes", [("multi-subnet", (0,)), ("multi-subnet", (2, 0)), ("random", (0,)), ("leaf-spine", (0,)),
+                                         ("tree", (1, 0))])
+def test_generate_rejects_sizes_below_minimum(kind, sizes):
+    with pytest.raises(ValueError):
+        generators.generate(Topology(), kind, *sizes)
+
+def test_random_graph_rejects_no_switch():
+    with pytest.raises(ValueError):
+        generators.random_graph(Topology(), switches=0)
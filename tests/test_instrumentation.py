@@ -0,0 +1,34 @@
+import io
+import json
+import IPv6AddRes
+import simulation
+from topology import Topology
+
+SCRIPT = ["TT", "AE E4 2001:2:0:0:1::21 02-00-00-00-00-04", "AC E4 S1", "IN show", "IN on", "SS E2 2001:2::21", "SS E2 2001:2::21",
+          "SS E1 2001:1::1"]
+
+def test_counters_of_the_simulations(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(IPv6AddRes, "STATS", None)
+    monkeypatch.setattr(IPv6AddRes, "TRACE", None)
+    path = str(tmp_path / "stats.json")
+    assert IPv6AddRes.run_batch(Topology(), io.StringIO("\n".join(SCRIPT + ["IN json " + path, "IN off", "IN show"]))) == 2
+    assert capsys.readouterr().err.splitlines() == ["line 4: Instrumentation is off.", "line 11: Instrumentation is off."]
+    with open(path) as saved:
+        stats = json.load(saved)
+    assert {name: value for name, value in stats.items() if not name.endswith("_time")} == {
+        # E2 -> R2: the NS reaches S1, R2, E3 and E4, the NA goes back through S1. E4 listens to R2's group but has another address.
+        # The second E2 -> R2 is a cache hit. E1 -> R1: one NS and one NA frame.
+        "resolved": 3, "failed": 0, "cache_hits": 1, "hops": 3, "frames": 8, "visited": 5, "subnet_checks": 5,
+        "drop_nic": 1, "drop_ipv6": 0, "drop_icmpv6": 1, "avg_hops": 1.5,
+    }
+    assert stats["flood_time"] > 0.0 and stats["na_time"] > 0.0
+    assert IPv6AddRes.STATS is None
+
+def test_merge_adds_every_counter():
+    first, second = simulation.Stats(), simulation.Stats()
+    for ind, name in enumerate(simulation.Stats.__slots__):
+        setattr(first, name, ind)
+        setattr(second, name, 10 * ind)
+    assert first.merge(second) is first
+    assert [getattr(first, name) for name in simulation.Stats.__slots__] == [11 * ind for ind in range(len(simulation.Stats.__slots__))]
+    assert simulation.Stats().avg_hops() == 0.0
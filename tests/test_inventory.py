@@ -0,0 +1,88 @@
+import random
+import pytest
+import add_manipulation as am
+import inventory
+from topology import Topology
+
+# Function writes a device inventory with every kind of rejected row mixed in and returns its path.
+def device_file(tmp_path, count=300, seed=0):
+    rng = random.Random(seed)
+    lines = ["name,type,ipv6,mac", "# exported inventory", "S1,switch,,", "R1,router,2001:db8:1::1,02-00-00-00-00-01",
+             "R1,router,2001:db8:2::1,02-00-00-00-00-02"]
+    for ind in range(count):
+        subnet = rng.choice([1, 2])
+        host = rng.randrange(count) # Repeats some addresses.
+        mac = "02-00-00-01-%02x-%02x" % divmod(rng.randrange(count), 256)
+        match rng.randrange(12):
+            case 0:
+                mac = "33-33-ff-00-00-01" # Ethernet address of R1's solicited-node group.
+            case 1:
+                lines.append("")
+                continue
+            case 2:
+                lines.append("E%d,host,2001:db8::%x,%s" % (ind, host, mac))
+                continue
+            case 3:
+                lines.append("R1,router,2001:db8:%d::%x,%s" % (rng.randrange(3, 5), host + 2, mac)) # More addresses for R1.
+                continue
+        lines.append("E%d,end,2001:db8:%d::%x,%s" % (rng.randrange(count), subnet, host + 2, mac)) # Repeats some names.
+    path = tmp_path / "devices.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+# Function imports the device file in chunks of chunk_size rows and returns the topology, the report and the rejected rows.
+def import_file(path, chunk_size):
+    my_top = Topology()
+    report = inventory.Report()
+    errors = []
+    inventory.import_devices(my_top, path, report, lambda path, line_no, reason: errors.append((line_no, reason)), chunk_size)
+    return my_top, report, errors
+
+# Function returns the devices of a topology with their addresses.
+def devices(my_top):
+    return {dev.name: (dev.dev_type, dev.extended, dev.mac_add) for dev in my_top.top}
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_chunked_import_matches_unchunked(tmp_path, chunk_size):
+    path = device_file(tmp_path)
+    whole, whole_report, whole_errors = import_file(path, inventory.CHUNK)
+    chunked, chunked_report, chunked_errors = import_file(path, chunk_size)
+    assert devices(chunked) == devices(whole)
+    assert chunked_errors == whole_errors
+    assert (chunked_report.devices, chunked_report.addresses, chunked_report.rejected) == (whole_report.devices, whole_report.addresses, whole_report.rejected)
+
+def test_errors_are_reported_in_line_order(tmp_path):
+    errors = import_file(device_file(tmp_path), inventory.CHUNK)[2]
+    assert errors
+    assert errors == sorted(errors)
+
+def test_mac_of_group_in_same_chunk_is_rejected(tmp_path):
+    path = tmp_path / "devices.csv"
+    path.write_text("R1,router,2001:db8::1,02-00-00-00-00-01\nE5,end,2001:db8::5,33-33-ff-00-00-01\n")
+    my_top, report, errors = import_file(str(path), inventory.CHUNK)
+    assert errors == [(2, "The input MAC address was already assigned.")]
+    assert my_top.find_device("E5") is None
+
+def test_rejected_row_does_not_reserve_its_addresses(tmp_path):
+    path = tmp_path / "devices.csv"
+    path.write_text("E1,end,2001:db8::1,02-00-00-00-00-01\nE1,end,2001:db8::2,02-00-00-00-00-02\nE2,end,2001:db8::2,02-00-00-00-00-02\n")
+    my_top, report, errors = import_file(str(path), inventory.CHUNK)
+    assert errors == [(2, "This device already exits.")]
+    assert my_top.find_device("E2").extended == [am.ip_to_int("2001:db8::2")]
+
+def test_missing_file_is_reported_before_import(tmp_path):
+    report = inventory.Report()
+    with pytest.raises(OSError):
+        inventory.import_devices(Topology(), str(tmp_path / "none.csv"), report, None)
+    assert report.files == 0
+
+def test_links(tmp_path):
+    devices_path = tmp_path / "devices.csv"
+    devices_path.write_text("R1,router,2001:db8::1,02-00-00-00-00-01\nS1,switch,,\nE1,end,2001:db8::2,02-00-00-00-00-02\nE2,end,2001:db9::2,02-00-00-00-00-03\n")
+    links_path = tmp_path / "links.csv"
+    links_path.write_text("device1,device2,latency_us,bandwidth_mbps\nR1,S1,10,100\nS1,E1\nE1,E2\nS1,E1\nR1,NOPE\n")
+    my_top, report, errors = import_file(str(devices_path), inventory.CHUNK)
+    inventory.import_links(my_top, str(links_path), report, lambda path, line_no, reason: errors.append((line_no, reason)))
+    assert report.connections == 2
+    assert [line_no for line_no, reason in errors] == [4, 5, 6]
+    assert my_top.link(my_top.find_device("R1"), my_top.find_device("S1")) == (10 / 1e6, 100 * 1e6)
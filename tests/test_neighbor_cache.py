@@ -0,0 +1,72 @@
+import neighbor_cache as nc
+from neighbor_cache import NeighborCache
+
+IP = 0x20010db8000000000000000000000001
+MAC = 0x020000000001
+
+def test_resolution_goes_through_every_state_until_removed():
+    cache = NeighborCache()
+    cache.start(IP, 0.0)
+    assert cache.state(IP, 0.0) == nc.INCOMPLETE
+    assert cache.lookup(IP, 0.0) is None # No address to send to while INCOMPLETE.
+    cache.confirm(IP, MAC, 1.0)
+    assert cache.state(IP, 1.0 + nc.REACHABLE_TIME - 0.1) == nc.REACHABLE
+    stale = 1.0 + nc.REACHABLE_TIME
+    assert cache.state(IP, stale) == nc.STALE
+    assert cache.lookup(IP, stale + 2.0) == MAC # Traffic still uses a STALE address and starts the DELAY timer.
+    assert cache.state(IP, stale + 2.0) == nc.DELAY
+    probe = stale + 2.0 + nc.DELAY_FIRST_PROBE_TIME
+    assert cache.state(IP, probe - 0.1) == nc.DELAY
+    assert cache.state(IP, probe) == nc.PROBE
+    assert cache.state(IP, probe + nc.MAX_UNICAST_SOLICIT * nc.RETRANS_TIMER - 0.1) == nc.PROBE
+    assert cache.state(IP, probe + nc.MAX_UNICAST_SOLICIT * nc.RETRANS_TIMER) is None # The probes went unanswered.
+    assert len(cache) == 0
+
+def test_confirm_while_probing_makes_the_entry_reachable():
+    cache = NeighborCache()
+    cache.confirm(IP, MAC, 0.0)
+    cache.lookup(IP, nc.REACHABLE_TIME)
+    assert cache.state(IP, nc.REACHABLE_TIME + nc.DELAY_FIRST_PROBE_TIME) == nc.PROBE
+    cache.confirm(IP, MAC, nc.REACHABLE_TIME + nc.DELAY_FIRST_PROBE_TIME + 1.0)
+    assert cache.state(IP, nc.REACHABLE_TIME + nc.DELAY_FIRST_PROBE_TIME + 10.0) == nc.REACHABLE
+
+def test_fail_only_removes_incomplete_entries():
+    cache = NeighborCache()
+    cache.start(IP, 0.0)
+    cache.fail(IP)
+    assert cache.state(IP, 0.0) is None
+    cache.confirm(IP, MAC, 0.0)
+    cache.start(IP, 1.0) # A known address is not reset by a new resolution.
+    cache.fail(IP)
+    assert cache.state(IP, 1.0) == nc.REACHABLE
+
+def test_learn_keeps_a_confirmed_address_and_marks_changes_stale():
+    cache = NeighborCache()
+    cache.learn(IP, MAC, 0.0)
+    assert cache.state(IP, 0.0) == nc.STALE
+    cache.confirm(IP, MAC, 1.0)
+    cache.learn(IP, MAC, 2.0)
+    assert cache.state(IP, 2.0) == nc.REACHABLE
+    cache.learn(IP, MAC + 1, 3.0)
+    assert cache.state(IP, 3.0) == nc.STALE
+    assert cache.lookup(IP, 3.0) == MAC + 1
+
+def test_least_recently_used_entries_are_evicted():
+    cache = NeighborCache(size=3)
+    for ind in range(3):
+        cache.confirm(IP + ind, MAC + ind, 0.0)
+    assert cache.lookup(IP, 1.0) == MAC # Now the most recently used.
+    cache.confirm(IP + 3, MAC + 3, 1.0)
+    assert cache.evictions == 1
+    assert cache.state(IP + 1, 1.0) is None
+    assert [cache.state(IP + ind, 1.0) for ind in (0, 2, 3)] == [nc.REACHABLE] * 3
+
+def test_hits_and_misses_are_counted():
+    cache = NeighborCache()
+    assert cache.lookup(IP, 0.0) is None
+    cache.start(IP, 0.0)
+    assert cache.lookup(IP, 0.0) is None
+    cache.confirm(IP, MAC, 0.0)
+    assert cache.lookup(IP, 1.0) == MAC
+    assert cache.lookup(IP, 2.0) == MAC
+    assert (cache.hits, cache.misses) == (2, 2)
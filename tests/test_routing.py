@@ -0,0 +1,75 @@
+import contextlib
+import io
+import pytest
+import IPv6AddRes
+import simulation
+import tracing
+import add_manipulation as am
+from topology import Topology, Device
+
+# Function returns the default test topology ('TT'): E1 behind R1, E2 and E3 behind R2, the routers sharing 2001:3::/64.
+def default_top():
+    my_top = Topology()
+    with contextlib.redirect_stdout(io.StringIO()):
+        IPv6AddRes.test_top(my_top)
+    return my_top
+
+# Function sends a packet from the device to the IPv6 address and returns the names on its path with the trace and the statistics.
+def send(my_top, src, ip):
+    sink, stats = tracing.ListSink(), simulation.Stats()
+    path = simulation.route(my_top, my_top.find_device(src), my_top.find_device_ip(am.ip_to_int(ip)), am.ip_to_int(ip), sink, stats)
+    return [dev.name for dev in path], sink.events, stats
+
+# Function returns the events of a trace with the given name.
+def events(trace, name):
+    return [event for event in trace if event["event"] == name]
+
+def test_packet_is_forwarded_across_both_routers():
+    path, trace, stats = send(default_top(), "E2", "2001:1::2")
+    assert path == ["E2", "R2", "R1", "E1"]
+    assert [(event["dev"], event["next_hop"], event["via"]) for event in events(trace, "packet_forwarded")] == \
+           [("E2", "R2", "2001:2::21"), ("R2", "R1", "2001:3::8")]
+    assert [(event["src"], event["target"]) for event in events(trace, "ns_sent")] == [("E2", "R2"), ("R2", "R1"), ("R1", "E1")]
+    assert (stats.resolved, stats.cache_hits, stats.failed) == (3, 0, 0)
+
+def test_second_packet_is_served_from_the_caches():
+    my_top = default_top()
+    send(my_top, "E2", "2001:1::2")
+    path, trace, stats = send(my_top, "E2", "2001:1::2")
+    assert path == ["E2", "R2", "R1", "E1"]
+    assert events(trace, "ns_sent") == []
+    assert [event["src"] for event in events(trace, "cache_hit")] == ["E2", "R2", "R1"]
+    assert (stats.resolved, stats.cache_hits, stats.frames) == (3, 3, 0)
+    assert events(trace, "packet_delivered")[0]["path"] == path
+
+def test_prefix_without_a_router_is_dropped_as_no_route():
+    my_top = default_top()
+    my_top.add_device(Device("E9", "end", [am.ip_to_int("2001:9::9")], [am.mac_to_int("02-00-00-00-00-09")]))
+    path, trace, stats = send(my_top, "E2", "2001:9::9")
+    assert path == []
+    assert events(trace, "packet_dropped") == [{"event": "packet_dropped", "dev": "R2", "ip": "2001:9::9", "reason": "no_route"}]
+    assert stats.resolved == 1 # Only E2 resolving its default router.
+
+# Function returns hosts A and B at the ends of a chain of routers, each router sharing a subnet with the next one.
+def router_chain(routers):
+    my_top = Topology()
+    devices = [Device("A", "end", [am.ip_to_int("2001:0::a")], [am.mac_to_int("02-00-00-00-00-0a")])]
+    for ind in range(routers):
+        ips = [am.ip_to_int("2001:%x::1" % ind), am.ip_to_int("2001:%x::2" % (ind + 1))]
+        devices.append(Device("R%d" % ind, "router", ips, [0x020000010000 + 2 * ind, 0x020000010001 + 2 * ind]))
+    devices.append(Device("B", "end", [am.ip_to_int("2001:%x::b" % routers)], [am.mac_to_int("02-00-00-00-00-0b")]))
+    for dev in devices:
+        my_top.add_device(dev)
+    for dev, other in zip(devices, devices[1:]):
+        my_top.add_connection(dev, other)
+    return my_top
+
+@pytest.mark.parametrize("routers, delivered", [(simulation.HOP_LIMIT, True), (simulation.HOP_LIMIT + 1, False)])
+def test_packet_going_through_more_routers_than_the_hop_limit_is_dropped(routers, delivered):
+    path, trace, stats = send(router_chain(routers), "A", "2001:%x::b" % routers)
+    if delivered:
+        assert path == ["A"] + ["R%d" % ind for ind in range(routers)] + ["B"]
+    else:
+        assert path == []
+        assert events(trace, "packet_dropped") == [{"event": "packet_dropped", "dev": "R%d" % (routers - 2), "ip": "2001:%x::b" % routers,
+                                                    "reason": "hop_limit"}]
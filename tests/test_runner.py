@@ -0,0 +1,40 @@
+import pytest
+import generators
+import runner
+import simulation
+from topology import Topology
+
+# Function returns the statistics without the timings.
+def counts(stats):
+    return {name: value for name, value in stats.as_dict().items() if not name.endswith("_time")}
+
+@pytest.fixture
+def my_top():
+    return generators.generate(Topology(), "leaf-spine", 2, 3, 6, seed=2)
+
+@pytest.mark.parametrize("pairs", [runner.gateway_pairs, runner.subnet_pairs])
+def test_workers_give_the_same_totals(my_top, pairs):
+    pairs = list(pairs(my_top))
+    single = runner.resolve_pairs(my_top, pairs, workers=1)
+    pooled = runner.resolve_pairs(my_top, pairs, workers=2, chunk_size=16)
+    assert counts(pooled) == counts(single)
+    assert single.resolved + single.failed == len(pairs)
+
+def test_totals_are_the_sum_of_the_pairs(my_top):
+    pairs = list(runner.gateway_pairs(my_top))
+    total = simulation.Stats()
+    for dev_name, ip in pairs:
+        runner.resolve_pair(my_top, dev_name, ip, total)
+    assert counts(runner.resolve_pairs(my_top, pairs, workers=1)) == counts(total)
+    assert total.failed == 0 and total.avg_hops() > 0
+
+def test_unreachable_and_unknown_pairs_fail_without_a_flood(my_top):
+    stats = simulation.Stats()
+    assert runner.resolve_pair(my_top, "missing", "2001:db8::1", stats) == []
+    assert runner.resolve_pair(my_top, next(iter(my_top.names)), "2001:db8::dead:1", stats) == []
+    assert (stats.failed, stats.frames) == (2, 0)
+
+def test_read_pairs_skips_comments_and_other_lines(tmp_path):
+    path = tmp_path / "pairs.txt"
+    path.write_text("# sender target\nE1 2001:1::1\n\nE2 2001:1::1 extra\n#E3 2001:1::2\nE4 2001:2::1\n")
+    assert list(runner.read_pairs(str(path))) == [("E1", "2001:1::1"), ("E4", "2001:2::1")]
@@ -0,0 +1,93 @@
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import threading
+import IPv6AddRes
+import server
+from topology import Topology
+
+RESOLVE = {"op": "resolve", "src": "E2", "ip": "2001:2::21"}
+
+# Server of the default test topology. Made in the test rather than in a fixture: pytest puts its own sys.stdout back between the two.
+@contextlib.contextmanager
+def default_server():
+    my_top = Topology()
+    with contextlib.redirect_stdout(io.StringIO()):
+        IPv6AddRes.test_top(my_top)
+    sim_server = server.Server(my_top, IPv6AddRes.batch_option, IPv6AddRes.SimError)
+    try:
+        yield sim_server
+    finally:
+        sim_server.close()
+
+# Function answers the requests concurrently, in the order they are given.
+def answer_all(sim_server, requests):
+    async def run():
+        return await asyncio.gather(*(sim_server.answer(request if isinstance(request, str) else json.dumps(request)) for request in requests))
+    return asyncio.run(run())
+
+def test_resolutions_wait_for_a_running_edit(capsys):
+    with default_server() as sim_server:
+        edit = {"id": "edit", "op": "remove_connection", "devices": ["R2", "S1"]}
+        before = answer_all(sim_server, [dict(RESOLVE, id=0)])[0]
+        assert before["ok"] and before["result"]["path"] == ["E2", "S1", "R2"]
+        responses = answer_all(sim_server, [edit] + [dict(RESOLVE, id=ind) for ind in range(1, 5)] + ["{not json", {"id": 9, "op": "device"}])
+        assert responses[0] == {"id": "edit", "ok": True, "output": "Connection between R2 and S1 was removed.\n"}
+        for ind, response in enumerate(responses[1:5], 1):
+            assert response["id"] == ind and response["ok"] and response["result"]["path"] == [] # Every resolution saw the edit.
+        assert responses[5] == {"id": None, "ok": False, "error": "Request is not valid JSON."}
+        assert responses[6] == {"id": 9, "ok": False, "error": "Field 'name' must be a string."}
+        assert capsys.readouterr().out == "" # The edit's output only went to its response.
+
+def test_failed_edit_answers_the_error():
+    with default_server() as sim_server:
+        response = answer_all(sim_server, [{"id": 1, "op": "add_device", "type": "end", "name": "E1", "ip": "2001:1::9", "mac": "02-00-00-00-00-09"}])[0]
+        assert response == {"id": 1, "ok": False, "error": "This device already exits."}
+
+def test_edit_only_captures_its_own_thread(capsys):
+    with default_server() as sim_server:
+        started, release = threading.Event(), threading.Event()
+
+        # Function stands in for an option printing while another thread prints too.
+        def option(my_top, words):
+            print("edit")
+            started.set()
+            release.wait(5)
+
+        sim_server.option = option
+
+        async def run():
+            edit = asyncio.create_task(sim_server.answer(json.dumps({"op": "remove_device", "name": "E1"})))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            print("loop")
+            release.set()
+            return await edit
+        assert asyncio.run(run()) == {"id": None, "ok": True, "output": "edit\n"}
+        assert capsys.readouterr().out == "loop\n"
+
+def test_clients_over_a_socket():
+    with default_server() as sim_server:
+        async def run():
+            listening = asyncio.get_running_loop().create_future()
+            serving = asyncio.create_task(sim_server.serve("127.0.0.1:0", listening.set_result))
+            listener = await listening
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            writer.write(b'{"id": 1, "op": "device", "name": "S1"}\n\n[1, 2]\n' + json.dumps(dict(RESOLVE, id=2)).encode() + b"\n")
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in range(3)]
+            writer.close()
+            serving.cancel()
+            return responses
+        device, not_object, resolved = asyncio.run(run())
+        assert device["ok"] and device["result"]["connections"] == ["R2", "E2", "E3"]
+        assert not_object == {"id": None, "ok": False, "error": "Request must be a JSON object."}
+        assert resolved["id"] == 2 and resolved["result"]["mac"] == "43-43-53-45-34-43"
+
+def test_close_puts_back_stdout():
+    stdout = sys.stdout
+    sim_server = server.Server(Topology(), IPv6AddRes.batch_option, IPv6AddRes.SimError)
+    assert sys.stdout is sim_server.stdout
+    sim_server.close()
+    assert sys.stdout is stdout
@@ -0,0 +1,104 @@
+import contextlib
+import io
+import pytest
+import generators
+import IPv6AddRes
+import simulation
+import add_manipulation as am
+from topology import Topology, Device
+
+# Function returns the default test topology ('TT').
+def default_top():
+    my_top = Topology()
+    with contextlib.redirect_stdout(io.StringIO()):
+        IPv6AddRes.test_top(my_top)
+    return my_top
+
+# Function floods the NS the way request() did with a list frontier and path copies, and returns the path to the target.
+def list_flood(my_top, dev1, dev2, ip_add):
+    visited = [dev1]
+    queue = [[dev1]]
+    while queue:
+        path = queue.pop(0)
+        curr_dev = path[-1]
+        if curr_dev == dev2:
+            return path
+        if (curr_dev != dev1) and (curr_dev.dev_type != "switch"):
+            continue
+        for device in my_top.top[curr_dev]:
+            if (device not in visited) and device.same_sub_ip(ip_add):
+                queue.append(path + [device])
+                visited.append(device)
+    return []
+
+@pytest.mark.parametrize("src, ip, path", [("E2", "2001:2::21", ["E2", "S1", "R2"]), ("E3", "2001:2::3", ["E3", "S1", "E2"]),
+                                            ("R1", "2001:3::21", ["R1", "R2"]), ("E1", "2001:3::21", [])])
+def test_request_on_default_topology(src, ip, path):
+    my_top = default_top()
+    ip_add = am.ip_to_int(ip)
+    found = simulation.request(my_top, my_top.find_device(src), my_top.find_device_ip(ip_add), [], ip_add, None)
+    assert [dev.name for dev in found] == path
+
+@pytest.mark.parametrize("kind, sizes", [("random", (4, 20, 5)), ("leaf-spine", (2, 3, 3)), ("tree", (2, 2, 3))])
+def test_request_finds_the_list_flood_path(kind, sizes):
+    my_top = generators.generate(Topology(), kind, *sizes, seed=7)
+    for dev1 in my_top.top:
+        for dev2 in my_top.top:
+            for ip in dev2.extended:
+                if (dev1 != dev2) and dev1.same_sub_ip(ip):
+                    assert simulation.request(my_top, dev1, dev2, [], ip, None) == list_flood(my_top, dev1, dev2, ip)
+
+def test_request_across_a_long_line_of_switches():
+    my_top = Topology()
+    hosts = [Device("E%d" % ind, "end", [am.ip_to_int("2001:db8::%x" % (ind + 1))], [am.mac_to_int("02-00-00-00-00-%02x" % ind)]) for ind in range(2)]
+    switches = [Device("S%d" % ind, "switch") for ind in range(20000)]
+    line = [hosts[0]] + switches + [hosts[1]]
+    for dev in line:
+        my_top.add_device(dev)
+    for dev, other in zip(line, line[1:]):
+        my_top.add_connection(dev, other)
+    stats = simulation.Stats()
+    assert simulation.request(my_top, hosts[0], hosts[1], [], hosts[1].extended[0], None, stats) == line
+    assert (stats.resolved, stats.visited, stats.hops) == (1, len(line) - 1, len(line) - 1)
+
+# Function returns what a device does with an NS for the address, checked in its address lists the way request() used to.
+def listed_outcome(dev, ip_add):
+    if dev.dev_type == "switch":
+        return simulation.FLOODED
+    if am.sol_mac_int(ip_add) not in dev.sol_mac_add:
+        return simulation.DROP_NIC
+    if am.sol_ip_int(ip_add) not in dev.sol_ip:
+        return simulation.DROP_IPV6
+    if ip_add not in dev.extended:
+        return simulation.DROP_ICMPV6
+    return simulation.ACCEPTED
+
+def test_group_index_filters_like_the_address_lists():
+    my_top = Topology()
+    switch = Device("S1", "switch")
+    my_top.add_device(switch)
+    # Different addresses sharing their low 24 bits (one solicited-node group), and routers with a second address in another group.
+    for ind in range(24):
+        ips = [am.ip_to_int("2001:db8::%x%02x:%x" % (ind + 1, ind % 3, 0x10 + ind % 4))]
+        dev_type = "end"
+        if ind % 5 == 0:
+            ips.append(am.ip_to_int("2001:db8::%x07:%x" % (ind + 1, 0x10 + ind % 2)))
+            dev_type = "router"
+        dev = Device("D%d" % ind, dev_type, ips, [0x020000000100 + 2 * ind + k for k in range(len(ips))])
+        my_top.add_device(dev)
+        my_top.add_connection(switch, dev)
+    shared = 0
+    for dev in list(my_top.top):
+        for ip_add in dev.extended:
+            listeners = simulation.Listeners(my_top, ip_add)
+            assert listeners.nic == {other.name for other in my_top.top if am.sol_mac_int(ip_add) in other.sol_mac_add}
+            for other in my_top.top:
+                assert listeners.outcome(other) == listed_outcome(other, ip_add)
+            stats = simulation.Stats()
+            sender = next(other for other in my_top.top if other.dev_type != "switch" and other != dev)
+            simulation.request(my_top, sender, dev, [], ip_add, None, stats)
+            receivers = [other for other in my_top.top if other not in (sender, switch, dev)]
+            assert stats.drop_nic == sum(listed_outcome(other, ip_add) == simulation.DROP_NIC for other in receivers)
+            assert stats.drop_icmpv6 == sum(listed_outcome(other, ip_add) == simulation.DROP_ICMPV6 for other in receivers)
+            shared += stats.drop_icmpv6
+    assert shared > 0
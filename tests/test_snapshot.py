@@ -0,0 +1,150 @@
+import io
+import json
+from array import array
+import pytest
+import add_manipulation as am
+import generators
+import IPv6AddRes
+import snapshot
+from topology import Topology
+
+@pytest.fixture
+def my_top():
+    return generators.generate(Topology(), "multi-subnet", 2, 2, 3, seed=1)
+
+def test_binary_round_trip(my_top, tmp_path):
+    path = str(tmp_path / "top.bin")
+    snapshot.save_binary(my_top, path)
+    loaded = snapshot.load_binary(Topology(), path)
+    assert {dev.name: [n.name for n in conns] for dev, conns in loaded.top.items()} == {dev.name: [n.name for n in conns] for dev, conns in my_top.top.items()}
+
+@pytest.mark.parametrize("cut", [0, 7, snapshot.HEADER.size, snapshot.HEADER.size + 5, -1])
+def test_truncated_binary_is_rejected(my_top, tmp_path, cut):
+    path = tmp_path / "top.bin"
+    snapshot.save_binary(my_top, str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:cut])
+    kept = generators.generate(Topology(), "flat", 1, 1)
+    before = len(kept.top)
+    with pytest.raises(ValueError):
+        snapshot.load_binary(kept, str(path))
+    assert len(kept.top) == before # The topology is left as it was.
+
+def test_corrupt_binary_is_rejected(my_top, tmp_path):
+    path = tmp_path / "top.bin"
+    snapshot.save_binary(my_top, str(path))
+    data = bytearray(path.read_bytes())
+    data[snapshot.HEADER.size + 10] = 9 # Device type of the first device record.
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        snapshot.load_binary(Topology(), str(path))
+
+# Function returns the adjacency offsets and neighbor indexes of a binary snapshot and a function writing the neighbors back.
+def adjacency(data):
+    magic, version, n_devs, n_addrs, n_neighbors, names_size, clock = snapshot.HEADER.unpack_from(data, 0)
+    pos = snapshot.HEADER.size + n_devs * snapshot.DEVICE.size + n_addrs * snapshot.ADDRESS.size
+    offsets = array("I", data[pos:pos + (n_devs + 1) * 4])
+    pos += (n_devs + 1) * 4
+    neighbors = array("I", data[pos:pos + n_neighbors * 4])
+    def write(new):
+        data[pos:pos + n_neighbors * 4] = new.tobytes()
+    return offsets, neighbors, write
+
+# A connection listed by one device only, listed twice or from a device to itself (the section sizes stay the same).
+@pytest.mark.parametrize("corrupt", ["one-sided", "twice", "self"])
+def test_corrupt_adjacency_is_rejected(my_top, tmp_path, corrupt):
+    path = tmp_path / "top.bin"
+    snapshot.save_binary(my_top, str(path))
+    data = bytearray(path.read_bytes())
+    offsets, neighbors, write = adjacency(data)
+    dev = next(ind for ind in range(len(offsets) - 1) if offsets[ind + 1] - offsets[ind] >= 2)
+    first, second = offsets[dev], offsets[dev] + 1
+    match corrupt:
+        case "one-sided": # Point the first connection at a device that does not list dev.
+            listing = {ind for ind in range(len(offsets) - 1) if dev in neighbors[offsets[ind]:offsets[ind + 1]]}
+            neighbors[first] = next(ind for ind in range(len(offsets) - 1) if (ind != dev) and (ind not in listing))
+        case "twice":
+            neighbors[second] = neighbors[first]
+        case "self":
+            neighbors[first] = dev
+    write(neighbors)
+    path.write_bytes(bytes(data))
+    kept = generators.generate(Topology(), "flat", 1, 1)
+    before = len(kept.top)
+    with pytest.raises(ValueError):
+        snapshot.load_binary(kept, str(path))
+    assert len(kept.top) == before
+
+def test_binary_round_trip_keeps_indexes(my_top, tmp_path):
+    path = str(tmp_path / "top.bin")
+    snapshot.save_binary(my_top, path)
+    loaded = snapshot.load_binary(Topology(), path)
+    for dev in loaded.top:
+        before = my_top.find_device(dev.name)
+        assert (dev.dev_type, dev.extended, dev.sol_ip, dev.mac_add, dev.sol_mac_add, dev.prefixes) == \
+               (before.dev_type, before.extended, before.sol_ip, before.mac_add, before.sol_mac_add, before.prefixes)
+    assert loaded.edges == my_top.edges
+    assert {ip: dev.name for ip, dev in loaded.ips.items()} == {ip: dev.name for ip, dev in my_top.ips.items()}
+    assert {mac: dev.name for mac, dev in loaded.macs.items()} == {mac: dev.name for mac, dev in my_top.macs.items()}
+    assert {key: sorted(dev.name for dev in devs) for key, devs in loaded.groups.items()} == \
+           {key: sorted(dev.name for dev in devs) for key, devs in my_top.groups.items()}
+    assert {key: sorted(dev.name for dev in devs) for key, devs in loaded.subnets.items()} == \
+           {key: sorted(dev.name for dev in devs) for key, devs in my_top.subnets.items()}
+
+def saved_json(my_top, tmp_path):
+    path = tmp_path / "top.json"
+    snapshot.save_json(my_top, str(path))
+    return path, json.loads(path.read_text())
+
+def test_json_round_trip(my_top, tmp_path):
+    path, data = saved_json(my_top, tmp_path)
+    loaded = snapshot.load_json(Topology(), str(path))
+    assert sorted(dev.name for dev in loaded.top) == sorted(dev.name for dev in my_top.top)
+
+@pytest.mark.parametrize("change", [
+    lambda devices: devices[0].update(type="rooter"),
+    lambda devices: devices[0].update(macs=["12:34:56:78:9a:bc"] * len(devices[0]["macs"])),
+    lambda devices: devices[0].update(ips=["fe80::1"] * len(devices[0]["ips"])),
+    lambda devices: devices[0].update(macs=devices[0]["macs"][1:]),
+    lambda devices: devices[0]["connections"].append("NOPE"),
+    lambda devices: devices[0]["connections"].pop(), # Only listed by the other device now.
+    lambda devices: devices[1].update(name=devices[0]["name"]),
+    lambda devices: devices[0].pop("ips"),
+])
+def test_invalid_json_is_rejected(my_top, tmp_path, change):
+    path, data = saved_json(my_top, tmp_path)
+    change(data["devices"])
+    path.write_text(json.dumps(data))
+    kept = generators.generate(Topology(), "flat", 1, 1)
+    before = len(kept.top)
+    with pytest.raises(ValueError):
+        snapshot.load_json(kept, str(path))
+    assert len(kept.top) == before
+
+ADDRESSES = ["2001:db8::1", "3fff:ffff::2", "2000::3", "2::1", "3::1", "4000::1", "1fff::1", "fe80::1"]
+
+# A topology built at the prompt can always be loaded back, and the loader rejects what the prompt rejects.
+@pytest.mark.parametrize("ip", ADDRESSES)
+def test_json_accepts_the_addresses_the_prompt_accepts(ip, tmp_path):
+    try:
+        IPv6AddRes.check_ip(Topology(), ip)
+        accepted = True
+    except IPv6AddRes.SimError:
+        accepted = False
+    entry = {"name": "R1", "type": "router", "ips": [ip], "macs": ["02-00-00-00-00-01"], "connections": []}
+    if accepted:
+        assert snapshot.json_device(entry).extended == [am.ip_to_int(ip)]
+    else:
+        with pytest.raises(ValueError):
+            snapshot.json_device(entry)
+
+def test_json_round_trip_of_prompt_topology(tmp_path):
+    path = str(tmp_path / "top.json")
+    built = Topology()
+    script = ["AR R1 2001:db8::1 02-00-00-00-00-01", "AI R1 3fff::1 02-00-00-00-00-02", "AE E1 2001:db8::10 02-00-00-00-00-10",
+              "AE E2 3fff::10 02-00-00-00-00-11", "AS S1", "AC R1 S1", "AC E1 S1", "AC E2 S1", "SV " + path]
+    assert IPv6AddRes.run_batch(built, io.StringIO("\n".join(script))) == 0
+    loaded = Topology()
+    assert IPv6AddRes.run_batch(loaded, io.StringIO("LD " + path)) == 0
+    assert {dev.name: (dev.extended, dev.mac_add, sorted(n.name for n in conns)) for dev, conns in loaded.top.items()} == \
+           {dev.name: (dev.extended, dev.mac_add, sorted(n.name for n in conns)) for dev, conns in built.top.items()}
@@ -0,0 +1,120 @@
+import gc
+import pytest
+import add_manipulation as am
+from topology import Topology, Device, PausedGc
+
+def test_add_devices_bulk_rejects_mac_of_new_group():
+    my_top = Topology()
+    bulk = am.derive_bulk(["2001:db8::1", "2001:db8::5"], ["02-00-00-00-00-01", "33-33-ff-00-00-01"])
+    devices, errors = my_top.add_devices_bulk(["E1", "E5"], "end", bulk)
+    assert [dev.name for dev in devices] == ["E1"]
+    assert errors == {1: "The input MAC address was already assigned."}
+
+def test_remove_ip_returns_direct_links_left_without_subnet():
+    my_top = Topology()
+    router = Device("R1", "router", [am.ip_to_int("2001:db8:1::1"), am.ip_to_int("2001:db8:2::1")],
+                    [am.mac_to_int("02-00-00-00-00-01"), am.mac_to_int("02-00-00-00-00-02")])
+    both = Device("R2", "router", [am.ip_to_int("2001:db8:1::2"), am.ip_to_int("2001:db8:2::2")],
+                  [am.mac_to_int("02-00-00-00-00-03"), am.mac_to_int("02-00-00-00-00-04")])
+    end1 = Device("E1", "end", [am.ip_to_int("2001:db8:1::10")], [am.mac_to_int("02-00-00-00-00-10")])
+    end2 = Device("E2", "end", [am.ip_to_int("2001:db8:2::10")], [am.mac_to_int("02-00-00-00-00-11")])
+    switch = Device("S1", "switch")
+    for dev in (router, both, end1, end2, switch):
+        my_top.add_device(dev)
+    for dev in (both, end1, end2, switch):
+        my_top.add_connection(router, dev)
+    assert my_top.remove_ip(router, am.ip_to_int("2001:db8:1::1")) == [end1]
+    assert my_top.remove_ip(router, am.ip_to_int("2001:db8:2::1")) == [both, end2]
+    assert not my_top.segments.stale
+
+def test_paused_gc_restores_the_collector():
+    assert gc.isenabled()
+    with pytest.raises(ValueError):
+        with PausedGc():
+            with PausedGc(): # Nested pauses leave the collector off until the outer one ends.
+                assert not gc.isenabled()
+            assert not gc.isenabled()
+            raise ValueError("bad row")
+    assert gc.isenabled()
+
+def test_add_devices_bulk_rejects_repeats_within_the_batch():
+    my_top = Topology()
+    bulk = am.derive_bulk(["2001:db8::1", "2001:db8::2", "2001:db8::1", "2001:db8::3"],
+                          ["02-00-00-00-00-01", "02-00-00-00-00-02", "02-00-00-00-00-03", "02-00-00-00-00-01"], dedupe=False)
+    devices, errors = my_top.add_devices_bulk(["E1", "E1", "E3", "E4"], "end", bulk)
+    assert [dev.name for dev in devices] == ["E1"]
+    assert errors == {1: "This device already exits.", 2: "IPv6 Global Unicast Address was alreay assigned.",
+                      3: "The input MAC address was already assigned."}
+    assert my_top.names == {"E1": devices[0]}
+    assert set(my_top.ips) == {am.ip_to_int("2001:db8::1")}
+    assert set(my_top.macs) == {am.mac_to_int("02-00-00-00-00-01")}
+
+# Function returns the lookup indexes a topology should have, found by scanning every device.
+def scanned_indexes(my_top):
+    ips, macs, groups, subnets = {}, {}, {}, {}
+    for dev in my_top.top:
+        for e_ip, sol_ip, mac in zip(dev.extended, dev.sol_ip, dev.mac_add):
+            ips[e_ip] = dev
+            macs[mac] = dev
+            groups.setdefault(sol_ip, set()).add(dev)
+            subnets.setdefault(am.get_prefix(e_ip), set()).add(dev)
+    return {dev.name: dev for dev in my_top.top}, ips, macs, groups, subnets
+
+def test_indexes_follow_every_edit():
+    my_top = Topology()
+    router = Device("R1", "router", [am.ip_to_int("2001:db8:1::1")], [am.mac_to_int("02-00-00-00-00-01")])
+    end = Device("E1", "end", [am.ip_to_int("2001:db8:1::1:1")], [am.mac_to_int("02-00-00-00-00-02")]) # Same group as R1's address.
+    my_top.add_device(router)
+    my_top.add_device(end)
+    my_top.add_ip(router, am.ip_to_int("2001:db8:2::1"), am.mac_to_int("02-00-00-00-00-03"))
+    my_top.add_devices([Device("E%d" % ind, "end", [am.ip_to_int("2001:db8:2::%x" % ind)], [am.mac_to_int("02-00-00-00-01-%02x" % ind)])
+                        for ind in range(2, 5)])
+    steps = [lambda: None, lambda: my_top.remove_ip(router, am.ip_to_int("2001:db8:1::1")),
+             lambda: my_top.remove_device(my_top.find_device("E3")), lambda: my_top.remove_device(end)]
+    for step in steps:
+        step()
+        assert (my_top.names, my_top.ips, my_top.macs, my_top.groups, my_top.subnets) == scanned_indexes(my_top)
+    assert my_top.find_device_ip(am.ip_to_int("2001:db8:2::1")) is router
+    assert my_top.find_device_ip(am.ip_to_int("2001:db8:1::1")) is None
+    assert my_top.ip_exist("2001:db8:2::4") and not my_top.ip_exist("2001:db8:2::3")
+    assert my_top.mac_exist("02-00-00-00-00-03") and not my_top.mac_exist("02-00-00-00-00-02") and not my_top.mac_exist("02-00-00")
+    assert my_top.mac_exist("33-33-ff-00-00-01") # Solicited node Ethernet address of a group in use.
+    assert my_top.group_devices(am.sol_ip_int(am.ip_to_int("2001:db8:2::1"))) == {router}
+    assert my_top.name_validity("E3") and not my_top.name_validity("E4")
+
+def test_prefixes_follow_the_addresses_of_a_device():
+    router = Device("R1", "router", [am.ip_to_int("2001:db8:1::1"), am.ip_to_int("2001:db8:1::2")],
+                    [am.mac_to_int("02-00-00-00-00-01"), am.mac_to_int("02-00-00-00-00-02")])
+    end = Device("E1", "end", [am.ip_to_int("2001:db8:2::10")], [am.mac_to_int("02-00-00-00-00-10")])
+    switch = Device("S1", "switch")
+    assert router.prefixes == {am.get_prefix(am.ip_to_int("2001:db8:1::"))}
+    assert not router.same_sub(end) and router.same_sub(switch) and switch.same_sub(end)
+    router.add_address(am.ip_to_int("2001:db8:2::1"), am.mac_to_int("02-00-00-00-00-03"))
+    assert router.same_sub(end) and router.same_sub_ip(am.ip_to_int("2001:db8:2::99"))
+    router.remove_address(am.ip_to_int("2001:db8:1::1"))
+    assert router.same_sub_ip(am.ip_to_int("2001:db8:1::99")) # 2001:db8:1::2 is still in the subnet.
+    router.remove_address(am.ip_to_int("2001:db8:1::2"))
+    assert router.prefixes == {am.get_prefix(am.ip_to_int("2001:db8:2::"))}
+    assert not router.same_sub_ip(am.ip_to_int("2001:db8:1::99"))
+    assert switch.same_sub_ip(am.ip_to_int("2001:db8:1::99")) and switch.in_subnet(12345)
+    assert router.prefix_ind(am.get_prefix(am.ip_to_int("2001:db8:2::"))) == 0 and router.prefix_ind(12345) is None
+
+def test_subnet_index_and_reach():
+    my_top = Topology()
+    router = Device("R1", "router", [am.ip_to_int("2001:db8:1::1")], [am.mac_to_int("02-00-00-00-00-01")])
+    hosts = [Device("E%d" % ind, "end", [am.ip_to_int("2001:db8:%x::10" % (ind % 2 + 1))], [am.mac_to_int("02-00-00-00-00-1%x" % ind)])
+             for ind in range(3)]
+    switches = [Device("S1", "switch"), Device("S2", "switch")]
+    for dev in [router] + hosts + switches:
+        my_top.add_device(dev)
+    for dev in (router, hosts[0], hosts[1]):
+        my_top.add_connection(switches[0], dev)
+    my_top.add_connection(switches[1], hosts[2])
+    prefix = am.get_prefix(am.ip_to_int("2001:db8:1::"))
+    assert my_top.subnet_devices(prefix) == {router, hosts[0], hosts[2]}
+    assert my_top.subnet_devices(12345) == set()
+    assert my_top.can_reach(router, hosts[0], prefix) and not my_top.can_reach(router, hosts[2], prefix)
+    my_top.add_connection(switches[0], switches[1]) # Joins the two segments.
+    assert my_top.can_reach(router, hosts[2], prefix)
+    my_top.remove_device(switches[1])
+    assert not my_top.can_reach(router, hosts[2], prefix)
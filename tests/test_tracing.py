@@ -0,0 +1,66 @@
+import contextlib
+import io
+import json
+import IPv6AddRes
+import simulation
+import tracing
+import add_manipulation as am
+from topology import Topology
+
+# Function resolves 2001:2::21 (R2) from E2 on a fresh default test topology ('TT') with the sink and returns the statistics.
+def resolve_with(sink):
+    my_top = Topology()
+    with contextlib.redirect_stdout(io.StringIO()):
+        IPv6AddRes.test_top(my_top)
+    stats = simulation.Stats()
+    ip = am.ip_to_int("2001:2::21")
+    simulation.resolve(my_top, my_top.find_device("E2"), my_top.find_device_ip(ip), ip, sink, stats)
+    return stats
+
+# Function returns the statistics without the timings.
+def counts(stats):
+    return {name: value for name, value in stats.as_dict().items() if not name.endswith("_time")}
+
+def test_list_sink_keeps_the_flood_in_order():
+    sink = tracing.ListSink()
+    resolve_with(sink)
+    assert [(event["event"], event.get("dev")) for event in sink.events] == [
+        ("ns_sent", None), ("ns_received", "S1"), ("ns_flooded", "S1"), ("ns_received", "R2"), ("ns_accepted", "R2"),
+        ("na_path", None), ("ns_received", "E3"), ("ns_dropped", "E3"), ("flood_done", None)] # The NA leaves as soon as R2 accepts.
+    assert sink.events[5]["path"] == ["R2", "S1", "E2"]
+    assert sink.events[7]["layer"] == "nic"
+    assert sink.events[-1] == {"event": "flood_done", "src": "E2", "target": "R2", "resolved": True, "frames": 3}
+
+def test_pretty_sink_prints_each_event():
+    sink = tracing.ListSink()
+    resolve_with(sink)
+    direct, replayed = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(direct):
+        resolve_with(tracing.PRETTY)
+    with contextlib.redirect_stdout(replayed):
+        for event in sink.events:
+            tracing.PRETTY.emit(event)
+    assert direct.getvalue() == replayed.getvalue()
+    assert "E3" in direct.getvalue()
+
+def test_json_lines_sink_writes_full_buffers_and_the_rest_on_flush():
+    events = tracing.ListSink()
+    resolve_with(events)
+    out = io.StringIO()
+    sink = tracing.JsonLinesSink(out, buffer_size=4)
+    for event in events.events[:7]:
+        sink.emit(event)
+    assert len(out.getvalue().splitlines()) == 4
+    for event in events.events[7:]:
+        sink.emit(event)
+    sink.flush()
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == events.events
+
+def test_quiet_and_timed_runs_count_the_same():
+    quiet = resolve_with(None)
+    listed = tracing.ListSink()
+    stats = simulation.Stats()
+    timed = resolve_with(tracing.TimedSink(listed, stats))
+    assert counts(quiet) == counts(timed)
+    assert len(listed.events) == 9
+    assert stats.output_time > 0.0